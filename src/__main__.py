@@ -8,9 +8,13 @@ import sys
 from typing import Any, Dict, Optional, List
 
 from comedian import run
+from comedian.action import DriftError
+from comedian.command import CommandContext
 from comedian.configuration import Configuration
+from comedian.event import EventLog, JsonEventSink, LoggingEventSink
 from comedian.graph import Graph
 from comedian.parse import parse
+from comedian.plan import Plan, render_dot, render_text
 
 
 def runtime_dir():
@@ -52,7 +56,7 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     )
     parser.add_argument(
         "action",
-        choices=("apply", "up", "down"),
+        choices=("apply", "up", "down", "status", "plan"),
         help="Action to perform",
     )
     parser.add_argument(
@@ -71,6 +75,26 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         default="shell",
         help="Operational mode for the chosen action (default: shell)",
     )
+    parser.add_argument(
+        "--converge",
+        action="store_true",
+        help="Skip everything that is already in place on this system (apply action only)",
+    )
+    parser.add_argument(
+        "--show",
+        action="store_true",
+        help="Print the execution plan (plan action only; default if --dot is not given)",
+    )
+    parser.add_argument(
+        "--dot",
+        default=None,
+        help="Path to write the execution plan to as Graphviz DOT, or - for stdout (plan action only)",
+    )
+    parser.add_argument(
+        "--events",
+        default=None,
+        help="Path to write structured events to as JSON lines (default: none)",
+    )
     log_level_group = parser.add_mutually_exclusive_group()
     log_level_group.add_argument(
         "--debug",
@@ -102,6 +126,23 @@ def load_spec(specification: Optional[str]) -> Dict[str, Any]:
         return json.load(f)
 
 
+def show_plan(
+    config: Configuration,
+    graph: Graph,
+    show: bool,
+    dot: Optional[str],
+):
+    plan = Plan(CommandContext(config, graph))
+    if show or not dot:
+        print(render_text(plan))
+    if dot == "-":
+        print(render_dot(plan))
+    elif dot:
+        with open(dot, "w", encoding="utf-8") as f:
+            f.write(render_dot(plan))
+            f.write("\n")
+
+
 def main(argv):
     args = parse_args(argv)
 
@@ -110,7 +151,25 @@ def main(argv):
     config = load_config(args.config)
     graph = Graph(parse(load_spec(args.specification)))
 
-    run(config, graph, args.action, args.mode)
+    try:
+        if args.action == "plan":
+            show_plan(config, graph, args.show, args.dot)
+        elif args.events:
+            with open(args.events, "w", encoding="utf-8") as events_file:
+                events = EventLog([LoggingEventSink(), JsonEventSink(events_file)])
+                run(
+                    config,
+                    graph,
+                    args.action,
+                    args.mode,
+                    events=events,
+                    converge=args.converge,
+                )
+        else:
+            run(config, graph, args.action, args.mode, converge=args.converge)
+    except DriftError as ex:
+        logging.error("%s", ex)
+        return 1
 
     return 0
 
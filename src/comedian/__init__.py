@@ -1,9 +1,13 @@
-from comedian.action import make_action
+from typing import Optional
+
+from comedian.action import BatchingCommandHandler, make_action
 from comedian.command import CommandContext
 from comedian.configuration import Configuration
+from comedian.event import EventLog
 from comedian.graph import Graph
 from comedian.mode import make_mode
 from comedian.specification import Specification
+from comedian.state import probe_state
 
 
 def run(
@@ -11,7 +15,13 @@ def run(
     graph: Graph[Specification],
     action_name: str,
     mode_name: str,
+    events: Optional[EventLog] = None,
+    converge: bool = False,
 ):
-    action = make_action(action_name, CommandContext(config, graph))
+    # Only the "apply" action converges, so only it needs a snapshot.
+    state = probe_state() if converge and action_name == "apply" else None
+    action = make_action(
+        action_name, CommandContext(config, graph, events=events, state=state)
+    )
     mode = make_mode(mode_name)
-    action(mode, graph.walk())
+    action(BatchingCommandHandler(mode), graph)
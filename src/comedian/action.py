@@ -3,9 +3,23 @@ Action API for encapsulating the command-generation of different named tasks.
 """
 
 from abc import ABC, abstractmethod
-from typing import Iterable, Iterator, Optional
-
-from comedian.command import Command, CommandContext, CommandGenerator
+from itertools import chain
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Reversible,
+    Set,
+    Tuple,
+)
+
+from comedian.command import Command, CommandContext, CommandGenerator, wait_job
+from comedian.event import Event
+from comedian.state import read_state
 
 
 class ActionCommandGenerator:
@@ -15,18 +29,27 @@ class ActionCommandGenerator:
 
     def __init__(
         self,
+        wipe: Optional[CommandGenerator] = None,
         apply: Optional[CommandGenerator] = None,
         post_apply: Optional[CommandGenerator] = None,
         up: Optional[CommandGenerator] = None,
         pre_down: Optional[CommandGenerator] = None,
         down: Optional[CommandGenerator] = None,
     ):
+        self.wipe = wipe
         self.apply = apply
         self.post_apply = post_apply
         self.up = up
         self.pre_down = pre_down
         self.down = down
 
+    def generate_wipe_commands(
+        self,
+        context: CommandContext,
+    ) -> Iterator[Command]:
+        if self.wipe:
+            yield from self.wipe(context)
+
     def generate_apply_commands(
         self,
         context: CommandContext,
@@ -85,16 +108,81 @@ class ActionCommandHandler(ABC):
         pass
 
 
+class BatchingCommandHandler(ActionCommandHandler):
+    """
+    Object that merges consecutive batchable Commands before passing them on to
+    another handler, so that tools which accept several objects at once (such as
+    the LVM commands) are only run, and only scan their devices, once.
+
+    A batch is held back until a Command that cannot join it arrives, or the
+    Action ends. Generators announced while a batch is held are passed on just
+    before the batch itself.
+    """
+
+    def __init__(self, handler: ActionCommandHandler):
+        self.handler = handler
+        self._batch: Optional[Command] = None
+        self._count = 0
+        self._generators: List[ActionCommandGenerator] = []
+
+    def on_begin(self, context: CommandContext):
+        self.handler.on_begin(context)
+
+    def on_generator(self, context: CommandContext, generator: ActionCommandGenerator):
+        if self._batch is None:
+            self.handler.on_generator(context, generator)
+        else:
+            self._generators.append(generator)
+
+    def on_command(self, context: CommandContext, command: Command):
+        if self._batch is not None:
+            merged = self._batch.merge(command)
+            if merged is not None:
+                self._batch = merged
+                self._count += 1
+                return
+            self._flush(context)
+
+        if not command.batchable():
+            self.handler.on_command(context, command)
+        else:
+            self._batch = command
+            self._count = 1
+
+    def on_end(self, context: CommandContext):
+        self._flush(context)
+        self.handler.on_end(context)
+
+    def _flush(self, context: CommandContext):
+        batch = self._batch
+        if batch is None:
+            return
+        for generator in self._generators:
+            self.handler.on_generator(context, generator)
+        if self._count > 1:
+            context.events.emit(
+                Event("batch", argv=batch.cmd, message=f"{self._count} commands")
+            )
+        self.handler.on_command(context, batch)
+        self._batch = None
+        self._count = 0
+        self._generators = []
+
+
 class Action(ABC):
     """
     Base class for all objects that will encapsule command-generation.
+
+    Actions may traverse their generators several times, in either direction,
+    so they are given a re-iterable collection (such as a Graph) rather than an
+    iterator. Commands are passed to the handler as soon as they are generated.
     """
 
     @abstractmethod
     def __call__(
         self,
         handler: ActionCommandHandler,
-        generators: Iterable[ActionCommandGenerator],
+        generators: Reversible[ActionCommandGenerator],
     ):
         pass
 
@@ -109,6 +197,8 @@ def make_action(name: str, context: CommandContext) -> Action:
         return UpAction(context)
     elif name == "down":
         return DownAction(context)
+    elif name == "status":
+        return StatusAction(context)
     else:
         raise ValueError(f"Unknown action '{name}'")
 
@@ -116,6 +206,20 @@ def make_action(name: str, context: CommandContext) -> Action:
 class ApplyAction(Action):
     """
     Object encapsulating the command-generation for the "apply" action.
+
+    Wipes are started as background jobs, so every wipe whose dependencies are
+    satisfied runs at once (as long as no other running wipe occupies the same
+    physical devices). Each wiped node, and everything depending on it, is
+    applied only after a barrier that waits for all running jobs.
+
+    Like `UpAction`, generators are walked one depth of the graph at a time,
+    with generators of the same type next to each other, so that independent
+    LVM commands (such as creating every logical volume) can be merged.
+
+    When the context holds a snapshot of the system, the action converges: no
+    commands are handled for the nodes that the snapshot shows are already in
+    place, and nodes that exist but are inactive are only brought up (see
+    `converged`).
     """
 
     def __init__(self, context: CommandContext):
@@ -124,32 +228,75 @@ class ApplyAction(Action):
     def __call__(
         self,
         handler: ActionCommandHandler,
-        generators: Iterable[ActionCommandGenerator],
+        generators: Reversible[ActionCommandGenerator],
     ):
-        generators_sequence = list(generators)
+        _begin(self.context, handler)
 
-        handler.on_begin(self.context)
-
-        for specification in generators_sequence:
-            commands = list(specification.generate_apply_commands(self.context))
-            if commands:
-                handler.on_generator(self.context, specification)
-                for command in commands:
-                    handler.on_command(self.context, command)
-
-        for specification in generators_sequence:
-            commands = list(specification.generate_post_apply_commands(self.context))
-            if commands:
-                handler.on_generator(self.context, specification)
-                for command in commands:
-                    handler.on_command(self.context, command)
-
-        handler.on_end(self.context)
+        skipped, inactive = converged(self.context, generators)
+        for generator in generators:
+            name = getattr(generator, "name", id(generator))
+            if name in skipped or name in inactive:
+                self.context.events.emit(
+                    Event(
+                        "converged",
+                        name=getattr(generator, "name", None),
+                        type=generator.__class__.__name__,
+                        message="inactive" if name in inactive else None,
+                    )
+                )
+
+        # Nodes that are in place only recover what later commands rely on
+        # (such as the device of an attached loop device), and inactive nodes
+        # are brought up.
+        quiet: Dict[Any, Optional[_Step]] = dict.fromkeys(skipped | inactive)
+        replacements: Dict[Any, Optional[_Step]] = {
+            **dict.fromkeys(skipped, ActionCommandGenerator.generate_pre_down_commands),
+            **dict.fromkeys(inactive, ActionCommandGenerator.generate_up_commands),
+        }
+        _handle_staged(
+            self.context,
+            handler,
+            _by_depth(generators),
+            [
+                (
+                    "wipe",
+                    _replace(ActionCommandGenerator.generate_wipe_commands, quiet),
+                ),
+                (
+                    "apply",
+                    _replace(
+                        ActionCommandGenerator.generate_apply_commands, replacements
+                    ),
+                ),
+            ],
+        )
+
+        generate_post_apply_commands = _replace(
+            ActionCommandGenerator.generate_post_apply_commands, quiet
+        )
+        for specification in generators:
+            _handle(
+                self.context,
+                handler,
+                "post_apply",
+                specification,
+                generate_post_apply_commands(specification, self.context),
+            )
+
+        _end(self.context, handler)
 
 
 class UpAction(Action):
     """
     Object encapsulating the command-generation for the "up" action.
+
+    Commands that are started as background jobs (such as unlocking encrypted
+    volumes) run concurrently, and everything depending on them waits for a
+    barrier at the end of each walk over the generators.
+
+    Generators are walked one depth of the graph at a time, with generators of
+    the same type next to each other, so that the commands of independent nodes
+    (such as activating every volume group) can be merged into one batch.
     """
 
     def __init__(self, context: CommandContext):
@@ -158,18 +305,18 @@ class UpAction(Action):
     def __call__(
         self,
         handler: ActionCommandHandler,
-        generators: Iterable[ActionCommandGenerator],
+        generators: Reversible[ActionCommandGenerator],
     ):
-        handler.on_begin(self.context)
+        _begin(self.context, handler)
 
-        for generator in generators:
-            commands = list(generator.generate_up_commands(self.context))
-            if commands:
-                handler.on_generator(self.context, generator)
-                for command in commands:
-                    handler.on_command(self.context, command)
+        _handle_staged(
+            self.context,
+            handler,
+            _by_depth(generators),
+            [("up", ActionCommandGenerator.generate_up_commands)],
+        )
 
-        handler.on_end(self.context)
+        _end(self.context, handler)
 
 
 class DownAction(Action):
@@ -183,24 +330,327 @@ class DownAction(Action):
     def __call__(
         self,
         handler: ActionCommandHandler,
-        generators: Iterable[ActionCommandGenerator],
+        generators: Reversible[ActionCommandGenerator],
     ):
-        generators_sequence = list(reversed(list(generators)))
+        _begin(self.context, handler)
+
+        for generator in reversed(generators):
+            _handle(
+                self.context,
+                handler,
+                "pre_down",
+                generator,
+                generator.generate_pre_down_commands(self.context),
+            )
+
+        for generator in reversed(generators):
+            _handle(
+                self.context,
+                handler,
+                "down",
+                generator,
+                generator.generate_down_commands(self.context),
+            )
+
+        _end(self.context, handler)
+
+
+class DriftError(Exception):
+    """
+    Error thrown when the running system does not match a specification.
+    """
 
-        handler.on_begin(self.context)
+    def __init__(self, names: List[str]):
+        super().__init__(f"Missing from the system: {', '.join(names)}")
+        self.names = names
 
-        for generator in generators_sequence:
-            commands = list(generator.generate_pre_down_commands(self.context))
-            if commands:
-                handler.on_generator(self.context, generator)
-                for command in commands:
-                    handler.on_command(self.context, command)
 
-        for generator in generators_sequence:
-            commands = list(generator.generate_down_commands(self.context))
-            if commands:
-                handler.on_generator(self.context, generator)
-                for command in commands:
-                    handler.on_command(self.context, command)
+class StatusAction(Action):
+    """
+    Object encapsulating the "status" action.
+
+    No commands are generated. Instead, every generator that can report its
+    status compares itself with a snapshot of what is active or mounted on the
+    running system, read once from beneath root, and its status is emitted as
+    an event. Any generator that is missing from the system is drift, which
+    fails the action with a DriftError.
+    """
 
-        handler.on_end(self.context)
+    def __init__(self, context: CommandContext, root: str = "/"):
+        self.context = context
+        self.root = root
+
+    def __call__(
+        self,
+        handler: ActionCommandHandler,
+        generators: Reversible[ActionCommandGenerator],
+    ):
+        if self.context.state is None:
+            self.context.state = read_state(self.root)
+
+        missing = []
+        for generator in generators:
+            name = getattr(generator, "name", None)
+            _bind_variables(generator, self.context)
+            status = getattr(generator, "status", None)
+            message = status(self.context) if status else None
+            self.context.events.emit(
+                Event(
+                    "status",
+                    name=name,
+                    type=generator.__class__.__name__,
+                    message=message or "unknown",
+                )
+            )
+            if message == "missing":
+                missing.append(str(name))
+
+        if missing:
+            raise DriftError(missing)
+
+
+_Step = Callable[[ActionCommandGenerator, CommandContext], Iterator[Command]]
+
+
+def converged(
+    context: CommandContext,
+    generators: Iterable[ActionCommandGenerator],
+) -> Tuple[Set[Any], Set[Any]]:
+    """
+    Find the names of the generators that need not be applied, according to
+    the snapshot of the system held by the context (if any): those that are in
+    place, and those that exist but only need to be brought up.
+
+    Generators that can compare themselves with a snapshot have an `exists`
+    method, and those that can be brought up have an `active` method as well.
+    They exist when `exists` says so and everything they depend on exists, and
+    are in place when they are also active. Nodes built upon a node that is
+    brought up cannot be observed until it is, so they are assumed to exist.
+    Generators without an `exists` method are always applied, and exist only
+    when everything they depend on does.
+
+    Generators that capture their devices in shell variables have a
+    `variables` method, which finds the devices the variables would hold in
+    the snapshot, so that the nodes built upon them can be looked up.
+    """
+    # pylint: disable=R0915
+    if context.state is None:
+        return set(), set()
+
+    skipped: Set[Any] = set()
+    inactive: Set[Any] = set()
+    stale: Set[Any] = set()
+    # The nodes that are brought up, and everything built upon them.
+    hidden: Set[Any] = set()
+    for generator in generators:
+        name = getattr(generator, "name", id(generator))
+        _bind_variables(generator, context)
+        dependencies = getattr(generator, "dependencies", ())
+        if any(dependency in stale for dependency in dependencies):
+            stale.add(name)
+            continue
+        exists = getattr(generator, "exists", None)
+        if exists is None:
+            continue
+        assumed = any(dependency in hidden for dependency in dependencies)
+        if not assumed and not exists(context):
+            stale.add(name)
+            continue
+        if _active(generator, context, assumed):
+            skipped.add(name)
+        else:
+            inactive.add(name)
+        if assumed or name in inactive:
+            hidden.add(name)
+    return skipped, inactive
+
+
+def _active(
+    generator: ActionCommandGenerator, context: CommandContext, assumed: bool
+) -> bool:
+    # Nodes that cannot be brought up are live as soon as they exist.
+    active = getattr(generator, "active", None)
+    return active is None or (not assumed and active(context))
+
+
+def _bind_variables(generator: ActionCommandGenerator, context: CommandContext):
+    variables = getattr(generator, "variables", None)
+    if context.state is not None and variables is not None:
+        context.state.variables.update(variables(context))
+
+
+def _replace(generate: _Step, replacements: Dict[Any, Optional[_Step]]) -> _Step:
+    def step(
+        generator: ActionCommandGenerator, context: CommandContext
+    ) -> Iterator[Command]:
+        commands = generate(generator, context)
+        name = getattr(generator, "name", id(generator))
+        if name not in replacements:
+            return commands
+        # Replaced generators are still run, so that the entries they contribute
+        # to fstab and crypttab are kept, but none of their commands are.
+        for _ in commands:
+            pass
+        replacement = replacements[name]
+        return replacement(generator, context) if replacement else iter(())
+
+    return step
+
+
+def _begin(context: CommandContext, handler: ActionCommandHandler):
+    context.events.emit(Event("begin"))
+    handler.on_begin(context)
+
+
+def _end(context: CommandContext, handler: ActionCommandHandler):
+    context.events.emit(Event("end"))
+    handler.on_end(context)
+
+
+def _by_depth(
+    generators: Iterable[ActionCommandGenerator],
+) -> List[ActionCommandGenerator]:
+    # Every generator only depends on generators of a lesser depth, so the
+    # generators within a depth can be reordered freely. Types keep the order
+    # in which they first appear.
+    depths: Dict[Any, int] = {}
+    types: Dict[type, int] = {}
+    ordered = []
+    for index, generator in enumerate(generators):
+        name = getattr(generator, "name", id(generator))
+        dependencies = getattr(generator, "dependencies", ())
+        depths[name] = 1 + max(
+            (depths[dependency] for dependency in dependencies if dependency in depths),
+            default=-1,
+        )
+        type_index = types.setdefault(generator.__class__, len(types))
+        ordered.append(((depths[name], type_index, index), generator))
+    return [generator for _, generator in sorted(ordered, key=lambda item: item[0])]
+
+
+def _handle_staged(
+    context: CommandContext,
+    handler: ActionCommandHandler,
+    generators: Iterable[ActionCommandGenerator],
+    steps: List[Tuple[str, _Step]],
+):
+    # Each walk over the generators is one stage. Within a stage, every
+    # generator whose dependencies have completed works through its steps until
+    # a step starts background jobs; the generator then waits for the barrier at
+    # the end of the stage before continuing in the next one. Generators that do
+    # not start jobs complete within a single stage.
+    progress: Dict[Any, int] = {}
+    completed: Set[Any] = set()
+    while True:
+        waiting: Set[Any] = set()
+        jobs = _stage(context, handler, generators, steps, progress, completed, waiting)
+        if not jobs:
+            break
+        for generator, job in jobs:
+            _handle(context, handler, "wait", generator, [wait_job(job)])
+        completed.update(waiting)
+
+
+def _stage(
+    context: CommandContext,
+    handler: ActionCommandHandler,
+    generators: Iterable[ActionCommandGenerator],
+    steps: List[Tuple[str, _Step]],
+    progress: Dict[Any, int],
+    completed: Set[Any],
+    waiting: Set[Any],
+) -> List[Tuple[ActionCommandGenerator, str]]:
+    # Walk over the generators once, returning the background jobs that were
+    # started. Generators with running jobs are added to waiting rather than
+    # completed, since they only complete after the barrier.
+    jobs: List[Tuple[ActionCommandGenerator, str]] = []
+    busy: Set[str] = set()
+    for generator in generators:
+        name = getattr(generator, "name", id(generator))
+        if name in completed:
+            continue
+        dependencies = getattr(generator, "dependencies", ())
+        if any(dependency not in completed for dependency in dependencies):
+            continue
+
+        step, started = _advance(
+            context, handler, generator, steps, progress.get(name, 0), busy
+        )
+        for command in started:
+            jobs.append((generator, str(command.job)))
+            busy.update(command.resources)
+        progress[name] = step
+        if step == len(steps):
+            (waiting if started else completed).add(name)
+    return jobs
+
+
+def _advance(
+    context: CommandContext,
+    handler: ActionCommandHandler,
+    generator: ActionCommandGenerator,
+    steps: List[Tuple[str, _Step]],
+    step: int,
+    busy: Set[str],
+) -> Tuple[int, List[Command]]:
+    # Work through the steps of a generator, starting at step, until a step
+    # starts background jobs or would start them on busy resources. Returns the
+    # next step to take and the jobs that were started.
+    while step < len(steps):
+        phase, generate = steps[step]
+        commands = generate(generator, context)
+        # Steps that start jobs must do so with their first command, so that
+        # jobs occupying busy resources can be deferred to the next stage before
+        # anything is handled.
+        first = next(commands, None)
+        if first is not None and first.job and busy.intersection(first.resources):
+            break
+        step += 1
+        started = _handle(
+            context,
+            handler,
+            phase,
+            generator,
+            chain([first], commands) if first is not None else commands,
+        )
+        if started:
+            return step, started
+    return step, []
+
+
+def _handle(
+    context: CommandContext,
+    handler: ActionCommandHandler,
+    phase: str,
+    generator: ActionCommandGenerator,
+    commands: Iterable[Command],
+) -> List[Command]:
+    # Events hold references to the existing fields rather than rendering the
+    # generator, which keeps them cheap for EventSinks that filter them out.
+    name = getattr(generator, "name", None)
+    type = generator.__class__.__name__
+
+    # Commands are handled as they are generated, and the generator is only
+    # announced once it has produced its first command.
+    announced = False
+    jobs: List[Command] = []
+    for command in commands:
+        if not announced:
+            context.events.emit(Event("generator", phase=phase, name=name, type=type))
+            handler.on_generator(context, generator)
+            announced = True
+        context.events.emit(
+            Event("command", phase=phase, name=name, type=type, argv=command.cmd)
+        )
+        handler.on_command(context, command)
+        if command.job:
+            jobs.append(command)
+
+    # Later steps can rely on the devices that were actually wiped, but not on
+    # those whose wipe was skipped or generated nothing.
+    if phase == "wipe" and announced and name is not None:
+        context.wiped.add(name)
+
+    # Report the background jobs that were started, so that they can be waited
+    # on later.
+    return jobs
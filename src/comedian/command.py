@@ -3,27 +3,123 @@ Command API for generating shell commands to be run on a system.
 """
 
 import os
+import re
 import shlex
 from abc import ABC, abstractmethod
-from typing import Dict, Iterator, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
 
+from comedian import native
 from comedian.configuration import Configuration
+from comedian.event import EventLog
 from comedian.graph import Graph
+from comedian.state import State
 from comedian.traits import DebugMixin, EqMixin
 
 
 class Command(DebugMixin, EqMixin):
     """
     A container for the arguments of a shell command.
+
+    Commands may also carry a native implementation, which modes that execute
+    commands may invoke in-process instead of running the shell command.
+
+    Commands with a job name are started in the background, and must later be
+    waited on with the Command produced by `wait_job`. The resources of a job
+    name the devices it occupies while it runs.
+
+    Commands that can be batched give the number of leading arguments they
+    share with every command they can be merged with. Consecutive commands that
+    share those arguments are run as one command, with the remaining arguments
+    of each appended in order.
     """
 
-    def __init__(self, cmd: List[str], capture: Optional[str] = None):
+    def __init__(  # pylint: disable=W0621
+        self,
+        cmd: List[str],
+        capture: Optional[str] = None,
+        native: Optional[Callable[["CommandContext"], None]] = None,
+        job: Optional[str] = None,
+        resources: Optional[List[str]] = None,
+        batch: Optional[int] = None,
+    ):
+        if resources is None:
+            resources = []
         self.cmd = cmd
         self.capture = capture
+        self.native = native
+        self.job = job
+        self.resources = resources
+        self.batch = batch
 
     def join(self) -> str:
         return " ".join(self.cmd)
 
+    def batchable(self) -> bool:
+        return self.batch is not None
+
+    def merge(self, other: "Command") -> Optional["Command"]:
+        """
+        Merge another Command into this batch, or return None if the two cannot
+        be run as one.
+        """
+        if (
+            self.batch is None
+            or self.batch != other.batch
+            or self.cmd[: self.batch] != other.cmd[: other.batch]
+        ):
+            return None
+        return Command(self.cmd + other.cmd[other.batch :], batch=self.batch)
+
+    def __fields__(self) -> Iterator[str]:
+        yield from ("cmd", "capture", "job", "resources", "batch")
+
+
+class LvmCommand(Command):
+    """
+    A Command run by LVM that creates volume groups or logical volumes.
+
+    Consecutive LVM commands are merged by feeding them to a single `lvm` shell
+    on stdin, so that LVM only takes its lock and scans the devices once for
+    all of them. The shell exits successfully even when its commands fail, so
+    it is followed by a single report of every volume group and logical volume
+    the commands create, which fails when any of them is missing.
+    """
+
+    def __init__(
+        self,
+        cmd: List[str],
+        volume_groups: Optional[List[str]] = None,
+        logical_volumes: Optional[List[str]] = None,
+        script: Optional[List[List[str]]] = None,
+    ):
+        super().__init__(cmd)
+        self.volume_groups = volume_groups or []
+        self.logical_volumes = logical_volumes or []
+        self.script = script or [cmd]
+
+    def batchable(self) -> bool:
+        return True
+
+    def merge(self, other: Command) -> Optional[Command]:
+        if not isinstance(other, LvmCommand):
+            return None
+        script = self.script + other.script
+        volume_groups = self.volume_groups + other.volume_groups
+        logical_volumes = self.logical_volumes + other.logical_volumes
+
+        cmd = ["printf", quote_subcommand("%s\\n")]
+        cmd += [quote_subcommand(" ".join(line)) for line in script]
+        cmd += ["|", "lvm"]
+        if volume_groups:
+            cmd += ["&&", "vgs", "--noheadings", "--options=vg_name", *volume_groups]
+        if logical_volumes:
+            cmd += ["&&", "lvs", "--noheadings", "--options=lv_name", *logical_volumes]
+        return LvmCommand(cmd, volume_groups, logical_volumes, script)
+
+    def __fields__(self) -> Iterator[str]:
+        yield from super().__fields__()
+        yield from ("volume_groups", "logical_volumes", "script")
+
 
 class CommandContext(DebugMixin):
     """
@@ -34,10 +130,22 @@ class CommandContext(DebugMixin):
         self,
         config: Configuration,
         graph: Graph,
+        events: Optional[EventLog] = None,
+        state: Optional[State] = None,
     ):
+        if events is None:
+            events = EventLog()
         self.config = config
         self.graph = graph
-        self.env: Dict[str, str] = dict()
+        self.events = events
+        # A snapshot of the system, given only when converging.
+        self.state = state
+        self.env: Dict[str, str] = {}
+        self.jobs: Dict[str, Callable[[], None]] = {}
+        self.crypttab: List[str] = []
+        self.fstab: List[str] = []
+        # The nodes whose devices were wiped by the action so far.
+        self.wiped: Set[str] = set()
 
 
 class CommandGenerator(ABC):
@@ -69,12 +177,18 @@ def cp(source: str, destination: str) -> Command:
             quote_argument(source),
             quote_argument(destination),
             "--preserve=mode,ownership",
-        ]
+        ],
+        native=_native(native.copy, source, destination),
     )
 
 
 def chmod(mode: str, *paths: str) -> Command:
-    return Command(["chmod", mode] + [quote_argument(path) for path in paths])
+    return Command(
+        ["chmod", mode] + [quote_argument(path) for path in paths],
+        native=(
+            _native(native.chmod, int(mode, 8), *paths) if _octal_mode(mode) else None
+        ),
+    )
 
 
 def chown(
@@ -82,33 +196,26 @@ def chown(
     group: Optional[str],
     *paths: str,
 ) -> Command:
-    own = ""
-    if owner:
-        own += owner
-    if group:
-        own += f":{group}"
-    return Command(["chown", own] + [quote_argument(path) for path in paths])
-
-
-def crypttab_append(context: CommandContext, crypttab_entry: str) -> Command:
-    crypttab_filepath = context.config.tmp_path("/etc/crypttab")
     return Command(
-        [
-            context.config.shell,
-            "-c",
-            quote_subcommand(f'echo -e "{crypttab_entry}" >> {crypttab_filepath}'),
-        ]
+        ["chown", _owner_group(owner, group)]
+        + [quote_argument(path) for path in paths],
+        native=_native(native.chown, owner, group, *paths),
     )
 
 
-def fstab_append(context: CommandContext, fstab_entry: str) -> Command:
-    fstab_filepath = context.config.tmp_path("/etc/fstab")
+def crypttab_append(context: CommandContext, crypttab_entry: str):
+    context.crypttab.append(crypttab_entry)
+
+
+def fstab_append(context: CommandContext, fstab_entry: str):
+    context.fstab.append(fstab_entry)
+
+
+def fallocate(length: str, path: str) -> Command:
+    size = native.parse_size(length)
     return Command(
-        [
-            context.config.shell,
-            "-c",
-            quote_subcommand(f'echo -e "{fstab_entry}" >> {fstab_filepath}'),
-        ]
+        ["fallocate", "--length", length, quote_argument(path)],
+        native=_native(native.fallocate, size, path) if size is not None else None,
     )
 
 
@@ -139,16 +246,56 @@ def identify_device_path(identify: str, device_path: str) -> str:
         raise RuntimeError(f"Unexpected value for identify: '{identify}'")
 
 
+def install_file(
+    context: CommandContext,
+    path: str,
+    entries: List[str],
+    mode: str,
+    owner: Optional[str],
+    group: Optional[str],
+) -> Command:
+    """
+    Write the entries to a temporary sibling of path in a single shell
+    invocation, and then rename it over path so that readers never observe a
+    partially-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    content = "".join(f"{entry}\\n" for entry in entries)
+    own = _owner_group(owner, group)
+    steps = [f'printf "%b" "{content}" > {quote_argument(tmp_path)}']
+    steps.append(f"chmod {mode} {quote_argument(tmp_path)}")
+    if own:
+        steps.append(f"chown {own} {quote_argument(tmp_path)}")
+    steps.append(f"mv {quote_argument(tmp_path)} {quote_argument(path)}")
+    return Command(
+        [
+            context.config.shell,
+            "-c",
+            quote_subcommand(" && ".join(steps)),
+        ]
+    )
+
+
 def ln(source: str, dest: str, symbolic: bool = False) -> Command:
     cmd = ["ln", "--force"]
     if symbolic:
         cmd.append("--symbolic")
     cmd += [quote_argument(source), quote_argument(dest)]
-    return Command(cmd)
+    return Command(cmd, native=_native(native.link, source, dest, symbolic))
 
 
 def mkdir(*paths: str) -> Command:
-    return Command(["mkdir", "--parents"] + [quote_argument(path) for path in paths])
+    return Command(
+        ["mkdir", "--parents"] + [quote_argument(path) for path in paths],
+        native=_native(native.makedirs, *paths),
+    )
+
+
+def job_variable(job: str) -> str:
+    """
+    The name of the shell variable holding the process id of a background job.
+    """
+    return "job_" + re.sub(r"\W", "_", job)
 
 
 def parted(*args: str, align: Optional[str] = None) -> Command:
@@ -159,6 +306,54 @@ def parted(*args: str, align: Optional[str] = None) -> Command:
     return Command(cmd + list(args))
 
 
+def touch(*paths: str) -> Command:
+    return Command(
+        ["touch"] + [quote_argument(path) for path in paths],
+        native=_native(native.touch, *paths),
+    )
+
+
+def truncate(size: str, *paths: str) -> Command:
+    length = native.parse_size(size)
+    return Command(
+        ["truncate", f"--size={size}"] + [quote_argument(path) for path in paths],
+        native=(
+            _native(native.truncate, length, *paths) if length is not None else None
+        ),
+    )
+
+
+def wait_job(job: str) -> Command:
+    return Command(
+        ["wait", f'"${job_variable(job)}"'],
+        native=lambda context: context.jobs.pop(job)(),
+    )
+
+
+def _native(
+    function: Callable[..., None], *args: Any
+) -> Optional[Callable[[CommandContext], None]]:
+    # Arguments that the shell would expand (such as captured variables) can
+    # only be handled by running the shell command itself.
+    for arg in args:
+        if isinstance(arg, str) and any(c in arg for c in "$`\\"):
+            return None
+    return lambda context: function(*args)
+
+
+def _octal_mode(mode: str) -> bool:
+    return bool(mode) and all(c in "01234567" for c in mode)
+
+
+def _owner_group(owner: Optional[str], group: Optional[str]) -> str:
+    own = ""
+    if owner:
+        own += owner
+    if group:
+        own += f":{group}"
+    return own
+
+
 def _identify_device_path_cmd(device_path: str, root: str) -> str:
     return f"find {root} -type l -lname $(realpath --relative-to={root} {quote_argument(device_path)})"
 
@@ -11,12 +11,20 @@ class Configuration(DebugMixin, EqMixin):
         random_device: str,
         media_dir: str,
         tmp_dir: str,
+        wipe_strategy: str = "randomize",
+        sys_dir: str = "/sys",
+        wipe_engine: str = "native",
+        wipe_threads: int = 4,
     ):
         self.shell = shell
         self.dd_bs = dd_bs
         self.random_device = random_device
         self.media_dir = media_dir
         self.tmp_dir = tmp_dir
+        self.wipe_strategy = wipe_strategy
+        self.sys_dir = sys_dir
+        self.wipe_engine = wipe_engine
+        self.wipe_threads = wipe_threads
 
     def media_path(self, path: str) -> str:
         return _join(self.media_dir, path)
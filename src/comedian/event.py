@@ -0,0 +1,133 @@
+"""
+Event API for reporting the progress of the action pipeline.
+
+Events are small records of structured fields that are produced for every
+generator and command that an Action handles. They are cheap to create, and are
+only rendered to text (or JSON) when an EventSink actually consumes them.
+"""
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, IO, Iterable, List, Optional
+
+__all__ = [
+    "Event",
+    "EventLog",
+    "EventSink",
+    "JsonEventSink",
+    "LoggingEventSink",
+]
+
+
+class Event:
+    """
+    A single structured event within the action pipeline.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        phase: Optional[str] = None,
+        name: Optional[str] = None,
+        type: Optional[str] = None,
+        argv: Optional[List[str]] = None,
+        message: Optional[str] = None,
+    ):
+        self.time = time.time()
+        self.kind = kind
+        self.phase = phase
+        self.name = name
+        self.type = type
+        self.argv = argv
+        self.message = message
+
+    def fields(self) -> Dict[str, Any]:
+        fields = {
+            "time": self.time,
+            "kind": self.kind,
+            "phase": self.phase,
+            "name": self.name,
+            "type": self.type,
+            "argv": self.argv,
+            "message": self.message,
+        }
+        return {key: value for key, value in fields.items() if value is not None}
+
+    def __str__(self) -> str:
+        parts = [self.kind]
+        if self.phase:
+            parts.append(self.phase)
+        if self.name is not None:
+            parts.append(self.name)
+        if self.type:
+            parts.append(f"({self.type})")
+        rendered = " ".join(parts)
+        if self.argv is not None:
+            rendered += ": " + " ".join(self.argv)
+        if self.message is not None:
+            rendered += ": " + self.message
+        return rendered
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class EventSink(ABC):
+    """
+    Base class for all objects that will consume Events.
+    """
+
+    @abstractmethod
+    def __call__(self, event: Event):
+        pass
+
+
+class LoggingEventSink(EventSink):
+    """
+    Object that renders Events as log messages.
+    """
+
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def __call__(self, event: Event):
+        # Formatting is deferred to the logging module, so Events are never
+        # rendered when the log level filters them out.
+        logging.log(self.level, "%s", event)
+
+
+class JsonEventSink(EventSink):
+    """
+    Object that writes Events as JSON lines to a stream.
+    """
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+
+    def __call__(self, event: Event):
+        self.stream.write(json.dumps(event.fields()))
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class EventLog:
+    """
+    A collection of EventSinks that Events are dispatched to.
+
+    Events may be emitted from several threads (such as those following the
+    progress of background jobs), so they are dispatched one at a time.
+    """
+
+    def __init__(self, sinks: Optional[Iterable[EventSink]] = None):
+        if sinks is None:
+            sinks = [LoggingEventSink()]
+        self.sinks = list(sinks)
+        self._lock = threading.Lock()
+
+    def emit(self, event: Event):
+        with self._lock:
+            for sink in self.sinks:
+                sink(event)
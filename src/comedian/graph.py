@@ -8,10 +8,9 @@ structures between nodes according to their declared references.
 TODO: Add cycle detection to graph construction
 """
 
-import copy
 import logging
 import os
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, deque, OrderedDict
 from typing import (
     Any,
     Callable,
@@ -174,46 +173,104 @@ class Graph(DebugMixin, Generic[GraphNodeT]):
                 if reference_name not in self._nodes:
                     raise GraphEdgeError(name, reference_name)
 
+    def __iter__(self) -> Iterator[GraphNodeT]:
+        return self.walk()
+
+    def __reversed__(self) -> Iterator[GraphNodeT]:
+        return self.reverse_walk()
+
     def walk(self) -> Iterator[GraphNodeT]:
         """
         Traverse this Graph, yielding GraphNodes in dependency order.
         """
 
-        visited: Set[str] = set()
-        visitable: List[str] = list()
-        not_visited = {
-            key: copy.deepcopy(value) for key, value in self._dependencies.items()
-        }
+        yield from self._walk(self._dependencies, self._reverse_dependencies, False)
+
+    def reverse_walk(self) -> Iterator[GraphNodeT]:
+        """
+        Traverse this Graph, yielding GraphNodes in reverse-dependency order.
+        That is, every GraphNode is yielded before any of its dependencies.
+        """
 
-        # Mark all nodes without dependencies as immediately-visitable.
-        for name, dependencies in not_visited.items():
-            if not dependencies:
-                visitable.append(name)
+        yield from self._walk(self._reverse_dependencies, self._dependencies, True)
 
-        # Remove all nodes that are now visitable from not_visited.
-        for name in visitable:
-            not_visited.pop(name, None)
+    def _walk(
+        self,
+        dependencies: Mapping[str, Set[str]],
+        reverse_dependencies: Mapping[str, Set[str]],
+        reverse: bool,
+    ) -> Iterator[GraphNodeT]:
+        # Order ties by declaration order (or its reverse), so that walks are
+        # deterministic regardless of set iteration order.
+        order = {name: index for index, name in enumerate(self._nodes)}
+
+        def sort_key(name: str) -> int:
+            return -order[name] if reverse else order[name]
+
+        # Track the number of outstanding dependencies of each GraphNode, and
+        # mark all nodes without dependencies as immediately-visitable.
+        outstanding = {
+            name: len(dependencies.get(name, ()))
+            for name in sorted(self._nodes, key=sort_key)
+        }
+        visitable = deque(name for name, count in outstanding.items() if count == 0)
+        visited: Set[str] = set()
 
-        # Iteratively yield the next visitable GraphNode, moving elements from
-        # not_visited to visitable as their dependencies are visited.
+        # Iteratively yield the next visitable GraphNode, using the
+        # reverse-mapping to find the nodes that have just had their last
+        # outstanding dependency visited.
         while visitable:
-            visited_name = visitable.pop(0)
+            visited_name = visitable.popleft()
             yield self._nodes[visited_name]
 
             visited.add(visited_name)
-            not_visited.pop(visited_name, None)
-            for not_visited_name, dependencies in not_visited.items():
-                # Mark this not_visited element as visitable if we have just
-                # visited its last outstanding dependency.
-                if dependencies:
-                    dependencies.discard(visited_name)
-                    if not dependencies:
-                        visitable.append(not_visited_name)
+            del outstanding[visited_name]
+            for name in sorted(
+                reverse_dependencies.get(visited_name, ()), key=sort_key
+            ):
+                outstanding[name] -= 1
+                if not outstanding[name]:
+                    visitable.append(name)
 
         # Indicate that walking completed unsuccessfully, reporting the
         # GraphNodes that were not visited.
-        if not_visited:
-            raise GraphWalkError(dict(not_visited))
+        if outstanding:
+            raise GraphWalkError(
+                {
+                    name: set(dependencies.get(name, ())) - visited
+                    for name in sorted(outstanding, key=order.__getitem__)
+                }
+            )
+
+    def node(self, name: str) -> GraphNodeT:
+        """
+        Find the GraphNode with the given name.
+        """
+
+        try:
+            return self._nodes[name]
+        except KeyError as ex:
+            raise GraphResolveError(name) from ex
+
+    def roots(self, name: str) -> Set[str]:
+        """
+        Find the names of all GraphNodes without dependencies that the named
+        GraphNode transitively depends on (or the node itself, if it has no
+        dependencies).
+        """
+
+        roots: Set[str] = set()
+        visited: Set[str] = set()
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            if not self._dependencies[current]:
+                roots.add(current)
+            pending.extend(self._dependencies[current])
+        return roots
 
     def resolve_device(self, name: str) -> Optional[str]:
         """
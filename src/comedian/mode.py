@@ -3,12 +3,17 @@ Mode API for encapsulating the Generator and Command handling of different named
 operational modes.
 """
 
-import logging
+import os
+import re
 import subprocess
+import threading
+import time
 from abc import abstractmethod
+from typing import Callable, IO, List
 
 from comedian.action import ActionCommandHandler, ActionCommandGenerator
-from comedian.command import Command, CommandContext
+from comedian.command import Command, CommandContext, job_variable
+from comedian.event import Event
 
 __all__ = ["make_mode"]
 
@@ -58,10 +63,15 @@ class ExecMode(Mode):
         pass
 
     def on_generator(self, context: CommandContext, generator: ActionCommandGenerator):
-        logging.info("%s", generator)
+        pass
 
     def on_command(self, context: CommandContext, command: Command):
-        logging.info("%s", command)
+        if command.job:
+            context.jobs[command.job] = _start_job(context, command)
+            return
+        if command.native:
+            command.native(context)
+            return
         cmd_str = command.join()
         if command.capture:
             result = subprocess.check_output(
@@ -84,10 +94,12 @@ class DryrunMode(Mode):
         pass
 
     def on_generator(self, context: CommandContext, generator: ActionCommandGenerator):
-        logging.info("%s", generator)
+        pass
 
     def on_command(self, context: CommandContext, command: Command):
-        logging.info("%s", command)
+        # Commands are reported by the Action's events; there is nothing else to
+        # do with them when not executing.
+        pass
 
     def on_end(self, context: CommandContext):
         pass
@@ -103,17 +115,106 @@ class ShellMode(Mode):
         print("set -xeuo pipefail")
 
     def on_generator(self, context: CommandContext, generator: ActionCommandGenerator):
-        logging.info("%s", generator)
         print()
         print("#", generator)
 
     def on_command(self, context: CommandContext, command: Command):
-        logging.info("%s", command)
         cmd_str = command.join()
-        if command.capture:
+        if command.job:
+            print(f"{cmd_str} &")
+            print(f"{job_variable(command.job)}=$!")
+        elif command.capture:
             print(f'export {command.capture}="$({cmd_str})"')
         else:
             print(cmd_str)
 
     def on_end(self, context: CommandContext):
         pass
+
+
+def _start_job(context: CommandContext, command: Command) -> Callable[[], None]:
+    """
+    Start a background job, returning a Callable that waits for it to finish.
+
+    Progress that the job reports on stderr (such as that of `dd
+    status=progress`) is emitted as events while it runs.
+    """
+    job = str(command.job)
+    if command.native:
+        return _start_native_job(context, job, command.native)
+
+    cmd_str = command.join()
+    start = time.monotonic()
+    # The process outlives this function, and is waited for by the Callable.
+    process = subprocess.Popen(  # pylint: disable=R1732
+        cmd_str, env=context.env.copy(), shell=True, stderr=subprocess.PIPE
+    )
+    reader = threading.Thread(
+        target=_report_progress,
+        args=(context, job, process.stderr),
+        name=job,
+        daemon=True,
+    )
+    reader.start()
+
+    def wait():
+        reader.join()
+        returncode = process.wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd_str)
+        context.events.emit(
+            Event(
+                "job", name=job, message=f"finished in {time.monotonic() - start:.1f}s"
+            )
+        )
+
+    return wait
+
+
+def _start_native_job(
+    context: CommandContext,
+    job: str,
+    native: Callable[[CommandContext], None],
+) -> Callable[[], None]:
+    start = time.monotonic()
+    errors: List[BaseException] = []
+
+    def run():
+        try:
+            native(context)
+        except BaseException as ex:  # pylint: disable=W0703
+            errors.append(ex)
+
+    thread = threading.Thread(target=run, name=job, daemon=True)
+    thread.start()
+
+    def wait():
+        thread.join()
+        if errors:
+            raise errors[0]
+        context.events.emit(
+            Event(
+                "job", name=job, message=f"finished in {time.monotonic() - start:.1f}s"
+            )
+        )
+
+    return wait
+
+
+def _report_progress(context: CommandContext, job: str, stream: IO[bytes]):
+    # Progress reports are usually terminated by carriage-returns rather than
+    # newlines, so that they overwrite each other on a terminal.
+    fd = stream.fileno()
+    pending = b""
+    for chunk in iter(lambda: os.read(fd, 4096), b""):
+        *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+        for line in lines:
+            _report_line(context, job, line)
+    _report_line(context, job, pending)
+    stream.close()
+
+
+def _report_line(context: CommandContext, job: str, line: bytes):
+    message = line.decode(errors="replace").strip()
+    if message:
+        context.events.emit(Event("progress", name=job, message=message))
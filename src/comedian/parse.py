@@ -17,6 +17,7 @@ from comedian.specifications import (
     Filesystem,
     Link,
     LoopDevice,
+    LvmCache,
     LvmLogicalVolume,
     LvmPhysicalVolume,
     LvmVolumeGroup,
@@ -105,7 +106,7 @@ def parse(spec: Mapping[str, Any]) -> Iterator[Specification]:
     """
     Parse a spec and yield the specifications described within.
     """
-    # pylint: disable=R0912
+    # pylint: disable=R0912,R0914
 
     validate_spec(
         "Root",
@@ -118,6 +119,7 @@ def parse(spec: Mapping[str, Any]) -> Iterator[Specification]:
             "filesystems",
             "links",
             "loop_devices",
+            "lvm_caches",
             "lvm_logical_volumes",
             "lvm_physical_volumes",
             "lvm_volume_groups",
@@ -151,6 +153,9 @@ def parse(spec: Mapping[str, Any]) -> Iterator[Specification]:
     for loop_device_spec in spec.get("loop_devices", []):
         yield from parse_loop_device(loop_device_spec)
 
+    for lvm_cache_spec in spec.get("lvm_caches", []):
+        yield from parse_lvm_cache(lvm_cache_spec)
+
     for lvm_logical_volume_spec in spec.get("lvm_logical_volumes", []):
         yield from parse_lvm_logical_volume(lvm_logical_volume_spec)
 
@@ -248,14 +253,24 @@ def split_spec(
     return lhs, rhs
 
 
+def child_spec(
+    spec: Mapping[str, Any], name: str, key: str, parent_key: str, parent: str
+) -> Dict[str, Any]:
+    """
+    Find the spec nested at key within spec, which refers to its parent by
+    parent_key. Nested specs cannot set parent_key themselves.
+    """
+    nested_spec = spec[key]
+    validate_spec(name, nested_spec, illegal={parent_key}, ignore=True)
+    return {parent_key: parent, **nested_spec}
+
+
 def parse_block_device(
     name: str,
     spec: Mapping[str, Any],
     device: str,
     identify: str,
 ) -> Iterator[Specification]:
-    # pylint: disable=R0915
-
     keys = {
         "partition_table",
         "filesystem",
@@ -278,51 +293,28 @@ def parse_block_device(
         )
 
     if "filesystem" in spec:
-        filesystem_spec = spec["filesystem"]
-        validate_spec(
-            "Filesystem",
-            filesystem_spec,
-            illegal={"device"},
-            ignore=True,
-        )
         yield from parse_filesystem(
-            {"device": device, **filesystem_spec}, spec.get("identify", identify)
+            child_spec(spec, "Filesystem", "filesystem", "device", device),
+            spec.get("identify", identify),
         )
 
     if "crypt_volume" in spec:
-        crypt_volume_spec = spec["crypt_volume"]
-        validate_spec(
-            "CryptVolume",
-            crypt_volume_spec,
-            illegal={"device"},
-            ignore=True,
-        )
         yield from parse_crypt_volume(
-            {"device": device, **crypt_volume_spec}, spec.get("identify", identify)
+            child_spec(spec, "CryptVolume", "crypt_volume", "device", device),
+            spec.get("identify", identify),
         )
 
     if "swap_volume" in spec:
-        swap_volume_spec = spec["swap_volume"]
-        validate_spec(
-            "SwapVolume",
-            swap_volume_spec,
-            illegal={"device"},
-            ignore=True,
-        )
         yield from parse_swap_volume(
-            {"device": device, **swap_volume_spec}, spec.get("identify", identify)
+            child_spec(spec, "SwapVolume", "swap_volume", "device", device),
+            spec.get("identify", identify),
         )
 
     if "lvm_physical_volume" in spec:
-        lvm_physical_volume_spec = spec["lvm_physical_volume"]
-        validate_spec(
-            "LvmPhysicalVolume",
-            lvm_physical_volume_spec,
-            illegal={"device"},
-            ignore=True,
-        )
         yield from parse_lvm_physical_volume(
-            {"device": device, **lvm_physical_volume_spec}
+            child_spec(
+                spec, "LvmPhysicalVolume", "lvm_physical_volume", "device", device
+            )
         )
 
 
@@ -334,11 +326,16 @@ def parse_physical_device(spec: Mapping[str, Any]) -> Iterator[Specification]:
         name,
         spec,
         required={"name"},
+        allowed={"dd_bs", "direct_io"},
         ignore=True,
     )
 
     physical_device_name = physical_device_spec["name"]
-    yield PhysicalDevice(name=physical_device_name)
+    yield PhysicalDevice(
+        name=physical_device_name,
+        dd_bs=physical_device_spec.get("dd_bs"),
+        direct_io=physical_device_spec.get("direct_io"),
+    )
 
     if block_device_spec:
         yield from parse_block_device(
@@ -359,13 +356,7 @@ def parse_partition_table(
     )
 
     partition_table_name = spec["name"]
-    yield PartitionTable(
-        name=partition_table_name,
-        device=spec["device"],
-        type=spec["type"],
-        glue=spec.get("glue"),
-    )
-
+    partition_specifications = []
     for index, partition_spec in enumerate(spec["partitions"]):
         validate_spec(
             "Partition",
@@ -375,14 +366,36 @@ def parse_partition_table(
         )
 
         number = index + 1
-        yield from parse_partition(
-            {
-                "name": f"{partition_table_name}:{number}",
-                "partition_table": partition_table_name,
-                "number": number,
-                **partition_spec,
-            }
-        )
+        partition_specifications.append(
+            list(
+                parse_partition(
+                    {
+                        "name": f"{partition_table_name}:{number}",
+                        "partition_table": partition_table_name,
+                        "number": number,
+                        **partition_spec,
+                    }
+                )
+            )
+        )
+
+    # The PartitionTable creates all of its partitions, so it needs every
+    # Partition up-front.
+    yield PartitionTable(
+        name=partition_table_name,
+        device=spec["device"],
+        type=spec["type"],
+        glue=spec.get("glue"),
+        partitions=[
+            specification
+            for specifications in partition_specifications
+            for specification in specifications
+            if isinstance(specification, Partition)
+            and specification.partition_table == partition_table_name
+        ],
+    )
+    for specifications in partition_specifications:
+        yield from specifications
 
 
 def parse_partition(spec: Mapping[str, Any]) -> Iterator[Specification]:
@@ -425,15 +438,38 @@ def parse_raid_volume(spec: Mapping[str, Any]) -> Iterator[Specification]:
         name,
         spec,
         required={"name", "devices", "level", "metadata"},
+        allowed={
+            "assume_clean",
+            "bitmap",
+            "bitmap_chunk",
+            "sync_speed_min",
+            "sync_speed_max",
+            "chunk",
+            "layout",
+            "consistency_policy",
+            "write_journal",
+        },
         ignore=True,
     )
 
+    if "bitmap_chunk" in spec and raid_volume_spec.get("bitmap", "none") == "none":
+        raise FoundIncompatibleKeysError(name, dict(spec), {"bitmap", "bitmap_chunk"})
+
     raid_volume_name = raid_volume_spec["name"]
     yield RaidVolume(
         name=raid_volume_name,
         devices=raid_volume_spec["devices"],
         level=raid_volume_spec["level"],
         metadata=raid_volume_spec["metadata"],
+        assume_clean=raid_volume_spec.get("assume_clean"),
+        bitmap=raid_volume_spec.get("bitmap"),
+        bitmap_chunk=raid_volume_spec.get("bitmap_chunk"),
+        sync_speed_min=raid_volume_spec.get("sync_speed_min"),
+        sync_speed_max=raid_volume_spec.get("sync_speed_max"),
+        chunk=raid_volume_spec.get("chunk"),
+        layout=raid_volume_spec.get("layout"),
+        consistency_policy=raid_volume_spec.get("consistency_policy"),
+        write_journal=raid_volume_spec.get("write_journal"),
     )
 
     if block_device_spec:
@@ -452,13 +488,29 @@ def parse_crypt_volume(
         name,
         spec,
         required={"name", "device", "type", "keyfile"},
-        allowed={"identify", "keysize", "password", "options"},
+        allowed={
+            "identify",
+            "keysize",
+            "password",
+            "options",
+            "wipe_strategy",
+            "cipher",
+            "cipher_keysize",
+            "sector_size",
+            "perf",
+            "pbkdf",
+            "pbkdf_memory",
+            "iter_time",
+            "pbkdf_parallel",
+        },
         ignore=True,
     )
 
     keyfile = crypt_volume_spec["keyfile"]
     if ephemeral_keyfile(keyfile) == ("keysize" in spec):
         raise FoundIncompatibleKeysError(name, dict(spec), {"keyfile", "keysize"})
+    if "cipher_keysize" in spec and crypt_volume_spec.get("cipher", "auto") == "auto":
+        raise FoundIncompatibleKeysError(name, dict(spec), {"cipher", "cipher_keysize"})
 
     crypt_volume_name = crypt_volume_spec["name"]
     yield CryptVolume(
@@ -470,6 +522,15 @@ def parse_crypt_volume(
         keysize=crypt_volume_spec.get("keysize"),
         password=crypt_volume_spec.get("password"),
         options=crypt_volume_spec.get("options", []),
+        wipe_strategy=crypt_volume_spec.get("wipe_strategy"),
+        cipher=crypt_volume_spec.get("cipher"),
+        cipher_keysize=crypt_volume_spec.get("cipher_keysize"),
+        sector_size=crypt_volume_spec.get("sector_size"),
+        perf=crypt_volume_spec.get("perf", []),
+        pbkdf=crypt_volume_spec.get("pbkdf"),
+        pbkdf_memory=crypt_volume_spec.get("pbkdf_memory"),
+        iter_time=crypt_volume_spec.get("iter_time"),
+        pbkdf_parallel=crypt_volume_spec.get("pbkdf_parallel"),
     )
 
     if block_device_spec:
@@ -498,6 +559,7 @@ def parse_lvm_volume_group(spec: Mapping[str, Any]) -> Iterator[Specification]:
         "LvmVolumeGroup",
         spec,
         required={"name", "lvm_physical_volumes", "lvm_logical_volumes"},
+        allowed={"lvm_caches"},
     )
 
     lvm_volume_group_name = spec["name"]
@@ -517,6 +579,17 @@ def parse_lvm_volume_group(spec: Mapping[str, Any]) -> Iterator[Specification]:
             {"lvm_volume_group": lvm_volume_group_name, **lvm_logical_volume_spec}
         )
 
+    for lvm_cache_spec in spec.get("lvm_caches", []):
+        validate_spec(
+            "LvmCache",
+            lvm_cache_spec,
+            illegal={"lvm_volume_group"},
+            ignore=True,
+        )
+        yield from parse_lvm_cache(
+            {"lvm_volume_group": lvm_volume_group_name, **lvm_cache_spec}
+        )
+
 
 def parse_lvm_logical_volume(
     spec: Mapping[str, Any],
@@ -586,6 +659,47 @@ def parse_lvm_logical_volume(
         )
 
 
+def parse_lvm_cache(spec: Mapping[str, Any]) -> Iterator[Specification]:
+    logging.debug("parse_lvm_cache")
+
+    name = "LvmCache"
+    lvm_cache_spec, block_device_spec = split_spec(
+        name,
+        spec,
+        required={
+            "name",
+            "lvm_volume_group",
+            "lvm_logical_volume",
+            "lvm_physical_volume",
+        },
+        allowed={"type", "size", "extents", "cachemode", "policy", "chunk_size"},
+        ignore=True,
+    )
+    split_spec(
+        name,
+        spec,
+        exclusive={"size", "extents"},
+        ignore=True,
+    )
+
+    lvm_cache_name = lvm_cache_spec["name"]
+    yield LvmCache(
+        name=lvm_cache_name,
+        type=lvm_cache_spec.get("type"),
+        size=lvm_cache_spec.get("size"),
+        extents=lvm_cache_spec.get("extents"),
+        cachemode=lvm_cache_spec.get("cachemode"),
+        policy=lvm_cache_spec.get("policy"),
+        chunk_size=lvm_cache_spec.get("chunk_size"),
+        lvm_volume_group=lvm_cache_spec["lvm_volume_group"],
+        lvm_logical_volume=lvm_cache_spec["lvm_logical_volume"],
+        lvm_physical_volume=lvm_cache_spec["lvm_physical_volume"],
+    )
+
+    if block_device_spec:
+        yield from parse_block_device(name, block_device_spec, lvm_cache_name, "device")
+
+
 def parse_filesystem(spec: Mapping[str, Any], identify: str) -> Iterator[Specification]:
     logging.debug("parse_filesystem")
 
@@ -593,7 +707,7 @@ def parse_filesystem(spec: Mapping[str, Any], identify: str) -> Iterator[Specifi
         "Filesystem",
         spec,
         required={"name", "type"},
-        allowed={"device", "identify", "options", "mount"},
+        allowed={"device", "identify", "options", "profile", "mount"},
     )
 
     filesystem_name = spec["name"]
@@ -602,6 +716,7 @@ def parse_filesystem(spec: Mapping[str, Any], identify: str) -> Iterator[Specifi
         device=spec["device"],
         type=spec["type"],
         options=spec.get("options", []),
+        profile=spec.get("profile"),
     )
 
     if "mount" in spec:
@@ -637,6 +752,7 @@ def parse_mount(spec: Mapping[str, Any], identify: str) -> Iterator[Specificatio
             "options",
             "dump_frequency",
             "fsck_order",
+            "profile",
             "directories",
             "files",
             "links",
@@ -653,6 +769,7 @@ def parse_mount(spec: Mapping[str, Any], identify: str) -> Iterator[Specificatio
         options=spec.get("options", []),
         dump_frequency=spec.get("dump_frequency"),
         fsck_order=spec.get("fsck_order"),
+        profile=spec.get("profile"),
     )
 
     for directory_spec in spec.get("directories", []):
@@ -724,6 +841,9 @@ def parse_directory(spec: Mapping[str, Any]) -> Iterator[Specification]:
     )
 
 
+FILE_DEVICE_KEYS = {"loop_device", "crypt_volume", "swap_volume"}
+
+
 def parse_file(spec: Mapping[str, Any]) -> Iterator[Specification]:
     logging.debug("parse_file")
 
@@ -736,60 +856,42 @@ def parse_file(spec: Mapping[str, Any]) -> Iterator[Specification]:
             "group",
             "mode",
             "size",
+            "allocation",
             "loop_device",
             "crypt_volume",
             "swap_volume",
         },
-        exclusive={"loop_device", "crypt_volume", "swap_volume"},
+        exclusive=FILE_DEVICE_KEYS,
     )
 
-    file_name = spec["name"]
     yield File(
-        name=file_name,
+        name=spec["name"],
         mount=spec["mount"],
         relative_path=spec["relative_path"],
         owner=spec.get("owner"),
         group=spec.get("group"),
         mode=spec.get("mode"),
         size=spec.get("size"),
+        allocation=spec.get("allocation"),
     )
 
-    if "loop_device" in spec:
+    if "allocation" in spec or FILE_DEVICE_KEYS & set(spec):
         validate_spec("File", spec, required={"size"}, ignore=True)
-        loop_device_spec = spec["loop_device"]
-        validate_spec(
-            "LoopDevice",
-            loop_device_spec,
-            illegal={"file"},
-            ignore=True,
+
+    if "loop_device" in spec:
+        yield from parse_loop_device(
+            child_spec(spec, "LoopDevice", "loop_device", "file", spec["name"])
         )
-        yield from parse_loop_device({"file": file_name, **loop_device_spec})
 
     if "crypt_volume" in spec:
-        validate_spec("File", spec, required={"size"}, ignore=True)
-        crypt_volume_spec = spec["crypt_volume"]
-        validate_spec(
-            "CryptVolume",
-            crypt_volume_spec,
-            illegal={"device"},
-            ignore=True,
-        )
         yield from parse_crypt_volume(
-            {"device": file_name, **crypt_volume_spec},
+            child_spec(spec, "CryptVolume", "crypt_volume", "device", spec["name"]),
             "device",
         )
 
     if "swap_volume" in spec:
-        validate_spec("File", spec, required={"size"}, ignore=True)
-        swap_volume_spec = spec["swap_volume"]
-        validate_spec(
-            "SwapVolume",
-            swap_volume_spec,
-            illegal={"device"},
-            ignore=True,
-        )
         yield from parse_swap_volume(
-            {"device": file_name, **swap_volume_spec},
+            child_spec(spec, "SwapVolume", "swap_volume", "device", spec["name"]),
             "device",
         )
 
@@ -830,7 +932,7 @@ def parse_loop_device(spec: Mapping[str, Any]) -> Iterator[Specification]:
         name,
         spec,
         required={"name", "file"},
-        allowed={"args"},
+        allowed={"args", "direct_io", "sector_size"},
         ignore=True,
     )
 
@@ -839,6 +941,8 @@ def parse_loop_device(spec: Mapping[str, Any]) -> Iterator[Specification]:
         name=loop_device_name,
         file=loop_device_spec["file"],
         args=loop_device_spec.get("args", []),
+        direct_io=loop_device_spec.get("direct_io"),
+        sector_size=loop_device_spec.get("sector_size"),
     )
 
     if block_device_spec:
@@ -0,0 +1,171 @@
+"""
+Plan API for inspecting the execution plan of the "apply" action.
+
+A Plan summarizes the dependency graph of a specification: the depth of every
+node (the length of its longest chain of dependencies), the number of commands
+each node generates, the number of nodes that could run concurrently at each
+depth, and the longest dependency chain through the graph.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from comedian.command import CommandContext
+from comedian.traits import DebugMixin
+
+__all__ = ["Plan", "PlanNode", "render_dot", "render_text"]
+
+
+class PlanNode(DebugMixin):
+    """
+    The planned execution of a single node within a Graph.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        type: str,
+        dependencies: List[str],
+        depth: int,
+        commands: int,
+    ):
+        self.name = name
+        self.type = type
+        self.dependencies = dependencies
+        self.depth = depth
+        self.commands = commands
+
+
+class Plan(DebugMixin):
+    """
+    The planned execution of the "apply" action for all nodes within a Graph.
+    """
+
+    def __init__(self, context: CommandContext):
+        self.nodes: Dict[str, PlanNode] = OrderedDict()
+
+        specifications = list(context.graph.walk())
+        commands: Dict[str, int] = {}
+        for specification in specifications:
+            commands[specification.name] = len(
+                list(specification.generate_wipe_commands(context))
+            ) + len(list(specification.generate_apply_commands(context)))
+        # Post-apply commands are generated after every apply command, exactly
+        # as the "apply" action would.
+        for specification in specifications:
+            commands[specification.name] += len(
+                list(specification.generate_post_apply_commands(context))
+            )
+
+        for specification in specifications:
+            dependencies = list(specification.dependencies)
+            depth = 1 + max(
+                (self.nodes[dependency].depth for dependency in dependencies),
+                default=-1,
+            )
+            self.nodes[specification.name] = PlanNode(
+                specification.name,
+                specification.__class__.__name__,
+                dependencies,
+                depth,
+                commands[specification.name],
+            )
+
+    def levels(self) -> List[List[PlanNode]]:
+        """
+        Group all nodes by their depth. Every node within a level is independent
+        of all other nodes in that level, so the size of each level is the
+        maximum possible parallelism at that depth.
+        """
+        levels: List[List[PlanNode]] = []
+        for node in self.nodes.values():
+            while len(levels) <= node.depth:
+                levels.append([])
+            levels[node.depth].append(node)
+        return levels
+
+    def critical_path(self) -> List[PlanNode]:
+        """
+        Find the longest chain of dependencies within the graph, preferring the
+        chain with the most commands when several are equally long.
+        """
+        chains: Dict[str, Tuple[int, int, Optional[str]]] = {}
+        for name, node in self.nodes.items():
+            length, commands, previous = 0, 0, None
+            for dependency in node.dependencies:
+                dependency_length, dependency_commands, _ = chains[dependency]
+                if (dependency_length, dependency_commands) > (length, commands):
+                    length, commands, previous = (
+                        dependency_length,
+                        dependency_commands,
+                        dependency,
+                    )
+            chains[name] = (length + 1, commands + node.commands, previous)
+
+        if not chains:
+            return []
+
+        path: List[PlanNode] = []
+        current: Optional[str] = max(
+            chains, key=lambda name: (chains[name][0], chains[name][1])
+        )
+        while current is not None:
+            path.append(self.nodes[current])
+            current = chains[current][2]
+        return list(reversed(path))
+
+
+def render_text(plan: Plan) -> str:
+    """
+    Render a human-readable summary of a Plan.
+    """
+    lines = []
+    for depth, level in enumerate(plan.levels()):
+        commands = sum(node.commands for node in level)
+        lines.append(f"depth {depth}: parallelism {len(level)}, {commands} commands")
+        for node in level:
+            lines.append(f"  {node.name} ({node.type}): {node.commands} commands")
+
+    path = plan.critical_path()
+    commands = sum(node.commands for node in path)
+    lines.append(f"critical path: {len(path)} nodes, {commands} commands")
+    for node in path:
+        lines.append(f"  {node.name} ({node.type}): {node.commands} commands")
+
+    return "\n".join(lines)
+
+
+def render_dot(plan: Plan) -> str:
+    """
+    Render a Plan as a Graphviz DOT digraph, with edges pointing from each
+    dependency to its dependents, and the critical path highlighted.
+    """
+    path = plan.critical_path()
+    critical_nodes = {node.name for node in path}
+    critical_edges = {
+        (dependency.name, dependent.name)
+        for dependency, dependent in zip(path, path[1:])
+    }
+
+    lines = ["digraph plan {", "  rankdir=LR;"]
+    for node in plan.nodes.values():
+        label = f"{node.name}\\n{node.type}\\n{node.commands} commands"
+        attributes = [f'label="{_escape(label)}"']
+        if node.name in critical_nodes:
+            attributes += ['color="red"', "penwidth=2"]
+        lines.append(f'  "{_escape(node.name)}" [{", ".join(attributes)}];')
+    for node in plan.nodes.values():
+        for dependency in node.dependencies:
+            edge_attributes = ""
+            if (dependency, node.name) in critical_edges:
+                edge_attributes = ' [color="red", penwidth=2]'
+            lines.append(
+                f'  "{_escape(dependency)}" -> "{_escape(node.name)}"{edge_attributes};'
+            )
+    lines.append("}")
+
+    return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace('"', '\\"')
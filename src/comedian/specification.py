@@ -15,6 +15,7 @@ class Specification(ActionCommandGenerator, GraphNode):
         name: str,
         dependencies: List[str],
         references: Optional[List[str]] = None,
+        wipe: Optional[CommandGenerator] = None,
         apply: Optional[CommandGenerator] = None,
         post_apply: Optional[CommandGenerator] = None,
         up: Optional[CommandGenerator] = None,
@@ -25,6 +26,7 @@ class Specification(ActionCommandGenerator, GraphNode):
             references = []
         ActionCommandGenerator.__init__(
             self,
+            wipe=wipe,
             apply=apply,
             post_apply=post_apply,
             up=up,
@@ -34,7 +36,14 @@ class Specification(ActionCommandGenerator, GraphNode):
         GraphNode.__init__(self, name, dependencies, references=references)
 
     def __fields__(self) -> Iterator[str]:
-        excluded_fields: Set[str] = {"apply", "post_apply", "up", "pre_down", "down"}
+        excluded_fields: Set[str] = {
+            "wipe",
+            "apply",
+            "post_apply",
+            "up",
+            "pre_down",
+            "down",
+        }
         for field in GraphNode.__fields__(self):
             if field not in excluded_fields:
                 yield field
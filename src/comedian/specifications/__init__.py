@@ -4,6 +4,7 @@ from comedian.specifications.file import File
 from comedian.specifications.filesystem import Filesystem
 from comedian.specifications.link import Link
 from comedian.specifications.loop_device import LoopDevice
+from comedian.specifications.lvm_cache import LvmCache
 from comedian.specifications.lvm_logical_volume import LvmLogicalVolume
 from comedian.specifications.lvm_physical_volume import LvmPhysicalVolume
 from comedian.specifications.lvm_volume_group import LvmVolumeGroup
@@ -23,6 +24,7 @@ __all__ = [
     "Filesystem",
     "Link",
     "LoopDevice",
+    "LvmCache",
     "LvmLogicalVolume",
     "LvmPhysicalVolume",
     "LvmVolumeGroup",
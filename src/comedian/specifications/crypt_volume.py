@@ -1,6 +1,10 @@
+import math
 import os
-from typing import Iterator, List, Optional, Tuple
+import re
+import subprocess
+from typing import Callable, Iterator, List, Optional, Tuple
 
+from comedian import native, sysfs, wipe
 from comedian.command import (
     Command,
     CommandContext,
@@ -13,6 +17,7 @@ from comedian.command import (
     quote_argument,
     quote_subcommand,
 )
+from comedian.event import Event
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
 
@@ -22,17 +27,30 @@ class CryptVolumeUpCommandGenerator(CommandGenerator):
         self.specification = specification
 
     def __call__(self, context: CommandContext) -> Iterator[Command]:
+        # Opening a LUKS volume pays the full cost of its key derivation, so
+        # independent volumes are opened concurrently.
+        command = self.open_command(context)
+        command.job = f"open_{self.specification.name}"
+        yield command
+
+    def open_command(
+        self, context: CommandContext, persistent: bool = False
+    ) -> Command:
         _, media_device_path = _device_path(self.specification.device, context)
         type = (
             self.specification.type if self.specification.ephemeral_keyfile() else None
         )
 
-        yield Command(
+        return Command(
             _open_crypt(
                 self.specification.name,
                 media_device_path,
                 self.specification.tmp_keyfile_path(context),
                 type,
+                # LUKS volumes record their sector size in their header.
+                sector_size=self.specification.sector_size if type else None,
+                perf=self.specification.perf,
+                persistent=persistent and _persistent_perf(self.specification),
             )
         )
 
@@ -62,21 +80,16 @@ class CryptVolumeApplyCommandGenerator(CryptVolumeUpCommandGenerator):
                     "Logical Error: CryptVolume.keysize must be set with explicit keyfile"
                 )
 
-            yield from _randomize_device(
-                self.specification.name, media_device_path, context
-            )
             yield from _create_keyfile(
                 tmp_keyfile_path, self.specification.keysize, context
             )
+            if self.specification.cipher == "auto":
+                yield _select_cipher(self.specification.name)
             yield from _format_crypt(
-                context,
-                media_device_path,
-                tmp_keyfile_path,
-                self.specification.type,
-                self.specification.password,
+                context, self.specification, media_device_path, tmp_keyfile_path
             )
 
-        yield from super().__call__(context)
+        yield self.open_command(context, persistent=True)
 
         identify_path = identify_device_path(self.specification.identify, device_path)
         crypttab_entry = [
@@ -87,11 +100,43 @@ class CryptVolumeApplyCommandGenerator(CryptVolumeUpCommandGenerator):
                     self.specification.name,
                     identify_path,
                     keyfile_path,
-                    ",".join(self.specification.options),
+                    ",".join(_crypttab_options(self.specification)),
                 ]
             ),
         ]
-        yield crypttab_append(context, "\\n".join(crypttab_entry))
+        crypttab_append(context, "\\n".join(crypttab_entry))
+
+
+class CryptVolumeWipeCommandGenerator(CommandGenerator):
+    def __init__(self, specification: "CryptVolume"):
+        self.specification = specification
+
+    def __call__(self, context: CommandContext) -> Iterator[Command]:
+        if self.specification.ephemeral_keyfile():
+            return
+
+        _, media_device_path = _device_path(self.specification.device, context)
+        roots = sorted(context.graph.roots(self.specification.device))
+
+        strategy = self.specification.wipe_strategy or context.config.wipe_strategy
+        if strategy not in WIPE_STRATEGIES:
+            raise ValueError(f"Unexpected value for wipe_strategy: '{strategy}'")
+        # Discarding is only possible when every physical device underneath the
+        # volume supports it. Otherwise, fall back to randomizing the volume.
+        # Likewise, secure discards fall back to plain discards.
+        if strategy != "randomize" and _discard_supported(roots, context):
+            secure = strategy == "secure_discard" and _discard_supported(
+                roots, context, sysfs.secure_erase_supported
+            )
+            yield Command(_blkdiscard(media_device_path, secure=secure))
+            return
+
+        yield _randomize_device(
+            self.specification.name,
+            media_device_path,
+            roots,
+            context,
+        )
 
 
 class CryptVolumePostApplyCommandGenerator(CommandGenerator):
@@ -109,6 +154,8 @@ class CryptVolumePostApplyCommandGenerator(CommandGenerator):
 
 
 class CryptVolume(Specification):
+    # pylint: disable=R0902
+
     def __init__(
         self,
         name: str,
@@ -119,7 +166,20 @@ class CryptVolume(Specification):
         keysize: Optional[str],
         password: Optional[str],
         options: List[str],
+        wipe_strategy: Optional[str] = None,
+        cipher: Optional[str] = None,
+        cipher_keysize: Optional[int] = None,
+        sector_size: Optional[int] = None,
+        perf: Optional[List[str]] = None,
+        pbkdf: Optional[str] = None,
+        pbkdf_memory: Optional[int] = None,
+        iter_time: Optional[int] = None,
+        pbkdf_parallel: Optional[int] = None,
     ):
+        # pylint: disable=R0913,R0914,R0915
+
+        if perf is None:
+            perf = []
         references = []
         if not ephemeral_keyfile(keyfile):
             references.append(keyfile)
@@ -128,6 +188,7 @@ class CryptVolume(Specification):
             name,
             [device],
             references=references,
+            wipe=CryptVolumeWipeCommandGenerator(self),
             apply=CryptVolumeApplyCommandGenerator(self),
             post_apply=CryptVolumePostApplyCommandGenerator(self),
             up=CryptVolumeUpCommandGenerator(self),
@@ -141,6 +202,15 @@ class CryptVolume(Specification):
         self.keysize = keysize
         self.password = password
         self.options = options
+        self.wipe_strategy = wipe_strategy
+        self.cipher = cipher
+        self.cipher_keysize = cipher_keysize
+        self.sector_size = sector_size
+        self.perf = perf
+        self.pbkdf = pbkdf
+        self.pbkdf_memory = pbkdf_memory
+        self.iter_time = iter_time
+        self.pbkdf_parallel = pbkdf_parallel
 
     def ephemeral_keyfile(self) -> bool:
         return ephemeral_keyfile(self.keyfile)
@@ -160,13 +230,43 @@ class CryptVolume(Specification):
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(None, _crypt_device(self.name))
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        return "active" if self.name in context.state.dm_devices else "missing"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The volume exists when its device has a LUKS header. Volumes with
+        ephemeral keyfiles are formatted anew every time they are opened, so
+        they never exist.
+        """
+        state = context.state
+        if state is None or self.ephemeral_keyfile():
+            return False
+        _, media_device_path = _device_path(self.device, context)
+        return state.identify(media_device_path).get("type") == "crypto_LUKS"
+
+    def active(self, context: CommandContext) -> bool:
+        """
+        The volume is active when it is open.
+        """
+        return context.state is not None and self.name in context.state.dm_devices
+
+
+WIPE_STRATEGIES = ["randomize", "discard", "secure_discard"]
+
+PERF_OPTIONS = ["no_read_workqueue", "no_write_workqueue", "submit_from_crypt_cpus"]
+CRYPTTAB_PERF_OPTIONS = ["no_read_workqueue", "no_write_workqueue"]
+
 
 def _crypt_device(name: str) -> str:
     return f"/dev/mapper/{name}"
 
 
-def _dd(*args: str) -> List[str]:
-    return ["dd", "status=progress", "conv=sync,noerror"] + list(args)
+def _dd(*args: str, fdatasync: bool = False) -> List[str]:
+    conv = "conv=sync,noerror,fdatasync" if fdatasync else "conv=sync,noerror"
+    return ["dd", "status=progress", conv] + list(args)
 
 
 def _cryptsetup(*args: str) -> List[str]:
@@ -178,6 +278,9 @@ def _open_crypt(
     device: str,
     keyfile: str,
     type: Optional[str],
+    sector_size: Optional[int] = None,
+    perf: Optional[List[str]] = None,
+    persistent: bool = False,
 ) -> List[str]:
     return _cryptsetup(
         f"--key-file={quote_argument(keyfile)}",
@@ -185,9 +288,107 @@ def _open_crypt(
         quote_argument(device),
         name,
         *([f"--type={type}"] if type is not None else []),
+        *([f"--sector-size={sector_size}"] if sector_size is not None else []),
+        *_perf_arguments(perf or []),
+        *(["--persistent"] if persistent and perf else []),
     )
 
 
+def _perf_arguments(perf: List[str]) -> List[str]:
+    for option in perf:
+        if option not in PERF_OPTIONS:
+            raise ValueError(f"Unexpected value for perf: '{option}'")
+    return [f"--perf-{option}" for option in perf]
+
+
+def _crypttab_options(specification: "CryptVolume") -> List[str]:
+    options = list(specification.options)
+    if not _persistent_perf(specification):
+        # Only the workqueue flags have crypttab equivalents.
+        options += [
+            option.replace("_", "-")
+            for option in specification.perf
+            if option in CRYPTTAB_PERF_OPTIONS
+        ]
+    if specification.ephemeral_keyfile() and specification.sector_size is not None:
+        options.append(f"sector-size={specification.sector_size}")
+    return options
+
+
+def _persistent_perf(specification: "CryptVolume") -> bool:
+    """
+    LUKS2 volumes store their performance flags in their header, where every
+    later unlock (including the one from crypttab) picks them up.
+    """
+    return not specification.ephemeral_keyfile() and specification.type == "luks2"
+
+
+def _cipher_variable(name: str) -> str:
+    return "CIPHER_" + re.sub(r"\W", "_", name)
+
+
+def _select_cipher(name: str) -> Command:
+    """
+    Benchmark the ciphers of this host, and capture the luksFormat arguments
+    for the fastest one. The benchmark is parsed by awk in a shell script, and
+    in-process when executing.
+    """
+    variable = _cipher_variable(name)
+
+    def select(context: CommandContext):
+        # Unlike the shell, the command lookup needs the PATH of this process.
+        output = subprocess.check_output(
+            ["cryptsetup", "benchmark"], env={**os.environ, **context.env}
+        )
+        context.env[variable] = _cipher_arguments(output.decode())
+
+    return Command(
+        ["cryptsetup", "benchmark", "|", "awk", quote_subcommand(_SELECT_CIPHER_AWK)],
+        capture=variable,
+        native=select,
+    )
+
+
+# Disk-encryption modes worth choosing between. Others (such as CBC) appear in
+# the benchmark, but are not suitable for new volumes.
+_SELECT_CIPHER_AWK = " ".join(
+    [
+        "$2 ~ /^[0-9]+b$/ && ($1 ~ /-xts$/ || $1 ~ /adiantum/) && $3 + 0 > 0 {",
+        "speed = ($3 + 0 < $5 + 0) ? $3 + 0 : $5 + 0;",
+        "size = $2 + 0;",
+        "if (speed > best || (speed == best && size > best_size))",
+        "{ best = speed; best_size = size; cipher = $1 }",
+        "}",
+        "END {",
+        'if (cipher) printf "--cipher=%s-plain64 --key-size=%d", cipher, best_size',
+        "}",
+    ]
+)
+
+
+def _cipher_arguments(benchmark: str) -> str:
+    candidates: List[Tuple[float, int, str]] = []
+    for line in benchmark.splitlines():
+        fields = line.split()
+        if len(fields) < 5 or not re.fullmatch(r"\d+b", fields[1]):
+            continue
+        cipher = fields[0]
+        if not (cipher.endswith("-xts") or "adiantum" in cipher):
+            continue
+        try:
+            # The slower of encryption and decryption bounds the throughput.
+            speed = min(float(fields[2]), float(fields[4]))
+        except ValueError:
+            # Unsupported ciphers report "N/A".
+            continue
+        if speed > 0:
+            candidates.append((speed, int(fields[1][:-1]), cipher))
+    if not candidates:
+        return ""
+    _, size, cipher = max(candidates, key=lambda candidate: candidate[:2])
+    return f"--cipher={cipher}-plain64 --key-size={size}"
+
+
 def _close_crypt(name: str) -> List[str]:
     return _cryptsetup("close", name)
 
@@ -195,28 +396,183 @@ def _close_crypt(name: str) -> List[str]:
 def _randomize_device(
     name: str,
     device: str,
+    resources: List[str],
     context: CommandContext,
-) -> Iterator[Command]:
+) -> Command:
+    # The whole randomization runs as a single background job, so that the
+    # devices of several CryptVolumes can be randomized at once.
     cryptname = f"randomize_{name}"
+    open_cmd = " ".join(
+        _open_crypt(cryptname, device, context.config.random_device, "plain")
+    )
+    block_size, direct = _dd_tuning(resources, context)
+    # The copy is bounded by the size of the mapping, so that dd stops at the
+    # end of the device instead of failing there, and any write error fails the
+    # job. Direct writes bypass the page cache entirely, while buffered writes
+    # are flushed once at the end so that write errors are not lost.
+    crypt_device = quote_argument(_crypt_device(cryptname))
+    dd_cmd = " ".join(
+        [
+            "dd",
+            "status=progress",
+            *([] if direct else ["conv=fdatasync"]),
+            "if=/dev/zero",
+            f"of={crypt_device}",
+            f"bs={block_size}",
+            f'count="$(blockdev --getsize64 {crypt_device})"',
+            "iflag=fullblock,count_bytes",
+            *(["oflag=direct"] if direct else []),
+        ]
+    )
+    close_cmd = " ".join(_close_crypt(cryptname))
 
-    yield Command(
-        _open_crypt(
+    randomize = None
+    length = native.parse_size(block_size)
+    if context.config.wipe_engine == "native" and length is not None:
+        randomize = _randomize_natively(
             cryptname,
             device,
-            context.config.random_device,
-            "plain",
+            open_cmd,
+            close_cmd,
+            length,
+            direct,
+            context.config.tmp_path(os.path.join("wipe", f"{cryptname}.json")),
         )
+
+    return Command(
+        [
+            context.config.shell,
+            "-c",
+            quote_subcommand(
+                f"{open_cmd} && {{ {dd_cmd} && sync; status=$?; "
+                f'{close_cmd} && exit "$status"; }}'
+            ),
+        ],
+        native=randomize,
+        job=cryptname,
+        resources=resources,
     )
-    dd_cmd = " ".join(
-        _dd(
-            "if=/dev/zero",
-            f"of={quote_argument(_crypt_device(cryptname))}",
-            f"bs={context.config.dd_bs}",
+
+
+def _randomize_natively(
+    cryptname: str,
+    device: str,
+    open_cmd: str,
+    close_cmd: str,
+    block_size: int,
+    direct: bool,
+    checkpoint: str,
+) -> Callable[[CommandContext], None]:
+    # Every run maps the device with a fresh random key, so a resumed wipe
+    # writes different ciphertext than the interrupted one did. Both are
+    # indistinguishable from random data, and since the plain mapping's IVs are
+    # derived from the sector number, resuming at a block boundary leaves no
+    # seam. The checkpoint is keyed by the underlying device (and the mapping's
+    # size), never by the mapping's key.
+    def randomize(context: CommandContext):
+        def report(progress: wipe.WipeProgress):
+            context.events.emit(
+                Event("progress", name=cryptname, message=str(progress))
+            )
+
+        subprocess.check_call(open_cmd, env=context.env, shell=True)
+        try:
+            wipe.wipe(
+                _crypt_device(cryptname),
+                block_size=block_size,
+                threads=context.config.wipe_threads,
+                direct=direct,
+                report=report,
+                checkpoint=checkpoint,
+                checkpoint_key=device,
+            )
+        finally:
+            subprocess.check_call(close_cmd, env=context.env, shell=True)
+
+    return randomize
+
+
+def _dd_tuning(roots: List[str], context: CommandContext) -> Tuple[str, bool]:
+    """
+    Choose the dd block size and whether to use direct I/O for writing to a
+    device spanning the given physical roots.
+
+    Without overrides, the configured block size is rounded up to a multiple of
+    the I/O size that every root prefers, and direct I/O is used for roots that
+    are either non-rotational or report an optimal I/O size (such as RAID
+    controllers). Roots that are unknown to sysfs keep buffered writes.
+    """
+    block_sizes: List[str] = []
+    granularity = 1
+    direct = True
+    for root in roots:
+        io_size, root_direct = _root_tuning(root, context)
+        if io_size:
+            granularity = math.lcm(granularity, io_size)
+        direct = direct and root_direct
+
+        root_block_size = getattr(context.graph.node(root), "dd_bs", None)
+        if root_block_size:
+            block_sizes.append(root_block_size)
+
+    if block_sizes:
+        # Overridden block sizes are used as-is, preferring the largest.
+        return (
+            max(block_sizes, key=lambda size: native.parse_size(size) or 0),
+            direct,
         )
-    )
-    yield Command([context.config.shell, "-c", quote_subcommand(f"{dd_cmd} || true")])
-    yield Command(["sync"])
-    yield Command(_close_crypt(cryptname))
+
+    block_size = native.parse_size(context.config.dd_bs)
+    if block_size is None or block_size % granularity == 0:
+        return context.config.dd_bs, direct
+    return str(-(-block_size // granularity) * granularity), direct
+
+
+def _root_tuning(root: str, context: CommandContext) -> Tuple[Optional[int], bool]:
+    """
+    The preferred I/O size of a physical root, and whether it takes direct I/O.
+    """
+    optimal_io_size = None
+    physical_block_size = None
+    rotational = None
+    device_path = context.graph.resolve_device(root)
+    if device_path:
+        optimal_io_size = _queue_size(device_path, "optimal_io_size", context)
+        physical_block_size = _queue_size(device_path, "physical_block_size", context)
+        rotational = sysfs.queue_attribute(
+            context.config.sys_dir, device_path, "rotational"
+        )
+
+    io_size = optimal_io_size or physical_block_size
+    direct = getattr(context.graph.node(root), "direct_io", None)
+    if direct is None:
+        direct = bool(io_size) and (rotational == "0" or bool(optimal_io_size))
+    return io_size, direct
+
+
+def _queue_size(
+    device_path: str, attribute: str, context: CommandContext
+) -> Optional[int]:
+    value = sysfs.queue_attribute(context.config.sys_dir, device_path, attribute)
+    if value is None or not value.isdigit() or int(value) == 0:
+        return None
+    return int(value)
+
+
+def _blkdiscard(device: str, secure: bool) -> List[str]:
+    return ["blkdiscard"] + (["--secure"] if secure else []) + [quote_argument(device)]
+
+
+def _discard_supported(
+    roots: List[str],
+    context: CommandContext,
+    supported: Callable[[str, str], bool] = sysfs.discard_supported,
+) -> bool:
+    for root in roots:
+        device_path = context.graph.resolve_device(root)
+        if not device_path or not supported(context.config.sys_dir, device_path):
+            return False
+    return True
 
 
 def _create_keyfile(
@@ -224,6 +580,11 @@ def _create_keyfile(
     keysize: str,
     context: CommandContext,
 ) -> Iterator[Command]:
+    size = native.parse_size(keysize)
+    create = None
+    if context.config.wipe_engine == "native" and size is not None:
+        create = _create_keyfile_natively(keyfile, size, context.config.random_device)
+
     yield mkdir(os.path.dirname(keyfile))
     yield Command(
         _dd(
@@ -231,30 +592,55 @@ def _create_keyfile(
             f"of={quote_argument(keyfile)}",
             f"bs={keysize}",
             "count=1",
-        )
+        ),
+        native=create,
+    )
+
+
+def _create_keyfile_natively(
+    keyfile: str, size: int, random_device: str
+) -> Callable[[CommandContext], None]:
+    return lambda context: wipe.wipe(
+        keyfile, size=size, source=random_device, threads=1, direct=False
     )
 
 
 def _format_crypt(
     context: CommandContext,
+    specification: "CryptVolume",
     device: str,
     keyfile: str,
-    type: str,
-    password: Optional[str],
 ) -> Iterator[Command]:
+    cipher_arguments = []
+    if specification.cipher == "auto":
+        # Deliberately unquoted, so that the captured arguments are split.
+        cipher_arguments.append(f"${_cipher_variable(specification.name)}")
+    elif specification.cipher:
+        cipher_arguments.append(f"--cipher={specification.cipher}")
+        if specification.cipher_keysize is not None:
+            cipher_arguments.append(f"--key-size={specification.cipher_keysize}")
+    if specification.sector_size is not None:
+        cipher_arguments.append(f"--sector-size={specification.sector_size}")
+
+    pbkdf_arguments = _pbkdf_arguments(specification)
+
     yield Command(
         _cryptsetup(
             f"--key-file={quote_argument(keyfile)}",
             "luksFormat",
-            f"--type={type}",
+            f"--type={specification.type}",
+            *cipher_arguments,
+            *pbkdf_arguments,
             quote_argument(device),
         )
     )
+    password = specification.password
     if password:
         add_key_cmd = " ".join(
             _cryptsetup(
                 f"--key-file={quote_argument(keyfile)}",
                 "luksAddKey",
+                *pbkdf_arguments,
                 quote_argument(device),
             )
         )
@@ -267,6 +653,19 @@ def _format_crypt(
         )
 
 
+def _pbkdf_arguments(specification: "CryptVolume") -> List[str]:
+    arguments = []
+    if specification.pbkdf is not None:
+        arguments.append(f"--pbkdf={specification.pbkdf}")
+    if specification.pbkdf_memory is not None:
+        arguments.append(f"--pbkdf-memory={specification.pbkdf_memory}")
+    if specification.iter_time is not None:
+        arguments.append(f"--iter-time={specification.iter_time}")
+    if specification.pbkdf_parallel is not None:
+        arguments.append(f"--pbkdf-parallel={specification.pbkdf_parallel}")
+    return arguments
+
+
 def _device_path(device: str, context: CommandContext) -> Tuple[str, str]:
     device_path = context.graph.resolve_device(device)
     if device_path:
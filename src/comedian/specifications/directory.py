@@ -58,3 +58,12 @@ class Directory(Specification):
 
     def resolve_path(self) -> ResolveLink:
         return ResolveLink(self.mount, self.relative_path)
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The directory exists when its path does, beneath its mounted mountpoint.
+        """
+        path = context.graph.resolve_path(self.name)
+        if context.state is None or not path:
+            return False
+        return context.state.exists(context.config.media_path(path))
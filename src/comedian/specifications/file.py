@@ -1,14 +1,18 @@
 import os
-from typing import Iterator, Optional
+from typing import Callable, Iterator, Optional
 
+from comedian import native, wipe
 from comedian.command import (
     Command,
     CommandContext,
     CommandGenerator,
     chmod,
     chown,
+    fallocate,
     mkdir,
     quote_argument,
+    touch,
+    truncate,
 )
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
@@ -27,17 +31,7 @@ class FileApplyCommandGenerator(CommandGenerator):
         media_file_path = context.config.media_path(file_path)
 
         yield mkdir(os.path.dirname(media_file_path))
-        if self.specification.size:
-            yield Command(
-                [
-                    "fallocate",
-                    "--length",
-                    self.specification.size,
-                    quote_argument(media_file_path),
-                ]
-            )
-        else:
-            yield Command(["touch", quote_argument(media_file_path)])
+        yield _allocate(self.specification, media_file_path, context)
         if self.specification.owner or self.specification.group:
             yield chown(
                 self.specification.owner,
@@ -58,6 +52,7 @@ class File(Specification):
         group: Optional[str],
         mode: Optional[str],
         size: Optional[str],
+        allocation: Optional[str] = None,
     ):
         super().__init__(
             name,
@@ -70,6 +65,65 @@ class File(Specification):
         self.group = group
         self.mode = mode
         self.size = size
+        self.allocation = allocation
 
     def resolve_path(self) -> ResolveLink:
         return ResolveLink(self.mount, self.relative_path)
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The file exists when its path does, beneath its mounted mountpoint.
+        """
+        path = context.graph.resolve_path(self.name)
+        if context.state is None or not path:
+            return False
+        return context.state.exists(context.config.media_path(path))
+
+
+FILE_ALLOCATIONS = ["sparse", "preallocate", "zero"]
+
+
+def _allocate(specification: File, path: str, context: CommandContext) -> Command:
+    """
+    Create the file at path with the allocation of the specification. Files
+    with a size are preallocated by default, which suits loop device backing
+    files best.
+    """
+    if not specification.size:
+        if specification.allocation:
+            raise ValueError(
+                f"Unexpected allocation without size: '{specification.allocation}'"
+            )
+        return touch(path)
+
+    allocation = specification.allocation or "preallocate"
+    if allocation not in FILE_ALLOCATIONS:
+        raise ValueError(f"Unexpected value for allocation: '{allocation}'")
+    if allocation == "sparse":
+        return truncate(specification.size, path)
+    if allocation == "preallocate":
+        return fallocate(specification.size, path)
+
+    size = native.parse_size(specification.size)
+    zero = None
+    if context.config.wipe_engine == "native" and size is not None:
+        zero = _zero_natively(path, size)
+    return Command(
+        [
+            "dd",
+            "status=progress",
+            "if=/dev/zero",
+            f"of={quote_argument(path)}",
+            f"bs={context.config.dd_bs}",
+            f"count={specification.size}",
+            "iflag=count_bytes",
+            "conv=fsync",
+        ],
+        native=zero,
+    )
+
+
+def _zero_natively(path: str, size: int) -> Callable[[CommandContext], None]:
+    return lambda context: wipe.wipe(
+        path, size=size, threads=context.config.wipe_threads
+    )
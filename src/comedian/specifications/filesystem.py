@@ -1,8 +1,13 @@
-from typing import Iterator, List
+from typing import Iterator, List, Optional
 
 from comedian.command import Command, CommandContext, CommandGenerator, quote_argument
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
+from comedian.specifications.physical_device import PhysicalDevice
+from comedian.topology import Topology, node_topology
+
+# The block size mkfs uses for all but the smallest filesystems.
+_BLOCK_SIZE = 4096
 
 
 class FilesystemApplyCommandGenerator(CommandGenerator):
@@ -12,9 +17,23 @@ class FilesystemApplyCommandGenerator(CommandGenerator):
     def __call__(self, context: CommandContext) -> Iterator[Command]:
         device_path = _device_path(self.specification.device, context)
 
+        profile = self.specification.profile or "default"
+        if profile not in FILESYSTEM_PROFILES:
+            raise ValueError(f"Unexpected value for profile: '{profile}'")
+
+        options = _merge_options(
+            self.specification.type,
+            _stripe_options(
+                self.specification.type,
+                self.specification.options,
+                node_topology(context, self.specification.device),
+            )
+            + (_fast_options(self.specification, context) if profile == "fast" else [])
+            + list(self.specification.options),
+        )
         yield Command(
             ["mkfs", "--type", self.specification.type]
-            + list(self.specification.options)
+            + options
             + [quote_argument(device_path)]
         )
 
@@ -26,6 +45,7 @@ class Filesystem(Specification):
         device: str,
         type: str,
         options: List[str],
+        profile: Optional[str] = None,
     ):
         super().__init__(
             name,
@@ -35,6 +55,7 @@ class Filesystem(Specification):
         self.device = device
         self.type = type
         self.options = options
+        self.profile = profile
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(self.device, None)
@@ -42,6 +63,148 @@ class Filesystem(Specification):
     def resolve_path(self) -> ResolveLink:
         return ResolveLink(None, None)
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        device_path = _device_path(self.device, context)
+        if context.state.mounted(device_path):
+            return "mounted"
+        if context.state.block_device(device_path) is None:
+            return "missing"
+        return "present"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The filesystem exists when its device holds one of the same type.
+        """
+        return (
+            context.state is not None
+            and context.state.identify(_device_path(self.device, context)).get("type")
+            == self.type
+        )
+
+
+FILESYSTEM_PROFILES = ["default", "fast"]
+
+# The options that take comma-separated lists of settings. mke2fs only honors
+# the last -E it is given, so every list is passed as a single option.
+_LIST_OPTIONS = {"ext2": "-E", "ext3": "-E", "ext4": "-E", "xfs": "-d"}
+
+# Allocation groups created per physical device by the "fast" profile, so that
+# allocations spread across every device. Every group must stay under 1TiB.
+_XFS_AGS_PER_DEVICE = 16
+
+
+def _fast_options(specification: "Filesystem", context: CommandContext) -> List[str]:
+    """
+    Skip the work mkfs does that is not needed on the device beneath a
+    filesystem. Devices that were just wiped need not be discarded again, and
+    neither their inode tables nor journal need to be initialized up-front.
+    """
+    wiped = _wiped(specification.device, context)
+
+    if specification.type in ["ext2", "ext3", "ext4"]:
+        extended = ["lazy_itable_init=1"]
+        if wiped:
+            extended += ["lazy_journal_init=1", "nodiscard"]
+        return ["-E", ",".join(extended)]
+
+    if specification.type == "xfs":
+        options = ["-K"] if wiped else []
+        devices = [
+            root
+            for root in context.graph.roots(specification.device)
+            if isinstance(context.graph.node(root), PhysicalDevice)
+        ]
+        if len(devices) > 1:
+            options += ["-d", f"agcount={_XFS_AGS_PER_DEVICE * len(devices)}"]
+        return options
+
+    if specification.type == "btrfs":
+        return ["--nodiscard"] if wiped else []
+
+    return []
+
+
+def _wiped(name: str, context: CommandContext) -> bool:
+    # A device was wiped if its own wipe ran during "apply" (discarding or
+    # randomizing it), or if every device it is built upon was wiped.
+    if name in context.wiped:
+        return True
+    node = context.graph.node(name)
+    return bool(node.dependencies) and all(
+        _wiped(dependency, context) for dependency in node.dependencies
+    )
+
+
+def _stripe_options(
+    type: str, options: List[str], topology: Optional[Topology]
+) -> List[str]:
+    """
+    Describe the stripe of the devices beneath a filesystem to mkfs, so that
+    its allocations are aligned to whole stripes. Options that already describe
+    the stripe are left alone.
+    """
+    if topology is None or topology.optimal_io_size <= topology.minimum_io_size:
+        return []
+    if type in ["ext2", "ext3", "ext4"]:
+        return _ext_stripe_options(options, topology)
+    if type == "xfs":
+        return _xfs_stripe_options(options, topology)
+    return []
+
+
+def _ext_stripe_options(options: List[str], topology: Topology) -> List[str]:
+    if any("stride=" in option or "stripe" in option for option in options):
+        return []
+    chunk = topology.minimum_io_size
+    stripe = topology.optimal_io_size
+    extended = []
+    if chunk % _BLOCK_SIZE == 0:
+        extended.append(f"stride={chunk // _BLOCK_SIZE}")
+    if stripe % _BLOCK_SIZE == 0:
+        extended.append(f"stripe_width={stripe // _BLOCK_SIZE}")
+    return ["-E", ",".join(extended)] if extended else []
+
+
+def _xfs_stripe_options(options: List[str], topology: Topology) -> List[str]:
+    if any("su=" in option or "sunit=" in option for option in options):
+        return []
+    chunk = topology.minimum_io_size
+    stripe = topology.optimal_io_size
+    if chunk % _BLOCK_SIZE or stripe % chunk:
+        return []
+    return ["-d", f"su={chunk},sw={stripe // chunk}"]
+
+
+def _merge_options(type: str, options: List[str]) -> List[str]:
+    """
+    Merge every list option (either "-E list" or "-Elist") into the first one,
+    keeping the order of the settings so that later ones still win.
+    """
+    flag = _LIST_OPTIONS.get(type)
+    if flag is None:
+        return options
+
+    merged: List[str] = []
+    settings: List[str] = []
+    arguments = iter(options)
+    for option in arguments:
+        if option == flag:
+            settings.append(next(arguments, ""))
+        elif option.startswith(flag):
+            settings.append(option[len(flag) :])
+        else:
+            merged.append(option)
+            continue
+        if len(settings) == 1:
+            merged.append(flag)
+    if not settings:
+        return merged
+
+    index = merged.index(flag) + 1
+    return merged[:index] + [",".join(filter(None, settings))] + merged[index:]
+
 
 def _device_path(device: str, context: CommandContext) -> str:
     device_path = context.graph.resolve_device(device)
@@ -1,4 +1,4 @@
-from typing import Iterator, List
+from typing import Dict, Iterator, List, Optional
 
 from comedian.command import (
     Command,
@@ -28,6 +28,7 @@ class LoopDeviceUpCommandGenerator(CommandGenerator):
 
         cmd = [
             "losetup",
+            *_options(self.specification),
             *self.specification.args,
             "--find",
             "--show",
@@ -64,7 +65,14 @@ class LoopDeviceDownCommandGenerator(CommandGenerator):
 
 
 class LoopDevice(Specification):
-    def __init__(self, name: str, file: str, args: List[str]):
+    def __init__(
+        self,
+        name: str,
+        file: str,
+        args: List[str],
+        direct_io: Optional[bool] = None,
+        sector_size: Optional[int] = None,
+    ):
         super().__init__(
             name,
             [file],
@@ -75,6 +83,8 @@ class LoopDevice(Specification):
         )
         self.file = file
         self.args = args
+        self.direct_io = direct_io
+        self.sector_size = sector_size
 
     @property
     def capture(self) -> str:
@@ -83,6 +93,47 @@ class LoopDevice(Specification):
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(None, f"${self.capture}")
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        media_file_path = context.config.media_path(_file_path(self.file, context))
+        if media_file_path in context.state.loop_devices:
+            return "active"
+        return "missing"
+
+    def variables(self, context: CommandContext) -> Dict[str, str]:
+        """
+        The loop device is captured in a variable, which holds the loop device
+        its backing file is attached to.
+        """
+        if context.state is None:
+            return {}
+        media_file_path = context.config.media_path(_file_path(self.file, context))
+        loop_device = context.state.loop_devices.get(media_file_path)
+        return {f"${self.capture}": loop_device} if loop_device else {}
+
+    def exists(self, context: CommandContext) -> bool:
+        # Loop devices leave nothing behind but their backing files.
+        return context.state is not None
+
+    def active(self, context: CommandContext) -> bool:
+        """
+        The loop device is active when its backing file is attached to one.
+        """
+        if context.state is None:
+            return False
+        media_file_path = context.config.media_path(_file_path(self.file, context))
+        return media_file_path in context.state.loop_devices
+
+
+def _options(specification: LoopDevice) -> List[str]:
+    options = []
+    if specification.direct_io is not None:
+        options.append(f"--direct-io={'on' if specification.direct_io else 'off'}")
+    if specification.sector_size:
+        options.append(f"--sector-size={specification.sector_size}")
+    return options
+
 
 def _find_loop_device(file_path: str) -> str:
     quoted_file_path = quote_argument(file_path)
@@ -0,0 +1,190 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+from comedian.command import (
+    Command,
+    CommandContext,
+    CommandGenerator,
+    LvmCommand,
+    quote_argument,
+)
+from comedian.graph import ResolveLink
+from comedian.specification import Specification
+from comedian.state import State
+
+
+class LvmCacheApplyCommandGenerator(CommandGenerator):
+    def __init__(self, specification: "LvmCache"):
+        self.specification = specification
+
+    def __call__(self, context: CommandContext) -> Iterator[Command]:
+        # Every option is checked before the cache is created, so that invalid
+        # options do not leave a stray cache behind on the fast physical volume.
+        create_options = _create_options(self.specification)
+        convert_options = _convert_options(self.specification)
+        lvm_physical_volume_path = _lvm_physical_volume_path(
+            self.specification.lvm_physical_volume,
+            context,
+        )
+
+        cmd = [
+            "lvcreate",
+            f"--name={self.specification.name}",
+        ]
+        if self.specification.size:
+            cmd.append(f"--size={self.specification.size}")
+        if self.specification.extents:
+            cmd.append(f"--extents={self.specification.extents}")
+        cmd += create_options
+        cmd.append(self.specification.lvm_volume_group)
+        cmd.append(quote_argument(lvm_physical_volume_path))
+        yield LvmCommand(
+            cmd,
+            logical_volumes=[
+                f"{self.specification.lvm_volume_group}/{self.specification.name}"
+            ],
+        )
+
+        yield Command(
+            ["lvconvert", "--yes"]
+            + convert_options
+            + [
+                f"{self.specification.lvm_volume_group}/"
+                f"{self.specification.lvm_logical_volume}"
+            ]
+        )
+
+
+class LvmCache(Specification):
+    def __init__(
+        self,
+        name: str,
+        type: Optional[str],
+        size: Optional[str],
+        extents: Optional[str],
+        cachemode: Optional[str],
+        policy: Optional[str],
+        chunk_size: Optional[str],
+        lvm_volume_group: str,
+        lvm_logical_volume: str,
+        lvm_physical_volume: str,
+    ):
+        super().__init__(
+            name,
+            [lvm_volume_group, lvm_logical_volume, lvm_physical_volume],
+            apply=LvmCacheApplyCommandGenerator(self),
+        )
+        self.type = type
+        self.size = size
+        self.extents = extents
+        self.cachemode = cachemode
+        self.policy = policy
+        self.chunk_size = chunk_size
+        self.lvm_volume_group = lvm_volume_group
+        self.lvm_logical_volume = lvm_logical_volume
+        self.lvm_physical_volume = lvm_physical_volume
+
+    def resolve_device(self) -> ResolveLink:
+        return ResolveLink(self.lvm_volume_group, self.lvm_logical_volume)
+
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        if not _cached(self, context.state):
+            return "missing"
+        logical_volume = context.state.logical_volume(
+            self.lvm_volume_group,
+            self.lvm_logical_volume,
+        )
+        return "active" if logical_volume and _active(logical_volume) else "present"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The cache exists when the origin exists and has a cache attached.
+        """
+        return context.state is not None and _cached(self, context.state)
+
+
+CACHE_TYPES = ["cache", "writecache"]
+CACHE_MODES = ["writethrough", "writeback", "passthrough"]
+
+
+def _create_options(specification: LvmCache) -> List[str]:
+    """
+    The options that create the cache on the fast physical volume: a cache pool
+    for dm-cache, or a plain logical volume for dm-writecache.
+    """
+    type = _type(specification)
+    if type == "writecache":
+        return []
+
+    options = ["--type=cache-pool"]
+    if specification.chunk_size:
+        options.append(f"--chunksize={specification.chunk_size}")
+    return options
+
+
+def _convert_options(specification: LvmCache) -> List[str]:
+    """
+    The options that attach the cache to the origin logical volume.
+    """
+    type = _type(specification)
+    cache = f"{specification.lvm_volume_group}/{specification.name}"
+    if type == "writecache":
+        for key in ["cachemode", "policy", "chunk_size"]:
+            if getattr(specification, key):
+                raise ValueError(f"Unexpected {key} for writecache")
+        return ["--type=writecache", f"--cachevol={cache}"]
+
+    options = ["--type=cache", f"--cachepool={cache}"]
+    if specification.cachemode:
+        if specification.cachemode not in CACHE_MODES:
+            raise ValueError(
+                f"Unexpected value for cachemode: '{specification.cachemode}'"
+            )
+        options.append(f"--cachemode={specification.cachemode}")
+    if specification.policy:
+        options.append(f"--cachepolicy={specification.policy}")
+    return options
+
+
+def _type(specification: LvmCache) -> str:
+    type = specification.type or "cache"
+    if type not in CACHE_TYPES:
+        raise ValueError(f"Unexpected value for type: '{type}'")
+    return type
+
+
+def _cached(specification: LvmCache, state: State) -> bool:
+    logical_volume = state.logical_volume(
+        specification.lvm_volume_group,
+        specification.lvm_logical_volume,
+    )
+    if logical_volume is None:
+        return False
+    # The first character of the attributes is "C" for cached volumes. Volumes
+    # read from the kernel have no attributes, but their caches leave the
+    # original origin behind as a hidden device-mapper device.
+    return logical_volume.get("lv_attr", "")[0:1] == "C" or any(
+        state.logical_volume(
+            specification.lvm_volume_group,
+            f"{specification.lvm_logical_volume}_{suffix}",
+        )
+        for suffix in ["corig", "wcorig"]
+    )
+
+
+def _active(logical_volume: Dict[str, Any]) -> bool:
+    # The fifth character of the attributes is "a" for active volumes.
+    return (
+        logical_volume.get("lv_active") == "active"
+        or logical_volume.get("lv_attr", "")[4:5] == "a"
+    )
+
+
+def _lvm_physical_volume_path(lvm_physical_volume: str, context: CommandContext) -> str:
+    lvm_physical_volume_path = context.graph.resolve_device(lvm_physical_volume)
+    if not lvm_physical_volume_path:
+        raise ValueError(
+            f"Failed to find lvm physical volume path {lvm_physical_volume}"
+        )
+    return lvm_physical_volume_path
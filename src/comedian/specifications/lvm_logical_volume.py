@@ -1,6 +1,12 @@
-from typing import Iterator, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
-from comedian.command import Command, CommandContext, CommandGenerator, quote_argument
+from comedian.command import (
+    Command,
+    CommandContext,
+    CommandGenerator,
+    LvmCommand,
+    quote_argument,
+)
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
 
@@ -37,7 +43,12 @@ class LvmLogicalVolumeApplyCommandGenerator(CommandGenerator):
         cmd.append(self.specification.lvm_volume_group)
         cmd += [quote_argument(path) for path in lvm_physical_volume_paths]
 
-        yield Command(cmd)
+        yield LvmCommand(
+            cmd,
+            logical_volumes=[
+                f"{self.specification.lvm_volume_group}/{self.specification.name}"
+            ],
+        )
 
 
 class LvmLogicalVolume(Specification):
@@ -79,6 +90,33 @@ class LvmLogicalVolume(Specification):
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(self.lvm_volume_group, self.name)
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        logical_volume = context.state.logical_volume(self.lvm_volume_group, self.name)
+        if logical_volume is None:
+            return "missing"
+        return "active" if _active(logical_volume) else "present"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The logical volume exists when its volume group holds it. It is
+        activated along with its volume group.
+        """
+        return (
+            context.state is not None
+            and context.state.logical_volume(self.lvm_volume_group, self.name)
+            is not None
+        )
+
+
+def _active(logical_volume: Dict[str, Any]) -> bool:
+    # The fifth character of the attributes is "a" for active volumes.
+    return (
+        logical_volume.get("lv_active") == "active"
+        or logical_volume.get("lv_attr", "")[4:5] == "a"
+    )
+
 
 def _lvm_physical_volume_path(lvm_physical_volume: str, context: CommandContext) -> str:
     lvm_physical_volume_path = context.graph.resolve_device(lvm_physical_volume)
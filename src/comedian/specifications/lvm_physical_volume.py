@@ -3,6 +3,7 @@ from typing import Iterator
 from comedian.command import Command, CommandContext, CommandGenerator, quote_argument
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
+from comedian.topology import node_topology
 
 
 class LvmPhysicalVolumeApplyCommandGenerator(CommandGenerator):
@@ -16,7 +17,19 @@ class LvmPhysicalVolumeApplyCommandGenerator(CommandGenerator):
                 "Failed to find device path {}".format(self.specification.device)
             )
 
-        yield Command(["pvcreate", quote_argument(device_path)])
+        cmd = ["pvcreate"]
+        # Align the start of the data area (and so every extent) to the devices
+        # beneath this volume.
+        topology = node_topology(context, self.specification.device)
+        if topology is not None and topology.optimal_io_size:
+            cmd.append(f"--dataalignment={_lvm_size(topology.granularity)}")
+            if topology.alignment_offset:
+                cmd.append(
+                    f"--dataalignmentoffset={_lvm_size(topology.alignment_offset)}"
+                )
+
+        # Volumes created with the same options are created together.
+        yield Command(cmd + [quote_argument(device_path)], batch=len(cmd))
 
 
 class LvmPhysicalVolume(Specification):
@@ -30,3 +43,18 @@ class LvmPhysicalVolume(Specification):
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(self.device, None)
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The physical volume exists when its device is one.
+        """
+        device_path = context.graph.resolve_device(self.device)
+        return (
+            context.state is not None
+            and bool(device_path)
+            and context.state.physical_volume(str(device_path)) is not None
+        )
+
+
+def _lvm_size(size: int) -> str:
+    return f"{size // 1024}k" if size % 1024 == 0 else f"{size // 512}s"
@@ -1,6 +1,12 @@
-from typing import Iterator, List
-
-from comedian.command import Command, CommandContext, CommandGenerator, quote_argument
+from typing import Any, Dict, Iterator, List, Optional
+
+from comedian.command import (
+    Command,
+    CommandContext,
+    CommandGenerator,
+    LvmCommand,
+    quote_argument,
+)
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
 
@@ -15,9 +21,10 @@ class LvmVolumeGroupApplyCommandGenerator(CommandGenerator):
             for lvm_physical_volume in self.specification.lvm_physical_volumes
         ]
 
-        yield Command(
+        yield LvmCommand(
             ["vgcreate", self.specification.name]
-            + [quote_argument(path) for path in lvm_physical_volume_paths]
+            + [quote_argument(path) for path in lvm_physical_volume_paths],
+            volume_groups=[self.specification.name],
         )
 
 
@@ -26,7 +33,7 @@ class LvmVolumeGroupUpCommandGenerator(CommandGenerator):
         self.specification = specification
 
     def __call__(self, context: CommandContext) -> Iterator[Command]:
-        yield Command(["vgchange", "--activate", "y", self.specification.name])
+        yield Command(["vgchange", "--activate", "y", self.specification.name], batch=3)
 
 
 class LvmVolumeGroupDownCommandGenerator(CommandGenerator):
@@ -34,7 +41,7 @@ class LvmVolumeGroupDownCommandGenerator(CommandGenerator):
         self.specification = specification
 
     def __call__(self, context: CommandContext) -> Iterator[Command]:
-        yield Command(["vgchange", "--activate", "n", self.specification.name])
+        yield Command(["vgchange", "--activate", "n", self.specification.name], batch=3)
 
 
 class LvmVolumeGroup(Specification):
@@ -55,6 +62,35 @@ class LvmVolumeGroup(Specification):
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(None, f"/dev/{self.name}")
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        state = context.state
+        if state is None:
+            return None
+        if any(key.startswith(f"{self.name}/") for key in state.logical_volumes):
+            return "active"
+        return "present" if self.name in state.volume_groups else "missing"
+
+    def exists(self, context: CommandContext) -> bool:
+        return context.state is not None and self.name in context.state.volume_groups
+
+    def active(self, context: CommandContext) -> bool:
+        """
+        The volume group is active when every logical volume within it is.
+        """
+        return context.state is not None and all(
+            _active(logical_volume)
+            for logical_volume in context.state.logical_volumes.values()
+            if logical_volume.get("vg_name") == self.name
+        )
+
+
+def _active(logical_volume: Dict[str, Any]) -> bool:
+    # The fifth character of the attributes is "a" for active volumes.
+    return (
+        logical_volume.get("lv_active") == "active"
+        or logical_volume.get("lv_attr", "")[4:5] == "a"
+    )
+
 
 def _lvm_physical_volume_path(lvm_physical_volume: str, context: CommandContext) -> str:
     lvm_physical_volume_path = context.graph.resolve_device(lvm_physical_volume)
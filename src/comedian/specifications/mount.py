@@ -1,5 +1,6 @@
 from typing import Iterator, List, Optional
 
+from comedian import sysfs
 from comedian.command import (
     Command,
     CommandContext,
@@ -20,8 +21,9 @@ class MountUpCommandGenerator(CommandGenerator):
         mount_cmd = ["mount"]
         if self.specification.type:
             mount_cmd += ["--types", quote_argument(self.specification.type)]
-        if self.specification.options:
-            mount_cmd += ["-o", quote_argument(",".join(self.specification.options))]
+        options = _options(self.specification, context)
+        if options:
+            mount_cmd += ["-o", quote_argument(",".join(options))]
 
         if self.specification.device:
             device_path = _device_path(self.specification.device, context)
@@ -71,13 +73,13 @@ class MountApplyCommandGenerator(MountUpCommandGenerator):
                     quote_argument(identify_path),
                     quote_argument(mountpoint_path),
                     quote_argument(self.specification.type),
-                    quote_argument(",".join(self.specification.options)),
+                    quote_argument(",".join(_options(self.specification, context))),
                     str(self.specification.dump_frequency or 0),
                     str(self.specification.fsck_order or 0),
                 ]
             ),
         ]
-        yield fstab_append(context, "\\n".join(fstab_entry))
+        fstab_append(context, "\\n".join(fstab_entry))
 
 
 class Mount(Specification):
@@ -91,6 +93,7 @@ class Mount(Specification):
         options: List[str],
         dump_frequency: Optional[int],
         fsck_order: Optional[int],
+        profile: Optional[str] = None,
     ):
         dependencies = [mountpoint]
         if device:
@@ -109,6 +112,7 @@ class Mount(Specification):
         self.options = options
         self.dump_frequency = dump_frequency
         self.fsck_order = fsck_order
+        self.profile = profile
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(self.device, None)
@@ -116,6 +120,82 @@ class Mount(Specification):
     def resolve_path(self) -> ResolveLink:
         return ResolveLink(self.mountpoint, None)
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        mountpoint_path = _mountpoint_path(self.mountpoint, context)
+        mount = context.state.mount(context.config.media_path(mountpoint_path))
+        if mount is None or mount.get("fstype") != self.type:
+            return "missing"
+        return "mounted"
+
+    def exists(self, context: CommandContext) -> bool:
+        # Mounts leave nothing behind but their entries in fstab.
+        return context.state is not None
+
+    def active(self, context: CommandContext) -> bool:
+        """
+        The mount is active when a filesystem of the same type is mounted at
+        its mountpoint.
+        """
+        if context.state is None:
+            return False
+        mountpoint_path = _mountpoint_path(self.mountpoint, context)
+        mount = context.state.mount(context.config.media_path(mountpoint_path))
+        return mount is not None and mount.get("fstype") == self.type
+
+
+MOUNT_PROFILES = ["default", "fast"]
+
+
+def _options(specification: "Mount", context: CommandContext) -> List[str]:
+    """
+    Expand the profile of a mount into options tuned for its filesystem type
+    and the devices beneath it, followed by the mount's own options. Profile
+    options that the mount's own options already set are left out.
+    """
+    profile = specification.profile or "default"
+    if profile not in MOUNT_PROFILES:
+        raise ValueError(f"Unexpected value for profile: '{profile}'")
+    if profile == "default":
+        return list(specification.options)
+
+    rotational = _rotational(specification.device, context)
+    options = ["noatime", "lazytime"]
+    if specification.type == "ext4":
+        options.append("commit=60")
+    elif specification.type == "xfs":
+        options += ["logbufs=8", "logbsize=256k"]
+    elif specification.type == "btrfs" and rotational is False:
+        options.append("discard=async")
+    if rotational is False:
+        # Solid-state devices appear quickly, so there is no need to wait long
+        # for them at boot.
+        options.append("x-systemd.device-timeout=10s")
+
+    keys = {option.split("=", maxsplit=1)[0] for option in specification.options}
+    return [
+        option for option in options if option.split("=", maxsplit=1)[0] not in keys
+    ] + list(specification.options)
+
+
+def _rotational(device: Optional[str], context: CommandContext) -> Optional[bool]:
+    # A mount is rotational if any device beneath it is, and solid-state if
+    # every known device beneath it is.
+    if not device:
+        return None
+    rotational = None
+    for root in sorted(context.graph.roots(device)):
+        device_path = context.graph.resolve_device(root)
+        if not device_path:
+            continue
+        value = sysfs.queue_attribute(context.config.sys_dir, device_path, "rotational")
+        if value == "1":
+            return True
+        if value == "0":
+            rotational = False
+    return rotational
+
 
 def _device_path(device: str, context: CommandContext) -> str:
     device_path = context.graph.resolve_device(device)
@@ -1,52 +1,10 @@
-from typing import Iterator, List, Optional
+from typing import List, Optional
 
-from comedian.command import (
-    Command,
-    CommandContext,
-    CommandGenerator,
-    parted,
-    quote_argument,
-)
+from comedian.command import CommandContext
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
 
 
-class PartitionApplyCommandGenerator(CommandGenerator):
-    def __init__(self, specification: "Partition"):
-        self.specification = specification
-
-    def __call__(self, context: CommandContext) -> Iterator[Command]:
-        partition_table_path = context.graph.resolve_device(
-            self.specification.partition_table
-        )
-        if not partition_table_path:
-            raise ValueError(
-                "Failed to find partition table path {}".format(
-                    self.specification.partition_table
-                )
-            )
-
-        cmd = [
-            quote_argument(partition_table_path),
-            "mkpart",
-            self.specification.type,
-            self.specification.start,
-            self.specification.end,
-        ]
-        if self.specification.label:
-            cmd += [
-                "name",
-                str(self.specification.number),
-                self.specification.label,
-            ]
-        if self.specification.unit:
-            cmd += ["unit", self.specification.unit]
-        for flag in self.specification.flags:
-            cmd += ["set", str(self.specification.number), flag, "on"]
-
-        yield parted(*cmd, align=self.specification.align)
-
-
 class Partition(Specification):
     def __init__(
         self,
@@ -61,11 +19,7 @@ class Partition(Specification):
         unit: Optional[str],
         flags: List[str],
     ):
-        super().__init__(
-            name,
-            [partition_table],
-            apply=PartitionApplyCommandGenerator(self),
-        )
+        super().__init__(name, [partition_table])
         self.partition_table = partition_table
         self.align = align
         self.number = number
@@ -78,3 +32,11 @@ class Partition(Specification):
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(self.partition_table, str(self.number))
+
+    def status(self, context: CommandContext) -> Optional[str]:
+        device_path = context.graph.resolve_device(self.name)
+        if context.state is None or not device_path:
+            return None
+        if context.state.block_device(device_path) is None:
+            return "missing"
+        return "present"
@@ -1,4 +1,5 @@
-from typing import Iterator, Optional
+import re
+from typing import Iterator, List, Optional, Tuple
 
 from comedian.command import (
     Command,
@@ -9,6 +10,28 @@ from comedian.command import (
 )
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
+from comedian.specifications.partition import Partition
+from comedian.topology import Topology, node_topology
+
+_POSITION_PATTERN = re.compile(r"^(\d+)(B|kB|MB|GB|TB|KiB|MiB|GiB|TiB)$")
+
+_POSITION_UNITS = {
+    "B": 1,
+    "kB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+    "TB": 1000**4,
+    "KiB": 1024,
+    "MiB": 1024**2,
+    "GiB": 1024**3,
+    "TiB": 1024**4,
+}
+
+# The unit that parted interprets positions in unless told otherwise.
+_DEFAULT_UNIT = "compact"
+
+# The names that blkid reports for the label types that parted writes.
+_PTTYPES = {"msdos": "dos"}
 
 
 class PartitionTableApplyCommandGenerator(CommandGenerator):
@@ -21,11 +44,26 @@ class PartitionTableApplyCommandGenerator(CommandGenerator):
             raise ValueError(
                 "Failed to find device path {}".format(self.specification.device)
             )
-        yield parted(quote_argument(device_path), "mklabel", self.specification.type)
+
+        topology = None
+        if any(
+            partition.align == "topology" for partition in self.specification.partitions
+        ):
+            topology = node_topology(context, self.specification.device)
+
+        for align, cmd in _scripts(self.specification, topology):
+            yield parted(quote_argument(device_path), *cmd, align=align)
 
 
 class PartitionTable(Specification):
-    def __init__(self, name: str, device: str, type: str, glue: Optional[str]):
+    def __init__(
+        self,
+        name: str,
+        device: str,
+        type: str,
+        glue: Optional[str],
+        partitions: Optional[List[Partition]] = None,
+    ):
         super().__init__(
             name,
             [device],
@@ -34,6 +72,7 @@ class PartitionTable(Specification):
         self.device = device
         self.type = type
         self.glue = glue
+        self.partitions = partitions if partitions else []
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(self.device, None, self._join)
@@ -41,3 +80,113 @@ class PartitionTable(Specification):
     def _join(self, partition_table: str, partition_number: str) -> str:
         glue = self.glue if self.glue else ""
         return f"{partition_table}{glue}{partition_number}"
+
+    def status(self, context: CommandContext) -> Optional[str]:
+        # Partitions only appear once their table has been written.
+        state = context.state
+        if state is None:
+            return None
+        for partition in self.partitions:
+            device_path = context.graph.resolve_device(partition.name)
+            if not device_path or state.block_device(device_path) is None:
+                return "missing"
+        return "present"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The table exists when its device has a label of the same type, and
+        every partition exists.
+        """
+        state = context.state
+        device_path = context.graph.resolve_device(self.device)
+        if state is None or not device_path:
+            return False
+        pttype = state.identify(device_path).get("pttype")
+        if pttype != _PTTYPES.get(self.type, self.type):
+            return False
+        return all(
+            state.block_device(context.graph.resolve_device(partition.name) or "")
+            is not None
+            for partition in self.partitions
+        )
+
+
+def _scripts(
+    specification: "PartitionTable", topology: Optional[Topology]
+) -> List[Tuple[Optional[str], List[str]]]:
+    """
+    The alignment and commands of every parted script that writes the table.
+
+    The label and every partition are written by a single parted script, so the
+    table is only rewritten (and re-read by the kernel) once. Alignment applies
+    to a whole invocation, so a new script is only started where the alignment
+    of consecutive partitions changes.
+    """
+    scripts: List[Tuple[Optional[str], List[str]]] = []
+    cmd = ["mklabel", specification.type]
+    align = None
+    unit = _DEFAULT_UNIT
+    for index, partition in enumerate(specification.partitions):
+        partition_align, start, end = _placement(partition, topology)
+        if index and partition_align != align:
+            scripts.append((align, cmd))
+            cmd = []
+            unit = _DEFAULT_UNIT
+        align = partition_align
+
+        # The unit applies to every later command of the script, so it is set
+        # for every partition that differs from the one before it.
+        partition_unit = partition.unit or _DEFAULT_UNIT
+        if partition_unit != unit:
+            cmd += ["unit", partition_unit]
+            unit = partition_unit
+        cmd += _partition_arguments(partition, start, end)
+    scripts.append((align, cmd))
+    return scripts
+
+
+def _placement(
+    partition: Partition, topology: Optional[Topology]
+) -> Tuple[Optional[str], str, str]:
+    """
+    The alignment, start and end that a partition is created with.
+    """
+    if partition.align != "topology":
+        return partition.align, partition.start, partition.end
+
+    # Without a known topology, or with positions that cannot be aligned here,
+    # parted aligns to the topology it finds itself.
+    start = _parse_position(partition.start, partition.unit)
+    end = _parse_position(partition.end, partition.unit)
+    if topology is None or start is None or end is None:
+        return "optimal", partition.start, partition.end
+
+    # Ends are inclusive, so a partition ends on the byte just before the
+    # aligned position that a partition starting at the same place would start
+    # on.
+    return "none", f"{topology.align(start)}B", f"{topology.align(end) - 1}B"
+
+
+def _partition_arguments(partition: Partition, start: str, end: str) -> List[str]:
+    cmd = ["mkpart", partition.type, start, end]
+    if partition.label:
+        cmd += ["name", str(partition.number), partition.label]
+    for flag in partition.flags:
+        cmd += ["set", str(partition.number), flag, "on"]
+    return cmd
+
+
+def _parse_position(position: str, unit: Optional[str]) -> Optional[int]:
+    # Only positions with a byte-based unit (either their own or the unit of
+    # their partition) can be aligned; sectors, percentages and positions in
+    # parted's default unit are left to parted.
+    match = _POSITION_PATTERN.match(position)
+    if match:
+        value, unit = match.groups()
+    elif position.isdigit():
+        value = position
+    else:
+        return None
+    if unit not in _POSITION_UNITS:
+        return None
+    return int(value) * _POSITION_UNITS[unit]
@@ -1,10 +1,27 @@
+from typing import Optional
+
+from comedian.command import CommandContext
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
 
 
 class PhysicalDevice(Specification):
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        dd_bs: Optional[str] = None,
+        direct_io: Optional[bool] = None,
+    ):
         super().__init__(name, [])
+        self.dd_bs = dd_bs
+        self.direct_io = direct_io
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(None, f"/dev/{self.name}")
+
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        if context.state.block_device(f"/dev/{self.name}") is None:
+            return "missing"
+        return "present"
@@ -1,8 +1,24 @@
-from typing import Iterator, List
+import math
+from typing import Iterator, List, Optional
 
-from comedian.command import Command, CommandContext, CommandGenerator, quote_argument
+from comedian import native, sysfs
+from comedian.command import (
+    Command,
+    CommandContext,
+    CommandGenerator,
+    quote_argument,
+    quote_subcommand,
+)
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
+from comedian.topology import Topology, node_topology
+
+# The chunk size mdadm uses when none is given.
+_DEFAULT_CHUNK = 512 * 1024
+
+_STRIPED_LEVELS = {"0", "10", "raid0", "raid10", "stripe"}
+
+_PARITY_LEVELS = {"4", "5", "6", "raid4", "raid5", "raid6"}
 
 
 class RaidVolumeApplyCommandGenerator(CommandGenerator):
@@ -21,10 +37,18 @@ class RaidVolumeApplyCommandGenerator(CommandGenerator):
             f"--level={self.specification.level}",
             f"--metadata={self.specification.metadata}",
             f"--raid-devices={len(self.specification.devices)}",
-            quote_argument(_raid_device(self.specification.name)),
         ]
+        cmd += _geometry_options(self.specification, context)
+        if self.specification.assume_clean:
+            cmd.append("--assume-clean")
+        if self.specification.bitmap:
+            cmd.append(f"--bitmap={quote_argument(self.specification.bitmap)}")
+        if self.specification.bitmap_chunk:
+            cmd.append(f"--bitmap-chunk={self.specification.bitmap_chunk}")
+        cmd.append(quote_argument(_raid_device(self.specification.name)))
 
         yield Command(cmd + [quote_argument(path) for path in device_paths])
+        yield from _sync_speed_commands(self.specification, context)
 
 
 class RaidVolumeUpCommandGenerator(CommandGenerator):
@@ -41,8 +65,12 @@ class RaidVolumeUpCommandGenerator(CommandGenerator):
             "--assemble",
             quote_argument(_raid_device(self.specification.name)),
         ]
+        # The journal is a member of the array, so it is assembled with it.
+        if self.specification.write_journal:
+            device_paths.append(_device_path(self.specification.write_journal, context))
 
         yield Command(cmd + [quote_argument(path) for path in device_paths])
+        yield from _sync_speed_commands(self.specification, context)
 
 
 class RaidVolumeDownCommandGenerator(CommandGenerator):
@@ -60,16 +88,30 @@ class RaidVolumeDownCommandGenerator(CommandGenerator):
 
 
 class RaidVolume(Specification):
+    # pylint: disable=R0902
+
     def __init__(
         self,
         name: str,
         devices: List[str],
         level: str,
         metadata: str,
+        assume_clean: Optional[bool] = None,
+        bitmap: Optional[str] = None,
+        bitmap_chunk: Optional[str] = None,
+        sync_speed_min: Optional[int] = None,
+        sync_speed_max: Optional[int] = None,
+        chunk: Optional[str] = None,
+        layout: Optional[str] = None,
+        consistency_policy: Optional[str] = None,
+        write_journal: Optional[str] = None,
     ):
+        dependencies = list(devices)
+        if write_journal:
+            dependencies.append(write_journal)
         super().__init__(
             name,
-            devices,
+            dependencies,
             apply=RaidVolumeApplyCommandGenerator(self),
             up=RaidVolumeUpCommandGenerator(self),
             down=RaidVolumeDownCommandGenerator(self),
@@ -77,15 +119,189 @@ class RaidVolume(Specification):
         self.devices = devices
         self.level = level
         self.metadata = metadata
+        self.assume_clean = assume_clean
+        self.bitmap = bitmap
+        self.bitmap_chunk = bitmap_chunk
+        self.sync_speed_min = sync_speed_min
+        self.sync_speed_max = sync_speed_max
+        self.chunk = chunk
+        self.layout = layout
+        self.consistency_policy = consistency_policy
+        self.write_journal = write_journal
 
     def resolve_device(self) -> ResolveLink:
         return ResolveLink(None, _raid_device(self.name))
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        md_array = context.state.md_array(
+            [_device_path(device, context) for device in self._members()]
+        )
+        if md_array is None:
+            return "missing"
+        return "active" if md_array["state"] == "active" else "present"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The array exists when every member carries its superblock.
+        """
+        state = context.state
+        if state is None:
+            return False
+        for device in self._members():
+            identifiers = state.identify(_device_path(device, context))
+            # Superblocks name their array as "homehost:name".
+            if (
+                identifiers.get("type") != "linux_raid_member"
+                or identifiers.get("label", "").split(":")[-1] != self.name
+            ):
+                return False
+        return True
+
+    def active(self, context: CommandContext) -> bool:
+        """
+        The array is active when it is running.
+        """
+        if context.state is None:
+            return False
+        md_array = context.state.md_array(
+            [_device_path(device, context) for device in self._members()]
+        )
+        return md_array is not None and md_array["state"] == "active"
+
+    def _members(self) -> List[str]:
+        # The journal is a member of the array as well.
+        if self.write_journal:
+            return self.devices + [self.write_journal]
+        return list(self.devices)
+
+    def topology(self, context: CommandContext) -> Optional[Topology]:
+        """
+        Describe the stripe of this array: one chunk is the smallest useful
+        write, and a chunk on every data device is a full stripe. Levels without
+        a stripe (such as mirrors) have the topology of their devices.
+        """
+        data_devices = _data_devices(self.level, self.layout, len(self.devices))
+        if data_devices is None or data_devices < 1:
+            return None
+
+        if self.chunk:
+            chunk = _parse_chunk(self.chunk)
+        else:
+            chunk = _chunk(self.level, node_topology(context, *self.devices))
+        if not chunk:
+            chunk = _DEFAULT_CHUNK
+        return Topology(0, chunk, chunk * data_devices)
+
 
 def _raid_device(name: str) -> str:
     return f"/dev/md/{name}"
 
 
+def _sync_speed_commands(
+    specification: "RaidVolume", context: CommandContext
+) -> Iterator[Command]:
+    # Resync speed limits belong to the running array, so they are set again
+    # whenever it is assembled.
+    raid_device = _raid_device(specification.name)
+    for attribute, value in [
+        ("sync_speed_min", specification.sync_speed_min),
+        ("sync_speed_max", specification.sync_speed_max),
+    ]:
+        if value is None:
+            continue
+        path = (
+            f"{quote_argument(context.config.sys_dir)}/block/"
+            f'"$(basename "$(realpath {quote_argument(raid_device)})")"/md/{attribute}'
+        )
+        yield Command(
+            [
+                quote_argument(context.config.shell),
+                "-c",
+                quote_subcommand(f"echo {value} > {path}"),
+            ],
+            native=_set_md_attribute(raid_device, attribute, value),
+        )
+
+
+def _set_md_attribute(raid_device: str, attribute: str, value: int):
+    def set_md_attribute(context: CommandContext):
+        sysfs.write_attribute(
+            context.config.sys_dir, raid_device, f"md/{attribute}", str(value)
+        )
+
+    return set_md_attribute
+
+
+def _chunk(level: str, topology: Optional[Topology]) -> Optional[int]:
+    """
+    Choose a chunk size that keeps every chunk aligned to the optimal I/O size
+    of the member devices (such as the stripe of a RAID controller beneath
+    them), when none is given explicitly. Returns None when mdadm's default
+    chunk size is already aligned.
+    """
+    if topology is None or not topology.optimal_io_size:
+        return None
+    if level not in _STRIPED_LEVELS | _PARITY_LEVELS:
+        return None
+
+    chunk = math.lcm(_DEFAULT_CHUNK, topology.granularity)
+    if chunk == _DEFAULT_CHUNK:
+        return None
+    # Parity levels only support chunk sizes that are powers of two.
+    if level in _PARITY_LEVELS and chunk & (chunk - 1):
+        return None
+    return chunk
+
+
+def _data_devices(level: str, layout: Optional[str], devices: int) -> Optional[int]:
+    level = level[len("raid") :] if level.startswith("raid") else level
+    if level in ["0", "stripe"]:
+        return devices
+    if level in ["4", "5"]:
+        return devices - 1
+    if level == "6":
+        return devices - 2
+    if level == "10":
+        # Every chunk is stored as several copies ("n2", "f2" and "o2" layouts
+        # all store two), which only form whole stripes when they divide the
+        # number of devices evenly.
+        copies = int(layout[1:]) if layout and layout[1:].isdigit() else 2
+        return devices // copies if devices % copies == 0 else None
+    return None
+
+
+def _parse_chunk(chunk: str) -> Optional[int]:
+    # mdadm reads chunk sizes without a unit as KiB.
+    if chunk.isdigit():
+        return int(chunk) * 1024
+    return native.parse_size(chunk)
+
+
+def _geometry_options(specification: RaidVolume, context: CommandContext) -> List[str]:
+    """
+    The options that lay the array out across its devices (and its journal).
+    """
+    options = []
+    if specification.chunk:
+        options.append(f"--chunk={specification.chunk}")
+    else:
+        chunk = _chunk(
+            specification.level, node_topology(context, *specification.devices)
+        )
+        if chunk:
+            options.append(f"--chunk={chunk // 1024}K")
+    if specification.layout:
+        options.append(f"--layout={specification.layout}")
+    if specification.consistency_policy:
+        options.append(f"--consistency-policy={specification.consistency_policy}")
+    if specification.write_journal:
+        journal_path = _device_path(specification.write_journal, context)
+        options.append(f"--write-journal={quote_argument(journal_path)}")
+    return options
+
+
 def _device_path(device: str, context: CommandContext) -> str:
     device_path = context.graph.resolve_device(device)
     if not device_path:
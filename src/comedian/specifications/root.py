@@ -5,33 +5,13 @@ from comedian.command import (
     Command,
     CommandContext,
     CommandGenerator,
-    cp,
-    chmod,
-    chown,
+    install_file,
     mkdir,
 )
 from comedian.graph import ResolveLink
 from comedian.specification import Specification
 
 
-class RootApplyCommandGenerator(CommandGenerator):
-    def __init__(self, specification: "Root"):
-        self.specification = specification
-
-    def __call__(self, context: CommandContext) -> Iterator[Command]:
-        yield mkdir(context.config.tmp_path("/etc"))
-
-        tmp_fstab_path = context.config.tmp_path("/etc/fstab")
-        yield Command(["truncate", "--size=0", tmp_fstab_path])
-        yield chmod("0644", tmp_fstab_path)
-        yield chown("root", "root", tmp_fstab_path)
-
-        tmp_crypttab_path = context.config.tmp_path("/etc/crypttab")
-        yield Command(["truncate", "--size=0", tmp_crypttab_path])
-        yield chmod("0644", tmp_crypttab_path)
-        yield chown("root", "root", tmp_crypttab_path)
-
-
 class RootPostApplyCommandGenerator(CommandGenerator):
     def __init__(self, specification: "Root"):
         self.specification = specification
@@ -39,13 +19,25 @@ class RootPostApplyCommandGenerator(CommandGenerator):
     def __call__(self, context: CommandContext) -> Iterator[Command]:
         yield mkdir(context.config.media_path("/etc"))
 
-        tmp_fstab_path = context.config.tmp_path("/etc/fstab")
-        media_fstab_path = context.config.media_path("/etc/fstab")
-        yield cp(tmp_fstab_path, media_fstab_path)
-
-        tmp_crypttab_path = context.config.tmp_path("/etc/crypttab")
-        media_crypttab_path = context.config.media_path("/etc/crypttab")
-        yield cp(tmp_crypttab_path, media_crypttab_path)
+        # Every other specification has finished its apply commands by now, so
+        # the accumulated entries are complete and each file can be written
+        # exactly once.
+        yield install_file(
+            context,
+            context.config.media_path("/etc/fstab"),
+            context.fstab,
+            "0644",
+            "root",
+            "root",
+        )
+        yield install_file(
+            context,
+            context.config.media_path("/etc/crypttab"),
+            context.crypttab,
+            "0644",
+            "root",
+            "root",
+        )
 
 
 class Root(Specification):
@@ -53,7 +45,6 @@ class Root(Specification):
         super().__init__(
             "//",
             [],
-            apply=RootApplyCommandGenerator(self),
             post_apply=RootPostApplyCommandGenerator(self),
         )
 
@@ -50,7 +50,7 @@ class SwapVolumeApplyCommandGenerator(SwapVolumeUpCommandGenerator):
             f"# {self.specification.name} (originally {device_path})",
             "\\t".join([identify_path, "none", "swap", "defaults", "0", "0"]),
         ]
-        yield fstab_append(context, "\\n".join(fstab_entry))
+        fstab_append(context, "\\n".join(fstab_entry))
 
 
 class SwapVolume(Specification):
@@ -76,6 +76,37 @@ class SwapVolume(Specification):
         self.pagesize = pagesize
         self.uuid = uuid
 
+    def status(self, context: CommandContext) -> Optional[str]:
+        if context.state is None:
+            return None
+        device_path = _device_path(self.device, context)
+        return "active" if context.state.swapping(device_path) else "missing"
+
+    def exists(self, context: CommandContext) -> bool:
+        """
+        The swap volume exists when its device holds swap space.
+        """
+        return (
+            context.state is not None
+            and context.state.identify(_device_path(self.device, context)).get("type")
+            == "swap"
+        )
+
+    def active(self, context: CommandContext) -> bool:
+        """
+        The swap volume is active when its space is in use.
+        """
+        if context.state is None:
+            return False
+        block_device = context.state.block_device(_device_path(self.device, context))
+        if block_device is None:
+            return False
+        # Older versions of lsblk only report a single mountpoint.
+        mountpoints = block_device.get("mountpoints") or [
+            block_device.get("mountpoint")
+        ]
+        return "[SWAP]" in mountpoints
+
 
 def _device_path(device: str, context: CommandContext) -> str:
     device_path = context.graph.resolve_device(device)
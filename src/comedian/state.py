@@ -0,0 +1,458 @@
+"""
+State API for taking a snapshot of the block devices of a running system.
+
+A full snapshot is gathered in a single pass over the reports of the usual tools
+(`lsblk`, `blkid`, `findmnt`, `dmsetup`, `losetup`, and the LVM reporting
+commands) and `/proc/mdstat`, so that every node in a graph can be compared with the system
+without running any commands of its own. A lighter snapshot, which only knows
+what is active or mounted, is read from `/proc`, `/sys` and `/dev` alone.
+"""
+
+import json
+import os
+import re
+import subprocess
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from comedian.traits import DebugMixin
+
+__all__ = ["STATE_COMMANDS", "State", "parse_state", "probe_state", "read_state"]
+
+STATE_COMMANDS = {
+    "lsblk": ["lsblk", "--json", "-O"],
+    "blkid": ["blkid"],
+    "findmnt": ["findmnt", "--json"],
+    "dmsetup": ["dmsetup", "info"],
+    "pvs": ["pvs", "--reportformat", "json"],
+    "vgs": ["vgs", "--reportformat", "json"],
+    "lvs": ["lvs", "--reportformat", "json"],
+    "losetup": ["losetup", "--list", "--json"],
+}
+
+_BLKID_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# Device-mapper names of logical volumes are "{vg}-{lv}", with every hyphen
+# within either name doubled.
+_LVM_DM_NAME_PATTERN = re.compile(r"^((?:[^-]|--)+)-((?:[^-]|--)+)$")
+
+
+class State(DebugMixin):
+    """
+    A snapshot of the block devices, mounts, device-mapper devices, RAID arrays,
+    loop devices and LVM objects of a system.
+
+    Block devices are known by several paths (such as `/dev/vg/lv`,
+    `/dev/mapper/vg-lv` and `/dev/dm-0`), so every lookup by path tries each of
+    them.
+    """
+
+    # pylint: disable=R0902
+
+    def __init__(
+        self,
+        block_devices: Optional[List[Dict[str, Any]]] = None,
+        identifiers: Optional[Dict[str, Dict[str, str]]] = None,
+        mounts: Optional[List[Dict[str, Any]]] = None,
+        md_arrays: Optional[Dict[str, Dict[str, Any]]] = None,
+        dm_devices: Optional[Set[str]] = None,
+        physical_volumes: Optional[List[Dict[str, Any]]] = None,
+        volume_groups: Optional[List[Dict[str, Any]]] = None,
+        logical_volumes: Optional[List[Dict[str, Any]]] = None,
+        swaps: Optional[Set[str]] = None,
+        loop_devices: Optional[Dict[str, str]] = None,
+        root: str = "/",
+    ):
+        self.block_devices: Dict[str, Dict[str, Any]] = {}
+        for block_device in block_devices or []:
+            for key in ["path", "kname"]:
+                if block_device.get(key):
+                    self.block_devices.setdefault(
+                        _dev_path(block_device[key]), block_device
+                    )
+        self.identifiers = identifiers or {}
+        self.mounts = {mount["target"]: mount for mount in mounts or []}
+        self.md_arrays = md_arrays or {}
+        self.dm_devices = dm_devices or set()
+        self.physical_volumes = {
+            pv["pv_name"]: pv for pv in physical_volumes or [] if pv.get("pv_name")
+        }
+        self.volume_groups = {
+            vg["vg_name"]: vg for vg in volume_groups or [] if vg.get("vg_name")
+        }
+        self.logical_volumes = {
+            f"{lv.get('vg_name')}/{lv.get('lv_name')}": lv
+            for lv in logical_volumes or []
+        }
+        self.swaps = swaps or set()
+        self.loop_devices = loop_devices or {}
+        self.root = root
+        # The devices held by the shell variables that commands capture them in.
+        self.variables: Dict[str, str] = {}
+
+    def block_device(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the block device at path, or None if there is no such device.
+        """
+        for candidate in self._paths(path):
+            if candidate in self.block_devices:
+                return self.block_devices[candidate]
+        return None
+
+    def identify(self, path: str) -> Dict[str, str]:
+        """
+        Find the identifiers of the contents of the block device at path (such
+        as its type, UUID and label), with lowercase keys.
+
+        The reports of lsblk come from the udev database, which is not kept up
+        to date in every environment, so the identifiers probed by blkid take
+        precedence.
+        """
+        identifiers: Dict[str, str] = {}
+        block_device = self.block_device(path)
+        if block_device is not None:
+            for key, lsblk_key in [
+                ("type", "fstype"),
+                ("uuid", "uuid"),
+                ("label", "label"),
+                ("pttype", "pttype"),
+            ]:
+                if block_device.get(lsblk_key):
+                    identifiers[key] = block_device[lsblk_key]
+        for candidate in self._aliases(path):
+            if candidate in self.identifiers:
+                identifiers.update(self.identifiers[candidate])
+                break
+        return identifiers
+
+    def mount(self, target: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the mount at target, or None if nothing is mounted there.
+        """
+        return self.mounts.get(os.path.normpath(target))
+
+    def mounted(self, path: str) -> bool:
+        """
+        Determine whether the block device at path is mounted anywhere.
+        """
+        block_device = self.block_device(path)
+        return block_device is not None and any(
+            self.block_device(mount.get("source") or "") is block_device
+            for mount in self.mounts.values()
+        )
+
+    def swapping(self, path: str) -> bool:
+        """
+        Determine whether the block device or file at path is in use as swap
+        space.
+        """
+        return any(alias in self.swaps for alias in self._aliases(path))
+
+    def md_array(self, paths: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Find the RAID array made of exactly the block devices at paths, or None
+        if there is no such array.
+        """
+        knames = set()
+        for path in paths:
+            block_device = self.block_device(path)
+            if block_device is None or not block_device.get("kname"):
+                return None
+            knames.add(block_device["kname"])
+        for md_array in self.md_arrays.values():
+            if set(md_array["devices"]) == knames:
+                return md_array
+        return None
+
+    def physical_volume(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the LVM physical volume on the block device at path, or None if
+        there is no such physical volume.
+        """
+        for candidate in self._aliases(path):
+            if candidate in self.physical_volumes:
+                return self.physical_volumes[candidate]
+        return None
+
+    def logical_volume(self, volume_group: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the LVM logical volume named name within volume_group, or None if
+        there is no such logical volume.
+        """
+        return self.logical_volumes.get(f"{volume_group}/{name}")
+
+    def exists(self, path: str) -> bool:
+        """
+        Determine whether a file, directory or link exists at path beneath the
+        root of the snapshot. Unlike the rest of the snapshot, files are looked
+        up when asked.
+        """
+        return os.path.lexists(os.path.join(self.root, path.lstrip("/")))
+
+    def _paths(self, path: str) -> Iterator[str]:
+        path = self.variables.get(path, path)
+        yield path
+        if os.path.isabs(path):
+            # Symbolic links are followed within the root of the snapshot.
+            real_path = os.path.realpath(os.path.join(self.root, path[1:]))
+            yield "/" + os.path.relpath(real_path, self.root)
+        # Logical volumes are only reported by their device-mapper names.
+        parts = path.split("/")
+        if len(parts) == 4 and parts[1] == "dev" and parts[2] in self.volume_groups:
+            vg_name = parts[2].replace("-", "--")
+            lv_name = parts[3].replace("-", "--")
+            yield f"/dev/mapper/{vg_name}-{lv_name}"
+        # Arrays are only reported by their kernel names, so named arrays are
+        # found through the superblocks of their members.
+        if len(parts) == 4 and parts[1:3] == ["dev", "md"]:
+            for block_device in self.block_devices.values():
+                identifiers = self.identifiers.get(_dev_path(block_device["kname"]), {})
+                label = identifiers.get("label", block_device.get("label")) or ""
+                if label.split(":")[-1] != parts[3]:
+                    continue
+                for child in block_device.get("children", []):
+                    if str(child.get("type")).startswith("raid"):
+                        yield _dev_path(child["kname"])
+
+    def _aliases(self, path: str) -> List[str]:
+        aliases = list(self._paths(path))
+        block_device = self.block_device(path)
+        if block_device is not None:
+            aliases += [
+                _dev_path(block_device[key])
+                for key in ["path", "kname"]
+                if block_device.get(key)
+            ]
+        return aliases
+
+
+def probe_state(mdstat_path: str = "/proc/mdstat") -> State:
+    """
+    Take a snapshot of the running system. Tools that are not installed (or
+    that fail) contribute nothing to the snapshot.
+    """
+    outputs = {}
+    for key, cmd in STATE_COMMANDS.items():
+        try:
+            result = subprocess.run(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+        except OSError:
+            continue
+        # blkid and the LVM commands fail when they find nothing to report.
+        if result.returncode == 0:
+            outputs[key] = result.stdout.decode()
+    if os.path.isfile(mdstat_path):
+        with open(mdstat_path, "r", encoding="utf-8") as f:
+            outputs["mdstat"] = f.read()
+    return parse_state(outputs)
+
+
+def read_state(root: str = "/") -> State:
+    """
+    Take a snapshot of what is active or mounted on the running system, by
+    reading `/proc/self/mountinfo`, `/proc/mdstat`, `/proc/swaps`, `/sys/block`
+    and `/dev/mapper` beneath root. No commands are run, so this is much faster
+    than probe_state, but the contents of devices are not identified, and only
+    active logical volumes (and their volume groups) are known.
+    """
+    block_devices, logical_volumes, loop_devices = _read_sys_block(
+        os.path.join(root, "sys", "block")
+    )
+    mapper_dir = os.path.join(root, "dev", "mapper")
+    dm_devices = set(os.listdir(mapper_dir)) if os.path.isdir(mapper_dir) else set()
+    return State(
+        block_devices=block_devices,
+        mounts=_parse_mountinfo(
+            _read_file(os.path.join(root, "proc", "self", "mountinfo"))
+        ),
+        md_arrays=_parse_mdstat(_read_file(os.path.join(root, "proc", "mdstat"))),
+        dm_devices=dm_devices - {"control"},
+        volume_groups=[
+            {"vg_name": vg_name}
+            for vg_name in sorted({lv["vg_name"] for lv in logical_volumes})
+        ],
+        logical_volumes=logical_volumes,
+        swaps=_parse_swaps(_read_file(os.path.join(root, "proc", "swaps"))),
+        loop_devices=loop_devices,
+        root=root,
+    )
+
+
+def parse_state(outputs: Mapping[str, str]) -> State:
+    """
+    Build a snapshot from the outputs of the commands in STATE_COMMANDS, and
+    the contents of `/proc/mdstat` (as "mdstat"). Missing outputs are treated
+    as empty reports.
+    """
+    return State(
+        block_devices=list(
+            _flatten(_json(outputs.get("lsblk")).get("blockdevices", []))
+        ),
+        identifiers=_parse_blkid(outputs.get("blkid", "")),
+        mounts=list(_flatten(_json(outputs.get("findmnt")).get("filesystems", []))),
+        md_arrays=_parse_mdstat(outputs.get("mdstat", "")),
+        dm_devices=_parse_dmsetup(outputs.get("dmsetup", "")),
+        physical_volumes=_lvm_report(outputs.get("pvs"), "pv"),
+        volume_groups=_lvm_report(outputs.get("vgs"), "vg"),
+        logical_volumes=_lvm_report(outputs.get("lvs"), "lv"),
+        loop_devices=_parse_losetup(outputs.get("losetup")),
+    )
+
+
+def _read_file(path: str) -> str:
+    if not os.path.isfile(path):
+        return ""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def _read_sys_block(
+    sys_block_dir: str,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, str]]:
+    block_devices: List[Dict[str, Any]] = []
+    logical_volumes: List[Dict[str, Any]] = []
+    loop_devices: Dict[str, str] = {}
+    if not os.path.isdir(sys_block_dir):
+        return block_devices, logical_volumes, loop_devices
+
+    for kname in sorted(os.listdir(sys_block_dir)):
+        directory = os.path.join(sys_block_dir, kname)
+        block_device = {"kname": kname, "path": f"/dev/{kname}"}
+        block_devices.append(block_device)
+
+        dm_name = _read_file(os.path.join(directory, "dm", "name"))
+        if dm_name:
+            block_device["path"] = f"/dev/mapper/{dm_name}"
+            match = _LVM_DM_NAME_PATTERN.match(dm_name)
+            dm_uuid = _read_file(os.path.join(directory, "dm", "uuid"))
+            if match and dm_uuid.startswith("LVM-"):
+                # Only active logical volumes have device-mapper devices.
+                logical_volumes.append(
+                    {
+                        "vg_name": match.group(1).replace("--", "-"),
+                        "lv_name": match.group(2).replace("--", "-"),
+                        "lv_active": "active",
+                    }
+                )
+
+        backing_file = _read_file(os.path.join(directory, "loop", "backing_file"))
+        if backing_file:
+            loop_devices[backing_file] = f"/dev/{kname}"
+
+        for partition in sorted(os.listdir(directory)):
+            if os.path.isfile(os.path.join(directory, partition, "partition")):
+                block_devices.append({"kname": partition, "path": f"/dev/{partition}"})
+
+    return block_devices, logical_volumes, loop_devices
+
+
+def _json(output: Optional[str]) -> Dict[str, Any]:
+    return json.loads(output) if output and output.strip() else {}
+
+
+def _flatten(entries: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for entry in entries:
+        yield entry
+        yield from _flatten(entry.get("children", []))
+
+
+def _dev_path(name: str) -> str:
+    return name if name.startswith("/") else f"/dev/{name}"
+
+
+def _parse_blkid(output: str) -> Dict[str, Dict[str, str]]:
+    # /dev/sda1: UUID="..." TYPE="ext4" PARTUUID="..."
+    identifiers = {}
+    for line in output.splitlines():
+        path, separator, fields = line.partition(": ")
+        if not separator:
+            continue
+        identifiers[path] = {
+            key.lower(): re.sub(r"\\(.)", r"\1", value)
+            for key, value in _BLKID_PATTERN.findall(fields)
+        }
+    return identifiers
+
+
+def _parse_mdstat(output: str) -> Dict[str, Dict[str, Any]]:
+    # md127 : active raid1 sdb1[1] sda1[0]
+    md_arrays = {}
+    for line in output.splitlines():
+        name, separator, fields = line.partition(" : ")
+        if not separator or not name.startswith("md"):
+            continue
+        words = fields.split()
+        md_arrays[name] = {
+            "state": words[0] if words else None,
+            "devices": [word.split("[")[0] for word in words if "[" in word],
+        }
+    return md_arrays
+
+
+def _parse_mountinfo(output: str) -> List[Dict[str, Any]]:
+    # 36 35 98:0 / /mnt rw,noatime master:1 - ext4 /dev/sda1 rw,errors=continue
+    mounts = []
+    for line in output.splitlines():
+        fields, separator, filesystem = line.partition(" - ")
+        fields_list = fields.split()
+        filesystem_list = filesystem.split()
+        if not separator or len(fields_list) < 5 or len(filesystem_list) < 2:
+            continue
+        mounts.append(
+            {
+                "target": _unescape_octal(fields_list[4]),
+                "source": _unescape_octal(filesystem_list[1]),
+                "fstype": filesystem_list[0],
+                "options": fields_list[5] if len(fields_list) > 5 else "",
+            }
+        )
+    return mounts
+
+
+def _parse_swaps(output: str) -> Set[str]:
+    # Filename  Type  Size  Used  Priority
+    # /dev/sda1  partition  1046524  0  -2
+    return {
+        _unescape_octal(line.split()[0])
+        for line in output.splitlines()[1:]
+        if line.strip()
+    }
+
+
+def _unescape_octal(value: str) -> str:
+    # The kernel escapes spaces and other special characters as "\040".
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), value)
+
+
+def _parse_dmsetup(output: str) -> Set[str]:
+    # Name:              cryptroot
+    dm_devices = set()
+    for line in output.splitlines():
+        key, separator, value = line.partition(":")
+        if separator and key.strip() == "Name":
+            dm_devices.add(value.strip())
+    return dm_devices
+
+
+def _lvm_report(output: Optional[str], key: str) -> List[Dict[str, Any]]:
+    # {"report": [{"pv": [{"pv_name": "/dev/sda1", ...}]}]}
+    return [
+        entry
+        for report in _json(output).get("report", [])
+        for entry in report.get(key, [])
+    ]
+
+
+def _parse_losetup(output: Optional[str]) -> Dict[str, str]:
+    # {"loopdevices": [{"name": "/dev/loop0", "back-file": "/disk.img", ...}]}
+    loop_devices = {}
+    for loop_device in _json(output).get("loopdevices", []):
+        backing_file = loop_device.get("back-file") or ""
+        # Files that were deleted since they were attached are no longer the
+        # files at their paths.
+        if backing_file and not backing_file.endswith(" (deleted)"):
+            loop_devices[backing_file] = loop_device["name"]
+    return loop_devices
@@ -0,0 +1,107 @@
+"""
+Sysfs API for reading the attributes of block devices.
+
+Attributes are read beneath a configurable sysfs root, so that a fake tree can
+stand in for `/sys`.
+"""
+
+import os
+from typing import Optional
+
+__all__ = [
+    "block_directory",
+    "device_attribute",
+    "discard_supported",
+    "queue_attribute",
+    "secure_erase_supported",
+    "write_attribute",
+]
+
+
+def block_directory(sys_dir: str, device_path: str) -> Optional[str]:
+    """
+    Find the sysfs directory of the block device at device_path.
+
+    Returns None if the device is not known to sysfs.
+    """
+    name = os.path.basename(os.path.realpath(device_path))
+    directory = os.path.join(sys_dir, "class", "block", name)
+    if not os.path.isdir(directory):
+        return None
+    return os.path.realpath(directory)
+
+
+def device_attribute(sys_dir: str, device_path: str, attribute: str) -> Optional[str]:
+    """
+    Read an attribute of the block device at device_path.
+
+    Returns None if the attribute cannot be read.
+    """
+    directory = block_directory(sys_dir, device_path)
+    if directory is None:
+        return None
+    return _read(os.path.join(directory, attribute))
+
+
+def queue_attribute(sys_dir: str, device_path: str, attribute: str) -> Optional[str]:
+    """
+    Read an attribute of the request queue of the block device at device_path.
+    Partitions do not have request queues of their own, so the queue of their
+    parent device is read instead.
+
+    Returns None if the attribute cannot be read.
+    """
+    directory = block_directory(sys_dir, device_path)
+    if directory is None:
+        return None
+    for queue_directory in [directory, os.path.dirname(directory)]:
+        value = _read(os.path.join(queue_directory, "queue", attribute))
+        if value is not None:
+            return value
+    return None
+
+
+def discard_supported(sys_dir: str, device_path: str) -> bool:
+    """
+    Determine whether the block device at device_path accepts discards.
+    """
+    discard_max_bytes = queue_attribute(sys_dir, device_path, "discard_max_bytes")
+    return (
+        discard_max_bytes is not None
+        and discard_max_bytes.isdigit()
+        and int(discard_max_bytes) > 0
+    )
+
+
+def secure_erase_supported(sys_dir: str, device_path: str) -> bool:
+    """
+    Determine whether the block device at device_path accepts secure erases.
+    """
+    max_secure_erase_sectors = queue_attribute(
+        sys_dir, device_path, "max_secure_erase_sectors"
+    )
+    return (
+        max_secure_erase_sectors is not None
+        and max_secure_erase_sectors.isdigit()
+        and int(max_secure_erase_sectors) > 0
+    )
+
+
+def write_attribute(sys_dir: str, device_path: str, attribute: str, value: str):
+    """
+    Write an attribute of the block device at device_path.
+
+    Raises FileNotFoundError if the device is not known to sysfs.
+    """
+    directory = block_directory(sys_dir, device_path)
+    if directory is None:
+        raise FileNotFoundError(f"Failed to find {device_path} in {sys_dir}")
+    with open(os.path.join(directory, attribute), "w", encoding="utf-8") as f:
+        f.write(f"{value}\n")
+
+
+def _read(path: str) -> Optional[str]:
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
@@ -0,0 +1,140 @@
+"""
+Topology API for aligning every layer of the storage stack to the physical
+devices beneath it.
+
+The kernel reports the alignment offset, minimum I/O size and optimal I/O size
+of every block device in sysfs. Most of the devices within a specification do
+not exist yet when its commands are generated, so the topology of a node in the
+graph is derived from the physical devices that it is ultimately built upon.
+"""
+
+import math
+from typing import Iterable, Optional, Set
+
+from comedian import sysfs
+from comedian.command import CommandContext
+from comedian.traits import DebugMixin, EqMixin
+
+__all__ = ["Topology", "node_topology", "read_topology"]
+
+
+class Topology(DebugMixin, EqMixin):
+    """
+    The I/O topology of a block device: its preferred I/O sizes in bytes, and
+    the offset of its first byte from the natural alignment of the device.
+    """
+
+    def __init__(
+        self,
+        alignment_offset: int = 0,
+        minimum_io_size: int = 512,
+        optimal_io_size: int = 0,
+    ):
+        self.alignment_offset = alignment_offset
+        self.minimum_io_size = minimum_io_size
+        self.optimal_io_size = optimal_io_size
+
+    @property
+    def granularity(self) -> int:
+        """
+        The number of bytes that every aligned position is a multiple of.
+        """
+        if not self.optimal_io_size:
+            return self.minimum_io_size
+        return math.lcm(self.minimum_io_size, self.optimal_io_size)
+
+    def align(self, offset: int) -> int:
+        """
+        Round offset up to the next aligned position.
+        """
+        granularity = self.granularity
+        return offset + (self.alignment_offset - offset) % granularity
+
+    def combine(self, other: "Topology") -> "Topology":
+        """
+        Find the topology of a device spanning both this and another topology.
+        Positions that are aligned within the result are aligned within both.
+        """
+        optimal_io_sizes = [
+            size for size in [self.optimal_io_size, other.optimal_io_size] if size
+        ]
+        return Topology(
+            # Devices that are offset differently cannot be aligned together.
+            (
+                self.alignment_offset
+                if self.alignment_offset == other.alignment_offset
+                else 0
+            ),
+            math.lcm(self.minimum_io_size, other.minimum_io_size),
+            math.lcm(*optimal_io_sizes) if optimal_io_sizes else 0,
+        )
+
+
+def read_topology(sys_dir: str, device_path: str) -> Optional[Topology]:
+    """
+    Read the topology of the block device at device_path from sysfs.
+
+    Returns None if the device is not known to sysfs.
+    """
+    minimum_io_size = _size(
+        sysfs.queue_attribute(sys_dir, device_path, "minimum_io_size")
+    )
+    if not minimum_io_size:
+        return None
+    return Topology(
+        _size(sysfs.device_attribute(sys_dir, device_path, "alignment_offset")),
+        minimum_io_size,
+        _size(sysfs.queue_attribute(sys_dir, device_path, "optimal_io_size")),
+    )
+
+
+def node_topology(context: CommandContext, *names: str) -> Optional[Topology]:
+    """
+    Find the topology that a device built upon the named GraphNodes should be
+    aligned to: the combined topology of every device beneath them.
+
+    The graph is walked down to the physical devices, whose topology is read
+    from sysfs, unless a GraphNode on the way describes its own topology with a
+    `topology(context)` method (as RAID volumes do, since their stripe is only
+    known from their specification).
+
+    Returns None if none of those devices have a known topology.
+    """
+    return _combine(_walk_topology(context, name, set()) for name in names)
+
+
+def _walk_topology(
+    context: CommandContext, name: str, visited: Set[str]
+) -> Optional[Topology]:
+    if name in visited:
+        return None
+    visited.add(name)
+
+    node = context.graph.node(name)
+    describe = getattr(node, "topology", None)
+    if describe is not None:
+        topology = describe(context)
+        if topology is not None:
+            return topology
+
+    if not node.dependencies:
+        device_path = context.graph.resolve_device(name)
+        if not device_path:
+            return None
+        return read_topology(context.config.sys_dir, device_path)
+
+    return _combine(
+        _walk_topology(context, dependency, visited) for dependency in node.dependencies
+    )
+
+
+def _combine(topologies: Iterable[Optional[Topology]]) -> Optional[Topology]:
+    combined: Optional[Topology] = None
+    for topology in topologies:
+        if topology is not None:
+            combined = topology if combined is None else combined.combine(topology)
+    return combined
+
+
+def _size(value: Optional[str]) -> int:
+    return int(value) if value is not None and value.isdigit() else 0
@@ -0,0 +1,330 @@
+"""
+Wipe API for overwriting files and block devices within this process.
+
+The target is split into one contiguous range per thread, and every thread
+writes its range with `os.pwrite` from a single page-aligned buffer that it
+reuses for every block. Writes bypass the page cache with `O_DIRECT` whenever
+the target supports it. The progress of long wipes can be checkpointed to a
+file, so that an interrupted wipe continues where it left off.
+"""
+
+import errno
+import json
+import mmap
+import os
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = ["WipeProgress", "wipe"]
+
+
+class WipeProgress:
+    """
+    A snapshot of the progress of a running wipe.
+
+    Bytes that were already written before a wipe was resumed count as written,
+    but not towards the rate of the wipe.
+    """
+
+    def __init__(self, written: int, size: int, elapsed: float, resumed: int = 0):
+        self.written = written
+        self.size = size
+        self.elapsed = elapsed
+        self.resumed = resumed
+
+    @property
+    def rate(self) -> float:
+        """
+        The average number of bytes written per second.
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return (self.written - self.resumed) / self.elapsed
+
+    @property
+    def eta(self) -> Optional[float]:
+        """
+        The estimated number of seconds until the wipe completes.
+        """
+        rate = self.rate
+        return (self.size - self.written) / rate if rate > 0 else None
+
+    def __str__(self) -> str:
+        percent = 100 * self.written / self.size if self.size else 100.0
+        eta = self.eta
+        return (
+            f"{self.written}/{self.size} bytes ({percent:.1f}%), "
+            f"{self.rate / 2**20:.1f} MiB/s, "
+            f"ETA {'unknown' if eta is None else f'{eta:.0f}s'}"
+        )
+
+
+def wipe(
+    path: str,
+    size: Optional[int] = None,
+    source: Optional[str] = None,
+    block_size: int = 16 * 2**20,
+    threads: int = 4,
+    direct: bool = True,
+    report: Optional[Callable[[WipeProgress], None]] = None,
+    interval: float = 1.0,
+    checkpoint: Optional[str] = None,
+    checkpoint_key: str = "",
+    checkpoint_interval: float = 30.0,
+):
+    """
+    Overwrite the first size bytes of path (the whole file or device when size
+    is not given) with zeros, or with data read from source. A regular file is
+    left exactly size bytes long.
+
+    Progress is passed to report every interval seconds while writing, and once
+    more when the wipe completes.
+
+    When a checkpoint path is given, the progress of every thread is saved to it
+    every checkpoint_interval seconds (once the progress is durable), and a
+    later wipe of the same size, block size and checkpoint_key continues from
+    the saved progress. The checkpoint is removed once the wipe completes.
+    """
+    block_size = max(mmap.PAGESIZE, block_size - block_size % mmap.PAGESIZE)
+
+    fd = _open(path, direct)
+    try:
+        job = _WipeJob(fd, _size(fd, size), block_size, max(1, threads), checkpoint)
+        if checkpoint:
+            job.resume(checkpoint_key)
+
+        errors: List[BaseException] = []
+        workers = [
+            threading.Thread(
+                target=_write_range,
+                args=(path, fd, i, end, block_size, source, job.positions, errors),
+                daemon=True,
+            )
+            for i, (_, end) in enumerate(job.ranges)
+        ]
+        _run(job, workers, report, interval, checkpoint_interval)
+        if errors:
+            job.save()
+            raise errors[0]
+
+        job.complete()
+        if report:
+            report(job.progress())
+    finally:
+        os.close(fd)
+
+
+class _WipeJob:
+    """
+    The split of a wipe into ranges, and the progress of every range.
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        size: int,
+        block_size: int,
+        threads: int,
+        checkpoint: Optional[str],
+    ):
+        self.fd = fd
+        self.size = size
+        self.checkpoint = checkpoint
+        self.ranges = _split(size, block_size, threads)
+        self.state: Dict[str, Any] = {"size": size, "block_size": block_size}
+        # Every position is a whole number of blocks past the start of its
+        # range, so a resumed wipe stays aligned.
+        self.positions = [start for start, _ in self.ranges]
+        self.resumed = 0
+        self.start_time = time.monotonic()
+
+    def resume(self, key: str):
+        self.state["key"] = key
+        if self.checkpoint:
+            self.positions = (
+                _load_checkpoint(self.checkpoint, self.state, self.ranges)
+                or self.positions
+            )
+        self.resumed = _written(self.ranges, self.positions)
+
+    def progress(self) -> WipeProgress:
+        return WipeProgress(
+            _written(self.ranges, self.positions),
+            self.size,
+            time.monotonic() - self.start_time,
+            self.resumed,
+        )
+
+    def complete(self):
+        os.fsync(self.fd)
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.unlink(self.checkpoint)
+
+    def save(self):
+        if self.checkpoint:
+            _save_checkpoint(self.checkpoint, self.fd, self.state, self.positions)
+
+
+def _run(
+    job: _WipeJob,
+    workers: List[threading.Thread],
+    report: Optional[Callable[[WipeProgress], None]],
+    interval: float,
+    checkpoint_interval: float,
+):
+    checkpoint_time = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        while worker.is_alive():
+            worker.join(interval)
+            if not worker.is_alive():
+                break
+            if report:
+                report(job.progress())
+            now = time.monotonic()
+            if now - checkpoint_time >= checkpoint_interval:
+                job.save()
+                checkpoint_time = now
+
+
+def _open(path: str, direct: bool) -> int:
+    flags = os.O_WRONLY | os.O_CREAT
+    if direct and hasattr(os, "O_DIRECT"):
+        try:
+            return os.open(path, flags | os.O_DIRECT, 0o600)
+        except OSError as ex:
+            # Not every filesystem supports direct I/O (tmpfs, for example).
+            if ex.errno != errno.EINVAL:
+                raise
+    return os.open(path, flags, 0o600)
+
+
+def _size(fd: int, size: Optional[int]) -> int:
+    if size is None:
+        return os.lseek(fd, 0, os.SEEK_END)
+    if stat.S_ISREG(os.fstat(fd).st_mode):
+        # Regular files end up exactly as long as the wipe.
+        os.ftruncate(fd, size)
+    return size
+
+
+def _split(size: int, block_size: int, threads: int) -> List[Tuple[int, int]]:
+    # Every range but the last is a whole number of blocks, so that all writes
+    # except the final one stay aligned.
+    blocks = -(-size // block_size)
+    blocks_per_range = max(1, -(-blocks // threads))
+    ranges = []
+    for start in range(0, size, blocks_per_range * block_size):
+        ranges.append((start, min(size, start + blocks_per_range * block_size)))
+    return ranges
+
+
+def _write_range(
+    path: str,
+    fd: int,
+    index: int,
+    end: int,
+    block_size: int,
+    source: Optional[str],
+    positions: List[int],
+    errors: List[BaseException],
+):
+    # Anonymous mappings are page-aligned and zero-filled, which satisfies the
+    # alignment requirements of direct I/O without any further copying.
+    buffer = mmap.mmap(-1, block_size)
+    source_fd = os.open(source, os.O_RDONLY) if source else None
+    try:
+        offset = positions[index]
+        while offset < end:
+            length = min(block_size, end - offset)
+            with memoryview(buffer)[:length] as view:
+                if source_fd is not None:
+                    _fill(source_fd, view)
+                _write_block(path, fd, view, offset)
+            offset += length
+            positions[index] = offset
+    except BaseException as ex:  # pylint: disable=W0703
+        errors.append(ex)
+    finally:
+        if source_fd is not None:
+            os.close(source_fd)
+        buffer.close()
+
+
+def _write_block(path: str, fd: int, view: memoryview, offset: int):
+    if len(view) % mmap.PAGESIZE:
+        # The unaligned tail cannot be written with direct I/O.
+        _write_unaligned(path, view, offset)
+    else:
+        _write(fd, view, offset)
+
+
+def _written(ranges: List[Tuple[int, int]], positions: List[int]) -> int:
+    return sum(position - start for (start, _), position in zip(ranges, positions))
+
+
+def _load_checkpoint(
+    path: str,
+    state: Dict[str, Any],
+    ranges: List[Tuple[int, int]],
+) -> Optional[List[int]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Progress only carries over to a wipe of the same target that splits it
+    # in exactly the same way.
+    if any(checkpoint.get(key) != value for key, value in state.items()):
+        return None
+    positions = checkpoint.get("positions")
+    if not isinstance(positions, list) or len(positions) != len(ranges):
+        return None
+    if not all(
+        isinstance(position, int) and start <= position <= end
+        for (start, end), position in zip(ranges, positions)
+    ):
+        return None
+    return positions
+
+
+def _save_checkpoint(path: str, fd: int, state: Dict[str, Any], positions: List[int]):
+    # Only progress that has reached the target is saved.
+    positions = list(positions)
+    os.fdatasync(fd)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(state, positions=positions), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _fill(fd: int, view: memoryview):
+    filled = 0
+    while filled < len(view):
+        count = os.readv(fd, [view[filled:]])
+        if not count:
+            raise EOFError("Wipe source ended before the target was filled")
+        filled += count
+
+
+def _write(fd: int, view: memoryview, offset: int):
+    while view:
+        count = os.pwrite(fd, view, offset)
+        view = view[count:]
+        offset += count
+
+
+def _write_unaligned(path: str, view: memoryview, offset: int):
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        _write(fd, view, offset)
+    finally:
+        os.close(fd)
@@ -1,6 +1,9 @@
 import os
 import sys
+import tempfile
+import unittest
 from abc import ABC, abstractmethod
+from typing import Dict, List
 
 # Add the parent directory to the path so we can import the comedian module
 # directly instead of relying on it to be installed in site-packages.
@@ -17,7 +20,7 @@ from comedian.configuration import Configuration  # pylint: disable=C0413
 from comedian.graph import Graph, ResolveLink  # pylint: disable=C0413
 from comedian.specification import Specification  # pylint: disable=C0413
 
-__all__ = ["SpecificationTestBase", "comedian"]
+__all__ = ["SpecificationTestBase", "comedian", "sysfs_context"]
 
 
 class TestSpecification(Specification):
@@ -41,6 +44,7 @@ class SpecificationTestBase(ABC):
             random_device="random_device",
             media_dir="media_dir",
             tmp_dir="tmp_dir",
+            sys_dir="sys_dir",
         )
         graph = Graph(
             [
@@ -87,3 +91,37 @@ class SpecificationTestBase(ABC):
     @abstractmethod
     def test_down_commands(self):
         pass
+
+
+def sysfs_context(
+    test_case: unittest.TestCase,
+    specifications: List[Specification],
+    devices: Dict[str, Dict[str, int]],
+) -> CommandContext:
+    """
+    Create a CommandContext for a graph of specifications, with a fake sysfs
+    tree describing the attributes of each named block device. Queue
+    attributes are written beneath the queue directory of each device.
+    """
+    tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+    test_case.addCleanup(tmp_dir.cleanup)
+
+    for name, attributes in devices.items():
+        device_dir = os.path.join(tmp_dir.name, "class", "block", name)
+        os.makedirs(os.path.join(device_dir, "queue"))
+        for attribute, value in attributes.items():
+            directory = device_dir
+            if attribute != "alignment_offset":
+                directory = os.path.join(device_dir, "queue")
+            with open(os.path.join(directory, attribute), "w", encoding="utf-8") as f:
+                f.write(f"{value}\n")
+
+    configuration = Configuration(
+        shell="shell",
+        dd_bs="dd_bs",
+        random_device="random_device",
+        media_dir="media_dir",
+        tmp_dir="tmp_dir",
+        sys_dir=tmp_dir.name,
+    )
+    return CommandContext(configuration, Graph(specifications))
@@ -1,10 +1,17 @@
+import os
+import tempfile
 import unittest
+from typing import List
+from unittest.mock import patch
 
 from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+from context import TestSpecification
 
-from comedian.command import Command
-from comedian.graph import ResolveLink
-from comedian.specifications import CryptVolume
+from comedian.command import Command, CommandContext
+from comedian.configuration import Configuration
+from comedian.graph import Graph, ResolveLink
+from comedian.specifications import CryptVolume, PhysicalDevice
+from comedian.specifications.crypt_volume import _cipher_arguments
 
 
 class CryptVolumeTest(SpecificationTestBase, unittest.TestCase):
@@ -47,6 +54,84 @@ class CryptVolumeTest(SpecificationTestBase, unittest.TestCase):
             self.specification.resolve_path(),
         )
 
+    def test_wipe_commands(self):
+        expected = [
+            Command(
+                [
+                    "shell",
+                    "-c",
+                    '\'cryptsetup --batch-mode --key-file=random_device open device randomize_name --type=plain && { dd status=progress conv=fdatasync if=/dev/zero of=/dev/mapper/randomize_name bs=dd_bs count="$(blockdev --getsize64 /dev/mapper/randomize_name)" iflag=fullblock,count_bytes && sync; status=$?; cryptsetup --batch-mode close randomize_name && exit "$status"; }\'',
+                ],
+                job="randomize_name",
+                resources=["device"],
+            ),
+        ]
+        self.assertListEqual(
+            expected,
+            list(self.specification.wipe(self.context)),
+        )
+
+    def test_wipe_engine(self):
+        self.context.config.wipe_engine = "dd"
+        (randomize,) = self.specification.wipe(self.context)
+        _, create_keyfile = _create_keyfile_commands(self.specification, self.context)
+        self.assertIsNone(randomize.native)
+        self.assertIsNone(create_keyfile.native)
+
+        self.context.config.wipe_engine = "native"
+        self.context.config.dd_bs = "16M"
+        self.specification.keysize = "2048"
+        (randomize,) = self.specification.wipe(self.context)
+        _, create_keyfile = _create_keyfile_commands(self.specification, self.context)
+        self.assertIsNotNone(randomize.native)
+        self.assertIsNotNone(create_keyfile.native)
+
+    def test_wipe_discard_commands(self):
+        self.context.config.wipe_strategy = "secure_discard"
+
+        # Without sysfs support, discarding falls back to randomizing.
+        self.assertListEqual(
+            ["randomize_name"],
+            [command.job for command in self.specification.wipe(self.context)],
+        )
+
+        with tempfile.TemporaryDirectory() as sys_dir:
+            queue_dir = os.path.join(sys_dir, "class", "block", "device", "queue")
+            os.makedirs(queue_dir)
+            with open(
+                os.path.join(queue_dir, "discard_max_bytes"), "w", encoding="utf-8"
+            ) as f:
+                f.write("4096\n")
+            self.context.config.sys_dir = sys_dir
+
+            # Without secure erase support, secure discards fall back to plain
+            # discards.
+            self.assertListEqual(
+                [Command(["blkdiscard", "device"])],
+                list(self.specification.wipe(self.context)),
+            )
+
+            with open(
+                os.path.join(queue_dir, "max_secure_erase_sectors"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                f.write("8\n")
+            self.assertListEqual(
+                [Command(["blkdiscard", "--secure", "device"])],
+                list(self.specification.wipe(self.context)),
+            )
+
+            self.specification.wipe_strategy = "discard"
+            self.assertListEqual(
+                [Command(["blkdiscard", "device"])],
+                list(self.specification.wipe(self.context)),
+            )
+
+            self.specification.wipe_strategy = "shred"
+            with self.assertRaises(ValueError):
+                list(self.specification.wipe(self.context))
+
     def test_apply_commands(self):
         crypttab_lines = "\\n".join(
             [
@@ -57,26 +142,6 @@ class CryptVolumeTest(SpecificationTestBase, unittest.TestCase):
         )
 
         expected = [
-            Command(
-                [
-                    "cryptsetup",
-                    "--batch-mode",
-                    "--key-file=random_device",
-                    "open",
-                    "device",
-                    "randomize_name",
-                    "--type=plain",
-                ]
-            ),
-            Command(
-                [
-                    "shell",
-                    "-c",
-                    "'dd status=progress conv=sync,noerror if=/dev/zero of=/dev/mapper/randomize_name bs=dd_bs || true'",
-                ]
-            ),
-            Command(["sync"]),
-            Command(["cryptsetup", "--batch-mode", "close", "randomize_name"]),
             Command(["mkdir", "--parents", "tmp_dir"]),
             Command(
                 [
@@ -116,18 +181,12 @@ class CryptVolumeTest(SpecificationTestBase, unittest.TestCase):
                     "name",
                 ]
             ),
-            Command(
-                [
-                    "shell",
-                    "-c",
-                    "'echo -e \"{}\" >> tmp_dir/etc/crypttab'".format(crypttab_lines),
-                ]
-            ),
         ]
         self.assertListEqual(
             expected,
             list(self.specification.apply(self.context)),
         )
+        self.assertListEqual([crypttab_lines], self.context.crypttab)
 
     def test_post_apply_commands(self):
         expected = [
@@ -155,7 +214,8 @@ class CryptVolumeTest(SpecificationTestBase, unittest.TestCase):
                     "open",
                     "device",
                     "name",
-                ]
+                ],
+                job="open_name",
             ),
         ]
         self.assertListEqual(
@@ -223,6 +283,9 @@ class EphemeralCryptVolumeTest(SpecificationTestBase, unittest.TestCase):
             self.specification.resolve_path(),
         )
 
+    def test_wipe_commands(self):
+        self.assertListEqual([], list(self.specification.wipe(self.context)))
+
     def test_apply_commands(self):
         crypttab_lines = "\\n".join(
             [
@@ -244,18 +307,12 @@ class EphemeralCryptVolumeTest(SpecificationTestBase, unittest.TestCase):
                     "--type=type",
                 ]
             ),
-            Command(
-                [
-                    "shell",
-                    "-c",
-                    "'echo -e \"{}\" >> tmp_dir/etc/crypttab'".format(crypttab_lines),
-                ]
-            ),
         ]
         self.assertListEqual(
             expected,
             list(self.specification.apply(self.context)),
         )
+        self.assertListEqual([crypttab_lines], self.context.crypttab)
 
     def test_post_apply_commands(self):
         expected = []
@@ -275,7 +332,8 @@ class EphemeralCryptVolumeTest(SpecificationTestBase, unittest.TestCase):
                     "device",
                     "name",
                     "--type=type",
-                ]
+                ],
+                job="open_name",
             ),
         ]
         self.assertListEqual(
@@ -301,3 +359,294 @@ class EphemeralCryptVolumeTest(SpecificationTestBase, unittest.TestCase):
             expected,
             list(self.specification.down(self.context)),
         )
+
+
+class CryptVolumeTuningTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(tmp_dir.cleanup)
+        self.sys_dir = tmp_dir.name
+
+        # An SSD, and a RAID controller with a 3x64K stripe of rotational disks.
+        self.write_queue(
+            "sda", optimal_io_size=0, physical_block_size=4096, rotational=0
+        )
+        self.write_queue(
+            "sdb", optimal_io_size=196608, physical_block_size=512, rotational=1
+        )
+        self.write_queue(
+            "sdc", optimal_io_size=0, physical_block_size=512, rotational=1
+        )
+
+        configuration = Configuration(
+            shell="shell",
+            dd_bs="16M",
+            random_device="random_device",
+            media_dir="media_dir",
+            tmp_dir="tmp_dir",
+            sys_dir=self.sys_dir,
+        )
+        self.graph = Graph(
+            [
+                PhysicalDevice("sda"),
+                PhysicalDevice("sdb"),
+                PhysicalDevice("sdc"),
+                PhysicalDevice("sdd", dd_bs="4M", direct_io=True),
+                PhysicalDevice("sde"),
+                TestSpecification("keyfile"),
+            ]
+            + [
+                CryptVolume(
+                    name=f"crypt_{device}",
+                    device=device,
+                    identify="device",
+                    type="luks2",
+                    keyfile="keyfile",
+                    keysize="2048",
+                    password=None,
+                    options=[],
+                )
+                for device in ["sda", "sdb", "sdc", "sdd", "sde"]
+            ]
+        )
+        self.context = CommandContext(configuration, self.graph)
+
+    def write_queue(self, name: str, **attributes: int):
+        queue_dir = os.path.join(self.sys_dir, "class", "block", name, "queue")
+        os.makedirs(queue_dir)
+        for attribute, value in attributes.items():
+            with open(os.path.join(queue_dir, attribute), "w", encoding="utf-8") as f:
+                f.write(f"{value}\n")
+
+    def dd_args(self, device: str) -> List[str]:
+        (command,) = self.graph.node(f"crypt_{device}").wipe(self.context)
+        script = command.cmd[2]
+        dd = script[script.index("{ dd ") + 2 : script.index(" && sync;")]
+        return [arg for arg in dd.split() if arg.split("=")[0] in _TUNED_ARGS]
+
+    def test_non_rotational(self):
+        self.assertListEqual(
+            ["bs=16M", "iflag=fullblock,count_bytes", "oflag=direct"],
+            self.dd_args("sda"),
+        )
+
+    def test_optimal_io_size(self):
+        # 16M rounded up to a multiple of the full stripe.
+        self.assertListEqual(
+            ["bs=16908288", "iflag=fullblock,count_bytes", "oflag=direct"],
+            self.dd_args("sdb"),
+        )
+
+    def test_rotational(self):
+        self.assertListEqual(
+            ["conv=fdatasync", "bs=16M", "iflag=fullblock,count_bytes"],
+            self.dd_args("sdc"),
+        )
+
+    def test_overrides(self):
+        self.assertListEqual(
+            ["bs=4M", "iflag=fullblock,count_bytes", "oflag=direct"],
+            self.dd_args("sdd"),
+        )
+
+    def test_unknown(self):
+        self.assertListEqual(
+            ["conv=fdatasync", "bs=16M", "iflag=fullblock,count_bytes"],
+            self.dd_args("sde"),
+        )
+
+
+def _create_keyfile_commands(specification, context):
+    return list(specification.apply(context))[:2]
+
+
+_TUNED_ARGS = {"bs", "conv", "iflag", "oflag"}
+
+
+class CryptVolumePerformanceTest(unittest.TestCase):
+    def setUp(self):
+        configuration = Configuration(
+            shell="shell",
+            dd_bs="dd_bs",
+            random_device="random_device",
+            media_dir="media_dir",
+            tmp_dir="tmp_dir",
+            sys_dir="sys_dir",
+        )
+        graph = Graph([TestSpecification("device"), TestSpecification("keyfile")])
+        self.context = CommandContext(configuration, graph)
+
+    def crypt_volume(self, keyfile: str = "keyfile", **kwargs) -> CryptVolume:
+        return CryptVolume(
+            name="name",
+            device="device",
+            identify="device",
+            type="luks2" if keyfile == "keyfile" else "plain",
+            keyfile=keyfile,
+            keysize="2048" if keyfile == "keyfile" else None,
+            password=None,
+            options=["discard"],
+            **kwargs,
+        )
+
+    def test_format_options(self):
+        specification = self.crypt_volume(
+            cipher="aes-xts-plain64",
+            cipher_keysize=512,
+            sector_size=4096,
+            perf=["no_read_workqueue", "no_write_workqueue"],
+        )
+
+        commands = list(specification.apply(self.context))
+
+        self.assertEqual(
+            Command(
+                [
+                    "cryptsetup",
+                    "--batch-mode",
+                    "--key-file=tmp_dir/keyfile",
+                    "luksFormat",
+                    "--type=luks2",
+                    "--cipher=aes-xts-plain64",
+                    "--key-size=512",
+                    "--sector-size=4096",
+                    "device",
+                ]
+            ),
+            commands[2],
+        )
+        self.assertEqual(
+            Command(
+                [
+                    "cryptsetup",
+                    "--batch-mode",
+                    "--key-file=tmp_dir/keyfile",
+                    "open",
+                    "device",
+                    "name",
+                    "--perf-no_read_workqueue",
+                    "--perf-no_write_workqueue",
+                    "--persistent",
+                ]
+            ),
+            commands[3],
+        )
+        self.assertEqual(
+            "name\\tdevice\\tkeyfile\\tdiscard",
+            self.context.crypttab[0].split("\\n")[-1],
+        )
+        self.assertNotIn("--persistent", list(specification.up(self.context))[0].cmd)
+
+    def test_pbkdf_options(self):
+        specification = self.crypt_volume(
+            pbkdf="argon2id", pbkdf_memory=65536, iter_time=500, pbkdf_parallel=2
+        )
+        specification.password = "password"
+
+        commands = list(specification.apply(self.context))
+
+        pbkdf_arguments = [
+            "--pbkdf=argon2id",
+            "--pbkdf-memory=65536",
+            "--iter-time=500",
+            "--pbkdf-parallel=2",
+        ]
+        self.assertListEqual(
+            [
+                "cryptsetup",
+                "--batch-mode",
+                "--key-file=tmp_dir/keyfile",
+                "luksFormat",
+                "--type=luks2",
+            ]
+            + pbkdf_arguments
+            + ["device"],
+            commands[2].cmd,
+        )
+        self.assertIn(" ".join(pbkdf_arguments), commands[3].cmd[2])
+
+    def test_auto_cipher(self):
+        specification = self.crypt_volume(cipher="auto")
+
+        commands = list(specification.apply(self.context))
+
+        self.assertEqual("CIPHER_name", commands[2].capture)
+        self.assertListEqual(
+            ["cryptsetup", "benchmark", "|", "awk"], commands[2].cmd[:4]
+        )
+        self.assertIn("$CIPHER_name", commands[3].cmd)
+
+        benchmark = "aes-xts 256b 2000.0 MiB/s 2100.0 MiB/s"
+        self.context.env["OTHER"] = "other"
+        with patch("subprocess.check_output", return_value=benchmark.encode()) as run:
+            commands[2].native(self.context)
+        self.assertEqual("other", run.call_args.kwargs["env"]["OTHER"])
+        self.assertEqual(os.environ["PATH"], run.call_args.kwargs["env"]["PATH"])
+        self.assertEqual(
+            "--cipher=aes-xts-plain64 --key-size=256", self.context.env["CIPHER_name"]
+        )
+
+    def test_ephemeral_options(self):
+        specification = self.crypt_volume(
+            keyfile="/dev/urandom",
+            sector_size=4096,
+            perf=["no_read_workqueue", "submit_from_crypt_cpus"],
+        )
+
+        commands = list(specification.apply(self.context))
+
+        self.assertListEqual(
+            [
+                Command(
+                    [
+                        "cryptsetup",
+                        "--batch-mode",
+                        "--key-file=/dev/urandom",
+                        "open",
+                        "device",
+                        "name",
+                        "--type=plain",
+                        "--sector-size=4096",
+                        "--perf-no_read_workqueue",
+                        "--perf-submit_from_crypt_cpus",
+                    ]
+                )
+            ],
+            commands,
+        )
+        self.assertEqual(
+            "name\\tdevice\\t/dev/urandom\\t"
+            "discard,no-read-workqueue,sector-size=4096",
+            self.context.crypttab[0].split("\\n")[-1],
+        )
+
+    def test_unknown_perf_option(self):
+        specification = self.crypt_volume(perf=["fast"])
+
+        with self.assertRaises(ValueError):
+            list(specification.up(self.context))
+
+    def test_cipher_arguments(self):
+        benchmark = "\n".join(
+            [
+                "# Tests are approximate using memory only (no storage IO).",
+                "PBKDF2-sha1      1884093 iterations per second for 256-bit key",
+                "#     Algorithm |       Key |      Encryption |      Decryption",
+                "        aes-cbc        128b      1217.7 MiB/s      3982.3 MiB/s",
+                "    serpent-cbc        128b               N/A               N/A",
+                "        aes-xts        256b      3506.2 MiB/s      3512.0 MiB/s",
+                "        aes-xts        512b      3506.1 MiB/s      3600.0 MiB/s",
+                "    twofish-xts        512b               N/A               N/A",
+                "xchacha12,aes-adiantum 256b       800.4 MiB/s       790.4 MiB/s",
+            ]
+        )
+
+        self.assertEqual(
+            "--cipher=aes-xts-plain64 --key-size=256",
+            _cipher_arguments(benchmark),
+        )
+        self.assertEqual(
+            "--cipher=xchacha12,aes-adiantum-plain64 --key-size=256",
+            _cipher_arguments(benchmark.replace("aes-xts", "aes-cbc")),
+        )
+        self.assertEqual("", _cipher_arguments(""))
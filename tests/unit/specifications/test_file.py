@@ -33,6 +33,7 @@ class FileTest(SpecificationTestBase, unittest.TestCase):
         self.assertEqual("group", self.specification.group)
         self.assertEqual("mode", self.specification.mode)
         self.assertEqual("size", self.specification.size)
+        self.assertIsNone(self.specification.allocation)
 
     def test_resolve(self):
         self.assertEqual(
@@ -56,6 +57,46 @@ class FileTest(SpecificationTestBase, unittest.TestCase):
             list(self.specification.apply(self.context)),
         )
 
+    def test_apply_commands_allocation(self):
+        self.specification.allocation = "sparse"
+        self.assertIn(
+            Command(["truncate", "--size=size", "media_dir/name"]),
+            list(self.specification.apply(self.context)),
+        )
+
+        self.specification.allocation = "preallocate"
+        self.assertIn(
+            Command(["fallocate", "--length", "size", "media_dir/name"]),
+            list(self.specification.apply(self.context)),
+        )
+
+        self.specification.allocation = "zero"
+        self.assertIn(
+            Command(
+                [
+                    "dd",
+                    "status=progress",
+                    "if=/dev/zero",
+                    "of=media_dir/name",
+                    "bs=dd_bs",
+                    "count=size",
+                    "iflag=count_bytes",
+                    "conv=fsync",
+                ]
+            ),
+            list(self.specification.apply(self.context)),
+        )
+
+    def test_apply_commands_invalid(self):
+        self.specification.allocation = "thin"
+        with self.assertRaises(ValueError):
+            list(self.specification.apply(self.context))
+
+        self.specification.allocation = "sparse"
+        self.specification.size = None
+        with self.assertRaises(ValueError):
+            list(self.specification.apply(self.context))
+
     def test_post_apply_commands(self):
         self.assertIsNone(self.specification.post_apply)
 
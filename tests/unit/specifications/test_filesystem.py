@@ -1,10 +1,25 @@
 import unittest
+from unittest.mock import MagicMock
 
-from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+from context import (  # pylint: disable=W0611
+    comedian,
+    sysfs_context,
+    SpecificationTestBase,
+)
+from context import TestSpecification
 
-from comedian.command import Command
-from comedian.graph import ResolveLink
-from comedian.specifications import Filesystem
+from comedian.action import ApplyAction
+from comedian.command import Command, CommandContext
+from comedian.graph import Graph, ResolveLink
+from comedian.specifications import (
+    CryptVolume,
+    Filesystem,
+    LvmLogicalVolume,
+    LvmPhysicalVolume,
+    LvmVolumeGroup,
+    PhysicalDevice,
+    RaidVolume,
+)
 
 
 class FilesystemTest(SpecificationTestBase, unittest.TestCase):
@@ -58,3 +73,208 @@ class FilesystemTest(SpecificationTestBase, unittest.TestCase):
 
     def test_down_commands(self):
         self.assertIsNone(self.specification.down)
+
+
+class FilesystemTopologyTest(unittest.TestCase):
+    def setUp(self):
+        # A RAID controller with a 3x64K stripe, and an SSD.
+        self.context = sysfs_context(
+            self,
+            [PhysicalDevice("sda"), PhysicalDevice("sdb")],
+            {
+                "sda": {"minimum_io_size": 65536, "optimal_io_size": 196608},
+                "sdb": {"minimum_io_size": 4096, "optimal_io_size": 0},
+            },
+        )
+
+    def mkfs_args(self, device, type, options=None):
+        filesystem = Filesystem("fs", device, type, options if options else [])
+        (command,) = filesystem.apply(self.context)
+        return command.cmd[3:-1]
+
+    def test_ext4(self):
+        self.assertListEqual(
+            ["-E", "stride=16,stripe_width=48"], self.mkfs_args("sda", "ext4")
+        )
+
+    def test_xfs(self):
+        self.assertListEqual(["-d", "su=65536,sw=3"], self.mkfs_args("sda", "xfs"))
+
+    def test_explicit(self):
+        self.assertListEqual(
+            ["-E", "stride=32"], self.mkfs_args("sda", "ext4", ["-E", "stride=32"])
+        )
+
+    def test_unstriped(self):
+        self.assertListEqual([], self.mkfs_args("sdb", "ext4"))
+        self.assertListEqual([], self.mkfs_args("sda", "vfat"))
+
+
+class FilesystemProfileTest(unittest.TestCase):
+    def setUp(self):
+        # A wiped encrypted volume, and a RAID across two unwiped devices.
+        self.context = sysfs_context(
+            self,
+            [
+                PhysicalDevice("sda"),
+                PhysicalDevice("sdb"),
+                PhysicalDevice("sdc"),
+                PhysicalDevice("sdd"),
+                TestSpecification("keyfile"),
+                CryptVolume(
+                    name="crypt",
+                    device="sda",
+                    identify="device",
+                    type="luks2",
+                    keyfile="keyfile",
+                    keysize="2048",
+                    password=None,
+                    options=[],
+                ),
+                RaidVolume("md", ["sdb", "sdc"], "1", "1.2"),
+                CryptVolume(
+                    name="cryptswap",
+                    device="sdd",
+                    identify="device",
+                    type="luks2",
+                    keyfile="/dev/urandom",
+                    keysize=None,
+                    password=None,
+                    options=[],
+                ),
+            ],
+            {},
+        )
+        self.context.wiped.add("crypt")
+
+    def mkfs_args(self, device, type, profile="fast"):
+        filesystem = Filesystem("fs", device, type, ["opt"], profile=profile)
+        (command,) = filesystem.apply(self.context)
+        return command.cmd[3:-1]
+
+    def test_ext4(self):
+        self.assertListEqual(
+            ["-E", "lazy_itable_init=1,lazy_journal_init=1,nodiscard", "opt"],
+            self.mkfs_args("crypt", "ext4"),
+        )
+        self.assertListEqual(
+            ["-E", "lazy_itable_init=1", "opt"], self.mkfs_args("md", "ext4")
+        )
+
+    def test_xfs(self):
+        self.assertListEqual(["-K", "opt"], self.mkfs_args("crypt", "xfs"))
+        self.assertListEqual(["-d", "agcount=32", "opt"], self.mkfs_args("md", "xfs"))
+
+    def test_btrfs(self):
+        self.assertListEqual(["--nodiscard", "opt"], self.mkfs_args("crypt", "btrfs"))
+        self.assertListEqual(["opt"], self.mkfs_args("md", "btrfs"))
+
+    def test_unwiped(self):
+        # Only devices whose wipe actually ran skip the discard.
+        self.context.wiped.clear()
+        self.assertListEqual(
+            ["-E", "lazy_itable_init=1", "opt"], self.mkfs_args("crypt", "ext4")
+        )
+
+    def test_ephemeral(self):
+        # Volumes with ephemeral keyfiles are never wiped.
+        filesystem = Filesystem("fs", "cryptswap", "ext4", [], profile="fast")
+        graph = Graph(list(self.context.graph) + [filesystem])
+        context = CommandContext(self.context.config, graph)
+        handler = MagicMock()
+
+        ApplyAction(context)(handler, graph)
+
+        (mkfs,) = [
+            args[1].cmd
+            for args, _ in handler.on_command.call_args_list
+            if args[1].cmd[0] == "mkfs"
+        ]
+        self.assertListEqual(
+            ["mkfs", "--type", "ext4", "-E", "lazy_itable_init=1"], mkfs[:5]
+        )
+        self.assertIn("crypt", context.wiped)
+        self.assertNotIn("cryptswap", context.wiped)
+
+    def test_default(self):
+        self.assertListEqual(["opt"], self.mkfs_args("crypt", "ext4", None))
+        self.assertListEqual(["opt"], self.mkfs_args("crypt", "ext4", "default"))
+        with self.assertRaises(ValueError):
+            self.mkfs_args("crypt", "ext4", "foo")
+
+
+class FilesystemRaidTest(unittest.TestCase):
+    def setUp(self):
+        # Encryption on a RAID5 of four devices, and LVM on a RAID6 of six.
+        devices = [f"sd{letter}" for letter in "abcdefghij"]
+        self.context = sysfs_context(
+            self,
+            [PhysicalDevice(device) for device in devices]
+            + [
+                TestSpecification("keyfile"),
+                RaidVolume("md5", devices[:4], "raid5", "1.2", chunk="64K"),
+                CryptVolume(
+                    name="crypt",
+                    device="md5",
+                    identify="device",
+                    type="luks2",
+                    keyfile="keyfile",
+                    keysize="2048",
+                    password=None,
+                    options=[],
+                ),
+                RaidVolume("md6", devices[4:], "6", "1.2"),
+                LvmPhysicalVolume("pv", "md6"),
+                LvmVolumeGroup("vg", ["pv"]),
+                LvmLogicalVolume(
+                    name="lv",
+                    size="1G",
+                    extents=None,
+                    type=None,
+                    args=[],
+                    lvm_volume_group="vg",
+                    lvm_physical_volumes=[],
+                    lvm_poolmetadata_volume=None,
+                    lvm_cachepool_volume=None,
+                    lvm_thinpool_volume=None,
+                ),
+            ],
+            {device: {"minimum_io_size": 4096} for device in devices},
+        )
+
+    def mkfs_args(self, device, type):
+        (command,) = Filesystem("fs", device, type, []).apply(self.context)
+        return command.cmd[3:-1]
+
+    def test_crypt_volume(self):
+        self.assertListEqual(
+            ["-E", "stride=16,stripe_width=48"], self.mkfs_args("crypt", "ext4")
+        )
+        self.assertListEqual(["-d", "su=65536,sw=3"], self.mkfs_args("crypt", "xfs"))
+
+    def test_lvm_logical_volume(self):
+        self.assertListEqual(
+            ["-E", "stride=128,stripe_width=512"], self.mkfs_args("lv", "ext4")
+        )
+        self.assertListEqual(["-d", "su=524288,sw=4"], self.mkfs_args("lv", "xfs"))
+
+    def test_fast_profile(self):
+        self.context.wiped.add("crypt")
+        filesystem = Filesystem(
+            "fs", "crypt", "ext4", ["-Eroot_owner=0:0", "-m", "1"], profile="fast"
+        )
+        (command,) = filesystem.apply(self.context)
+        self.assertListEqual(
+            [
+                "-E",
+                "stride=16,stripe_width=48,lazy_itable_init=1,lazy_journal_init=1,"
+                "nodiscard,root_owner=0:0",
+                "-m",
+                "1",
+            ],
+            command.cmd[3:-1],
+        )
+
+        filesystem = Filesystem("fs", "lv", "xfs", [], profile="fast")
+        (command,) = filesystem.apply(self.context)
+        self.assertListEqual(["-d", "su=524288,sw=4,agcount=96"], command.cmd[3:-1])
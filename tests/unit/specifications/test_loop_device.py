@@ -2,9 +2,10 @@ import unittest
 
 from context import comedian, SpecificationTestBase  # pylint: disable=W0611
 
-from comedian.command import Command
+from comedian.command import Command, CommandContext
 from comedian.graph import ResolveLink
 from comedian.specifications import LoopDevice
+from comedian.state import State
 
 
 class LoopDeviceTest(SpecificationTestBase, unittest.TestCase):
@@ -25,6 +26,8 @@ class LoopDeviceTest(SpecificationTestBase, unittest.TestCase):
         self.assertListEqual([], self.specification.references)
         self.assertEqual("file", self.specification.file)
         self.assertEqual(["args"], self.specification.args)
+        self.assertIsNone(self.specification.direct_io)
+        self.assertIsNone(self.specification.sector_size)
 
     def test_resolve(self):
         self.assertEqual(
@@ -48,6 +51,46 @@ class LoopDeviceTest(SpecificationTestBase, unittest.TestCase):
             list(self.specification.apply(self.context)),
         )
 
+    def test_apply_commands_direct_io(self):
+        self.specification.direct_io = True
+        self.specification.sector_size = 4096
+        expected = [
+            Command(
+                cmd=[
+                    "losetup",
+                    "--direct-io=on",
+                    "--sector-size=4096",
+                    "args",
+                    "--find",
+                    "--show",
+                    "media_dir/file",
+                ],
+                capture="loop_device_name",
+            ),
+        ]
+        self.assertListEqual(
+            expected,
+            list(self.specification.apply(self.context)),
+        )
+        self.assertListEqual(
+            expected,
+            list(self.specification.up(self.context)),
+        )
+
+        self.specification.direct_io = False
+        self.specification.sector_size = None
+        self.assertEqual(
+            [
+                "losetup",
+                "--direct-io=off",
+                "args",
+                "--find",
+                "--show",
+                "media_dir/file",
+            ],
+            next(self.specification.apply(self.context)).cmd,
+        )
+
     def test_post_apply_commands(self):
         self.assertIsNone(self.specification.post_apply)
 
@@ -87,3 +130,22 @@ class LoopDeviceTest(SpecificationTestBase, unittest.TestCase):
             expected,
             list(self.specification.down(self.context)),
         )
+
+    def test_status(self):
+        def status(loop_devices):
+            context = CommandContext(
+                self.context.config,
+                self.context.graph,
+                state=State(loop_devices=loop_devices),
+            )
+            return (
+                self.specification.status(context),
+                self.specification.active(context),
+                self.specification.variables(context),
+            )
+
+        self.assertEqual(("missing", False, {}), status({}))
+        self.assertEqual(
+            ("active", True, {"$loop_device_name": "/dev/loop0"}),
+            status({"media_dir/file": "/dev/loop0"}),
+        )
@@ -0,0 +1,201 @@
+import unittest
+
+from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+
+from comedian.command import Command, CommandContext
+from comedian.graph import ResolveLink
+from comedian.specifications import LvmCache
+from comedian.state import State
+
+
+class LvmCacheTest(SpecificationTestBase, unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        SpecificationTestBase.__init__(
+            self,
+            LvmCache(
+                name="name",
+                type="cache",
+                size="size",
+                extents=None,
+                cachemode="writeback",
+                policy="smq",
+                chunk_size="256K",
+                lvm_volume_group="lvm_volume_group",
+                lvm_logical_volume="lvm_logical_volume",
+                lvm_physical_volume="lvm_physical_volume",
+            ),
+        )
+        unittest.TestCase.__init__(self, *args, **kwargs)
+
+    def test_properties(self):
+        self.assertEqual("name", self.specification.name)
+        self.assertListEqual(
+            [
+                "lvm_volume_group",
+                "lvm_logical_volume",
+                "lvm_physical_volume",
+            ],
+            self.specification.dependencies,
+        )
+        self.assertListEqual([], self.specification.references)
+        self.assertEqual("cache", self.specification.type)
+        self.assertEqual("size", self.specification.size)
+        self.assertIsNone(self.specification.extents)
+        self.assertEqual("writeback", self.specification.cachemode)
+        self.assertEqual("smq", self.specification.policy)
+        self.assertEqual("256K", self.specification.chunk_size)
+        self.assertEqual("lvm_volume_group", self.specification.lvm_volume_group)
+        self.assertEqual("lvm_logical_volume", self.specification.lvm_logical_volume)
+        self.assertEqual(
+            "lvm_physical_volume",
+            self.specification.lvm_physical_volume,
+        )
+
+    def test_resolve(self):
+        self.assertEqual(
+            ResolveLink("lvm_volume_group", "lvm_logical_volume"),
+            self.specification.resolve_device(),
+        )
+        self.assertEqual(
+            ResolveLink(None, None),
+            self.specification.resolve_path(),
+        )
+
+    def test_apply_commands(self):
+        expected = [
+            Command(
+                [
+                    "lvcreate",
+                    "--name=name",
+                    "--size=size",
+                    "--type=cache-pool",
+                    "--chunksize=256K",
+                    "lvm_volume_group",
+                    "lvm_physical_volume",
+                ]
+            ),
+            Command(
+                [
+                    "lvconvert",
+                    "--yes",
+                    "--type=cache",
+                    "--cachepool=lvm_volume_group/name",
+                    "--cachemode=writeback",
+                    "--cachepolicy=smq",
+                    "lvm_volume_group/lvm_logical_volume",
+                ]
+            ),
+        ]
+        self.assertListEqual(
+            expected,
+            list(self.specification.apply(self.context)),
+        )
+
+    def test_apply_commands_writecache(self):
+        self.specification.type = "writecache"
+        self.specification.size = None
+        self.specification.extents = "100%PVS"
+        self.specification.cachemode = None
+        self.specification.policy = None
+        self.specification.chunk_size = None
+
+        expected = [
+            Command(
+                [
+                    "lvcreate",
+                    "--name=name",
+                    "--extents=100%PVS",
+                    "lvm_volume_group",
+                    "lvm_physical_volume",
+                ]
+            ),
+            Command(
+                [
+                    "lvconvert",
+                    "--yes",
+                    "--type=writecache",
+                    "--cachevol=lvm_volume_group/name",
+                    "lvm_volume_group/lvm_logical_volume",
+                ]
+            ),
+        ]
+        self.assertListEqual(
+            expected,
+            list(self.specification.apply(self.context)),
+        )
+
+    def test_apply_commands_invalid(self):
+        self.specification.cachemode = "writearound"
+        with self.assertRaises(ValueError):
+            list(self.specification.apply(self.context))
+
+        self.specification.cachemode = None
+        self.specification.type = "writecache"
+        with self.assertRaises(ValueError):
+            list(self.specification.apply(self.context))
+
+        self.specification.type = "raid1"
+        with self.assertRaises(ValueError):
+            list(self.specification.apply(self.context))
+
+    def test_apply_commands_invalid_before_create(self):
+        # Invalid options are found before anything is created.
+        self.specification.cachemode = "bogus"
+        commands = self.specification.apply(self.context)
+        with self.assertRaises(ValueError):
+            next(commands)
+
+        self.specification.type = "writecache"
+        self.specification.cachemode = "writeback"
+        commands = self.specification.apply(self.context)
+        with self.assertRaises(ValueError):
+            next(commands)
+
+    def test_post_apply_commands(self):
+        self.assertIsNone(self.specification.post_apply)
+
+    def test_up_commands(self):
+        self.assertIsNone(self.specification.up)
+
+    def test_pre_down_commands(self):
+        self.assertIsNone(self.specification.pre_down)
+
+    def test_down_commands(self):
+        self.assertIsNone(self.specification.down)
+
+    def test_status(self):
+        def status(logical_volumes):
+            context = CommandContext(
+                self.context.config,
+                self.context.graph,
+                state=State(logical_volumes=logical_volumes),
+            )
+            return (
+                self.specification.status(context),
+                self.specification.exists(context),
+            )
+
+        origin = {"vg_name": "lvm_volume_group", "lv_name": "lvm_logical_volume"}
+        self.assertEqual(("missing", False), status([]))
+        self.assertEqual(
+            ("missing", False),
+            status([dict(origin, lv_attr="-wi-a-----")]),
+        )
+        self.assertEqual(
+            ("active", True),
+            status([dict(origin, lv_attr="Cwi-a-C---")]),
+        )
+        self.assertEqual(
+            ("present", True),
+            status([dict(origin, lv_attr="Cwi---C---")]),
+        )
+        # Volumes read from the kernel are recognized by their hidden origins.
+        self.assertEqual(
+            ("active", True),
+            status(
+                [
+                    dict(origin, lv_active="active"),
+                    dict(origin, lv_name="lvm_logical_volume_corig"),
+                ]
+            ),
+        )
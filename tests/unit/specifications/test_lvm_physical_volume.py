@@ -1,10 +1,14 @@
 import unittest
 
-from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+from context import (  # pylint: disable=W0611
+    comedian,
+    sysfs_context,
+    SpecificationTestBase,
+)
 
 from comedian.command import Command
 from comedian.graph import ResolveLink
-from comedian.specifications import LvmPhysicalVolume
+from comedian.specifications import LvmPhysicalVolume, PhysicalDevice
 
 
 class LvmPhysicalVolumeTest(SpecificationTestBase, unittest.TestCase):
@@ -36,7 +40,7 @@ class LvmPhysicalVolumeTest(SpecificationTestBase, unittest.TestCase):
 
     def test_apply_commands(self):
         expected = [
-            Command(["pvcreate", "device"]),
+            Command(["pvcreate", "device"], batch=1),
         ]
         self.assertListEqual(
             expected,
@@ -54,3 +58,43 @@ class LvmPhysicalVolumeTest(SpecificationTestBase, unittest.TestCase):
 
     def test_down_commands(self):
         self.assertIsNone(self.specification.down)
+
+
+class LvmPhysicalVolumeTopologyTest(unittest.TestCase):
+    def test_apply_commands(self):
+        # A RAID controller with a 3x64K stripe, an offset drive, and an SSD.
+        context = sysfs_context(
+            self,
+            [PhysicalDevice("sda"), PhysicalDevice("sdb"), PhysicalDevice("sdc")],
+            {
+                "sda": {"minimum_io_size": 65536, "optimal_io_size": 196608},
+                "sdb": {
+                    "alignment_offset": 3584,
+                    "minimum_io_size": 4096,
+                    "optimal_io_size": 2560,
+                },
+                "sdc": {"minimum_io_size": 4096, "optimal_io_size": 0},
+            },
+        )
+        self.assertListEqual(
+            [Command(["pvcreate", "--dataalignment=192k", "/dev/sda"], batch=2)],
+            list(LvmPhysicalVolume("pv", "sda").apply(context)),
+        )
+        self.assertListEqual(
+            [
+                Command(
+                    [
+                        "pvcreate",
+                        "--dataalignment=20k",
+                        "--dataalignmentoffset=7s",
+                        "/dev/sdb",
+                    ],
+                    batch=3,
+                )
+            ],
+            list(LvmPhysicalVolume("pv", "sdb").apply(context)),
+        )
+        self.assertListEqual(
+            [Command(["pvcreate", "/dev/sdc"], batch=1)],
+            list(LvmPhysicalVolume("pv", "sdc").apply(context)),
+        )
@@ -50,7 +50,7 @@ class LvmVolumeGroupTest(SpecificationTestBase, unittest.TestCase):
 
     def test_up_commands(self):
         expected = [
-            Command(["vgchange", "--activate", "y", "name"]),
+            Command(["vgchange", "--activate", "y", "name"], batch=3),
         ]
         self.assertListEqual(
             expected,
@@ -62,7 +62,7 @@ class LvmVolumeGroupTest(SpecificationTestBase, unittest.TestCase):
 
     def test_down_commands(self):
         expected = [
-            Command(["vgchange", "--activate", "n", "name"]),
+            Command(["vgchange", "--activate", "n", "name"], batch=3),
         ]
         self.assertListEqual(
             expected,
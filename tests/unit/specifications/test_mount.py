@@ -1,10 +1,15 @@
 import unittest
 
-from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+from context import (  # pylint: disable=W0611
+    comedian,
+    sysfs_context,
+    SpecificationTestBase,
+)
+from context import TestSpecification
 
 from comedian.command import Command
 from comedian.graph import ResolveLink
-from comedian.specifications import Mount
+from comedian.specifications import Mount, PhysicalDevice
 
 
 class MountTest(SpecificationTestBase, unittest.TestCase):
@@ -67,18 +72,12 @@ class MountTest(SpecificationTestBase, unittest.TestCase):
                     "media_dir/mountpoint",
                 ]
             ),
-            Command(
-                [
-                    "shell",
-                    "-c",
-                    "'echo -e \"{}\" >> tmp_dir/etc/fstab'".format(fstab_lines),
-                ]
-            ),
         ]
         self.assertListEqual(
             expected,
             list(self.specification.apply(self.context)),
         )
+        self.assertListEqual([fstab_lines], self.context.fstab)
 
     def test_post_apply_commands(self):
         self.assertIsNone(self.specification.post_apply)
@@ -113,3 +112,98 @@ class MountTest(SpecificationTestBase, unittest.TestCase):
             expected,
             list(self.specification.down(self.context)),
         )
+
+
+class MountProfileTest(unittest.TestCase):
+    def setUp(self):
+        # An SSD, and a spinning disk.
+        self.context = sysfs_context(
+            self,
+            [
+                PhysicalDevice("sda"),
+                PhysicalDevice("sdb"),
+                TestSpecification("mountpoint"),
+            ],
+            {"sda": {"rotational": 0}, "sdb": {"rotational": 1}},
+        )
+
+    def options(self, device, type, options=None, profile="fast"):
+        mount = Mount(
+            name="name",
+            device=device,
+            identify="device",
+            mountpoint="mountpoint",
+            type=type,
+            options=options if options else [],
+            dump_frequency=None,
+            fsck_order=None,
+            profile=profile,
+        )
+        (command,) = mount.up(self.context)
+        return command.cmd[command.cmd.index("-o") + 1].split(",")
+
+    def test_ext4(self):
+        self.assertListEqual(
+            ["noatime", "lazytime", "commit=60"], self.options("sdb", "ext4")
+        )
+
+    def test_xfs(self):
+        self.assertListEqual(
+            [
+                "noatime",
+                "lazytime",
+                "logbufs=8",
+                "logbsize=256k",
+                "x-systemd.device-timeout=10s",
+            ],
+            self.options("sda", "xfs"),
+        )
+
+    def test_btrfs(self):
+        self.assertListEqual(
+            [
+                "noatime",
+                "lazytime",
+                "discard=async",
+                "x-systemd.device-timeout=10s",
+            ],
+            self.options("sda", "btrfs"),
+        )
+        self.assertListEqual(["noatime", "lazytime"], self.options("sdb", "btrfs"))
+
+    def test_explicit(self):
+        self.assertListEqual(
+            ["noatime", "lazytime", "commit=5", "errors=remount-ro"],
+            self.options("sdb", "ext4", ["commit=5", "errors=remount-ro"]),
+        )
+
+    def test_default(self):
+        self.assertListEqual(["opt"], self.options("sda", "ext4", ["opt"], None))
+        with self.assertRaises(ValueError):
+            self.options("sda", "ext4", ["opt"], "foo")
+
+    def test_fstab(self):
+        mount = Mount(
+            name="name",
+            device="sdb",
+            identify="device",
+            mountpoint="mountpoint",
+            type="ext4",
+            options=[],
+            dump_frequency=None,
+            fsck_order=None,
+            profile="fast",
+        )
+        list(mount.apply(self.context))
+        self.assertListEqual(
+            [
+                "\\n".join(
+                    [
+                        "",
+                        "# name (originally /dev/sdb)",
+                        "/dev/sdb\\tmountpoint\\text4\\tnoatime,lazytime,commit=60\\t0\\t0",
+                    ]
+                )
+            ],
+            self.context.fstab,
+        )
@@ -1,10 +1,31 @@
 import unittest
 
-from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+from context import (  # pylint: disable=W0611
+    comedian,
+    sysfs_context,
+    SpecificationTestBase,
+)
 
 from comedian.command import Command
 from comedian.graph import ResolveLink
-from comedian.specifications import PartitionTable
+from comedian.specifications import Partition, PartitionTable, PhysicalDevice
+
+
+def _partition(
+    number, align=None, label=None, flags=None, start=None, end=None, unit=None
+):
+    return Partition(
+        name=f"name:{number}",
+        partition_table="name",
+        align=align,
+        number=number,
+        type="type",
+        start=start if start else f"start{number}",
+        end=end if end else f"end{number}",
+        label=label,
+        unit=unit,
+        flags=flags if flags else [],
+    )
 
 
 class PartitionTableTest(SpecificationTestBase, unittest.TestCase):
@@ -16,6 +37,13 @@ class PartitionTableTest(SpecificationTestBase, unittest.TestCase):
                 device="device",
                 type="type",
                 glue="glue",
+                partitions=[
+                    _partition(1, label="label", flags=["flag"]),
+                    _partition(2),
+                    _partition(3, align="optimal"),
+                    _partition(4, align="optimal"),
+                    _partition(5),
+                ],
             ),
         )
         unittest.TestCase.__init__(self, *args, **kwargs)
@@ -26,6 +54,10 @@ class PartitionTableTest(SpecificationTestBase, unittest.TestCase):
         self.assertListEqual([], self.specification.references)
         self.assertEqual("device", self.specification.device)
         self.assertEqual("glue", self.specification.glue)
+        self.assertListEqual(
+            ["name:1", "name:2", "name:3", "name:4", "name:5"],
+            [partition.name for partition in self.specification.partitions],
+        )
 
     def test_resolve(self):
         self.assertEqual(
@@ -39,13 +71,117 @@ class PartitionTableTest(SpecificationTestBase, unittest.TestCase):
 
     def test_apply_commands(self):
         expected = [
-            Command(["parted", "--script", "--", "device", "mklabel", "type"]),
+            Command(
+                [
+                    "parted",
+                    "--script",
+                    "--",
+                    "device",
+                    "mklabel",
+                    "type",
+                    "mkpart",
+                    "type",
+                    "start1",
+                    "end1",
+                    "name",
+                    "1",
+                    "label",
+                    "set",
+                    "1",
+                    "flag",
+                    "on",
+                    "mkpart",
+                    "type",
+                    "start2",
+                    "end2",
+                ]
+            ),
+            Command(
+                [
+                    "parted",
+                    "--script",
+                    "--align=optimal",
+                    "--",
+                    "device",
+                    "mkpart",
+                    "type",
+                    "start3",
+                    "end3",
+                    "mkpart",
+                    "type",
+                    "start4",
+                    "end4",
+                ]
+            ),
+            Command(
+                [
+                    "parted",
+                    "--script",
+                    "--",
+                    "device",
+                    "mkpart",
+                    "type",
+                    "start5",
+                    "end5",
+                ]
+            ),
         ]
         self.assertListEqual(
             expected,
             list(self.specification.apply(self.context)),
         )
 
+    def test_apply_commands_units(self):
+        self.specification.partitions = [
+            _partition(1, unit="s"),
+            _partition(2, unit="s"),
+            _partition(3),
+            _partition(4, align="optimal", unit="MiB"),
+        ]
+
+        self.assertListEqual(
+            [
+                [
+                    "parted",
+                    "--script",
+                    "--",
+                    "device",
+                    "mklabel",
+                    "type",
+                    "unit",
+                    "s",
+                    "mkpart",
+                    "type",
+                    "start1",
+                    "end1",
+                    "mkpart",
+                    "type",
+                    "start2",
+                    "end2",
+                    "unit",
+                    "compact",
+                    "mkpart",
+                    "type",
+                    "start3",
+                    "end3",
+                ],
+                [
+                    "parted",
+                    "--script",
+                    "--align=optimal",
+                    "--",
+                    "device",
+                    "unit",
+                    "MiB",
+                    "mkpart",
+                    "type",
+                    "start4",
+                    "end4",
+                ],
+            ],
+            [command.cmd for command in self.specification.apply(self.context)],
+        )
+
     def test_post_apply_commands(self):
         self.assertIsNone(self.specification.post_apply)
 
@@ -57,3 +193,121 @@ class PartitionTableTest(SpecificationTestBase, unittest.TestCase):
 
     def test_down_commands(self):
         self.assertIsNone(self.specification.down)
+
+
+class PartitionTableTopologyTest(unittest.TestCase):
+    def setUp(self):
+        # A RAID controller with a 3x64K stripe.
+        self.context = sysfs_context(
+            self,
+            [PhysicalDevice("sda"), PhysicalDevice("sdb")],
+            {"sda": {"minimum_io_size": 65536, "optimal_io_size": 196608}},
+        )
+
+    def apply(self, device):
+        partition_table = PartitionTable(
+            name="name",
+            device=device,
+            type="gpt",
+            glue=None,
+            partitions=[
+                _partition(1, align="topology", start="1MiB", end="1GiB"),
+                _partition(2, align="topology", start="1GiB", end="100%"),
+            ],
+        )
+        return list(partition_table.apply(self.context))
+
+    def test_aligned(self):
+        expected = [
+            Command(
+                [
+                    "parted",
+                    "--script",
+                    "--align=none",
+                    "--",
+                    "/dev/sda",
+                    "mklabel",
+                    "gpt",
+                    "mkpart",
+                    "type",
+                    "1179648B",
+                    "1073872895B",
+                ]
+            ),
+            # Percentages cannot be aligned here, so parted aligns them.
+            Command(
+                [
+                    "parted",
+                    "--script",
+                    "--align=optimal",
+                    "--",
+                    "/dev/sda",
+                    "mkpart",
+                    "type",
+                    "1GiB",
+                    "100%",
+                ]
+            ),
+        ]
+        self.assertListEqual(expected, self.apply("sda"))
+
+    def test_aligned_units(self):
+        partition_table = PartitionTable(
+            name="name",
+            device="sda",
+            type="gpt",
+            glue=None,
+            partitions=[
+                _partition(1, align="topology", start="1", end="1024", unit="MiB"),
+                _partition(2, align="topology", start="2048", end="4096", unit="s"),
+            ],
+        )
+
+        commands = list(partition_table.apply(self.context))
+
+        self.assertListEqual(
+            ["--align=none", "--", "/dev/sda", "mklabel", "gpt"],
+            commands[0].cmd[2:7],
+        )
+        self.assertListEqual(
+            ["unit", "MiB", "mkpart", "type", "1179648B", "1073872895B"],
+            commands[0].cmd[7:],
+        )
+        self.assertListEqual(
+            [
+                "--align=optimal",
+                "--",
+                "/dev/sda",
+                "unit",
+                "s",
+                "mkpart",
+                "type",
+                "2048",
+                "4096",
+            ],
+            commands[1].cmd[2:],
+        )
+
+    def test_unknown(self):
+        expected = [
+            Command(
+                [
+                    "parted",
+                    "--script",
+                    "--align=optimal",
+                    "--",
+                    "/dev/sdb",
+                    "mklabel",
+                    "gpt",
+                    "mkpart",
+                    "type",
+                    "1MiB",
+                    "1GiB",
+                    "mkpart",
+                    "type",
+                    "1GiB",
+                    "100%",
+                ]
+            ),
+        ]
+        self.assertListEqual(expected, self.apply("sdb"))
@@ -18,6 +18,8 @@ class PhysicalDeviceTest(SpecificationTestBase, unittest.TestCase):
         self.assertEqual("name", self.specification.name)
         self.assertListEqual([], self.specification.dependencies)
         self.assertListEqual([], self.specification.references)
+        self.assertIsNone(self.specification.dd_bs)
+        self.assertIsNone(self.specification.direct_io)
 
     def test_resolve(self):
         self.assertEqual(
@@ -1,10 +1,15 @@
+import os
 import unittest
 
-from context import comedian, SpecificationTestBase  # pylint: disable=W0611
+from context import (  # pylint: disable=W0611
+    comedian,
+    sysfs_context,
+    SpecificationTestBase,
+)
 
 from comedian.command import Command
 from comedian.graph import ResolveLink
-from comedian.specifications import RaidVolume
+from comedian.specifications import PhysicalDevice, RaidVolume
 
 
 class RaidVolumeTest(SpecificationTestBase, unittest.TestCase):
@@ -81,3 +86,194 @@ class RaidVolumeTest(SpecificationTestBase, unittest.TestCase):
             expected,
             list(self.specification.down(self.context)),
         )
+
+
+class RaidVolumeResyncTest(unittest.TestCase):
+    def setUp(self):
+        self.context = sysfs_context(
+            self, [PhysicalDevice("sda"), PhysicalDevice("sdb")], {"md": {}}
+        )
+        os.makedirs(os.path.join(self.context.config.sys_dir, "class/block/md/md"))
+        self.specification = RaidVolume(
+            name="md",
+            devices=["sda", "sdb"],
+            level="1",
+            metadata="1.2",
+            assume_clean=True,
+            bitmap="internal",
+            bitmap_chunk="64M",
+            sync_speed_min=1000,
+            sync_speed_max=50000,
+        )
+
+    def sync_speed_commands(self):
+        sys_dir = self.context.config.sys_dir
+        path = f'{sys_dir}/block/"$(basename "$(realpath /dev/md/md)")"/md'
+        return [
+            Command(["shell", "-c", f"'echo 1000 > {path}/sync_speed_min'"]),
+            Command(["shell", "-c", f"'echo 50000 > {path}/sync_speed_max'"]),
+        ]
+
+    def test_apply_commands(self):
+        expected = [
+            Command(
+                [
+                    "mdadm",
+                    "--create",
+                    "--name=md",
+                    "--level=1",
+                    "--metadata=1.2",
+                    "--raid-devices=2",
+                    "--assume-clean",
+                    "--bitmap=internal",
+                    "--bitmap-chunk=64M",
+                    "/dev/md/md",
+                    "/dev/sda",
+                    "/dev/sdb",
+                ]
+            ),
+        ] + self.sync_speed_commands()
+        self.assertListEqual(
+            expected,
+            list(self.specification.apply(self.context)),
+        )
+
+    def test_up_commands(self):
+        expected = [
+            Command(["mdadm", "--assemble", "/dev/md/md", "/dev/sda", "/dev/sdb"]),
+        ] + self.sync_speed_commands()
+        self.assertListEqual(
+            expected,
+            list(self.specification.up(self.context)),
+        )
+
+    def test_native(self):
+        for command in list(self.specification.up(self.context))[1:]:
+            command.native(self.context)
+
+        md_dir = os.path.join(self.context.config.sys_dir, "class/block/md/md")
+        for attribute, value in [
+            ("sync_speed_min", "1000"),
+            ("sync_speed_max", "50000"),
+        ]:
+            with open(os.path.join(md_dir, attribute), "r", encoding="utf-8") as f:
+                self.assertEqual(value, f.read().strip())
+
+
+class RaidVolumeGeometryTest(unittest.TestCase):
+    def setUp(self):
+        self.context = sysfs_context(
+            self,
+            [
+                PhysicalDevice("sda"),
+                PhysicalDevice("sdb"),
+                PhysicalDevice("sdc"),
+                PhysicalDevice("nvme0n1"),
+            ],
+            {},
+        )
+        self.specification = RaidVolume(
+            name="md",
+            devices=["sda", "sdb", "sdc"],
+            level="5",
+            metadata="1.2",
+            chunk="64K",
+            layout="left-symmetric",
+            consistency_policy="journal",
+            write_journal="nvme0n1",
+        )
+
+    def test_properties(self):
+        self.assertListEqual(
+            ["sda", "sdb", "sdc", "nvme0n1"], self.specification.dependencies
+        )
+        self.assertListEqual(["sda", "sdb", "sdc"], self.specification.devices)
+
+    def test_apply_commands(self):
+        expected = [
+            Command(
+                [
+                    "mdadm",
+                    "--create",
+                    "--name=md",
+                    "--level=5",
+                    "--metadata=1.2",
+                    "--raid-devices=3",
+                    "--chunk=64K",
+                    "--layout=left-symmetric",
+                    "--consistency-policy=journal",
+                    "--write-journal=/dev/nvme0n1",
+                    "/dev/md/md",
+                    "/dev/sda",
+                    "/dev/sdb",
+                    "/dev/sdc",
+                ]
+            ),
+        ]
+        self.assertListEqual(
+            expected,
+            list(self.specification.apply(self.context)),
+        )
+
+    def test_up_commands(self):
+        expected = [
+            Command(
+                [
+                    "mdadm",
+                    "--assemble",
+                    "/dev/md/md",
+                    "/dev/sda",
+                    "/dev/sdb",
+                    "/dev/sdc",
+                    "/dev/nvme0n1",
+                ]
+            ),
+        ]
+        self.assertListEqual(
+            expected,
+            list(self.specification.up(self.context)),
+        )
+
+
+class RaidVolumeTopologyTest(unittest.TestCase):
+    def setUp(self):
+        # Two RAID controllers with a 3x64K stripe, and two 4K drives.
+        self.context = sysfs_context(
+            self,
+            [
+                PhysicalDevice("sda"),
+                PhysicalDevice("sdb"),
+                PhysicalDevice("sdc"),
+                PhysicalDevice("sdd"),
+            ],
+            {
+                "sda": {"minimum_io_size": 65536, "optimal_io_size": 196608},
+                "sdb": {"minimum_io_size": 65536, "optimal_io_size": 196608},
+                "sdc": {"minimum_io_size": 4096, "optimal_io_size": 0},
+                "sdd": {"minimum_io_size": 4096, "optimal_io_size": 0},
+            },
+        )
+
+    def chunk_args(self, level, devices):
+        (command,) = RaidVolume("md", devices, level, "1.2").apply(self.context)
+        return [arg for arg in command.cmd if arg.startswith("--chunk")]
+
+    def test_striped(self):
+        self.assertListEqual(["--chunk=1536K"], self.chunk_args("0", ["sda", "sdb"]))
+
+    def test_parity(self):
+        # 1536K is not a power of two, so mdadm's default is kept.
+        self.assertListEqual([], self.chunk_args("raid5", ["sda", "sdb"]))
+
+    def test_mirrored(self):
+        self.assertListEqual([], self.chunk_args("raid1", ["sda", "sdb"]))
+
+    def test_explicit(self):
+        (command,) = RaidVolume("md", ["sda", "sdb"], "0", "1.2", chunk="64K").apply(
+            self.context
+        )
+        self.assertIn("--chunk=64K", command.cmd)
+        self.assertNotIn("--chunk=1536K", command.cmd)
+
+    def test_default_aligned(self):
+        self.assertListEqual([], self.chunk_args("raid0", ["sdc", "sdd"]))
@@ -31,37 +31,44 @@ class RootTest(SpecificationTestBase, unittest.TestCase):
         )
 
     def test_apply_commands(self):
-        expected = [
-            Command(["mkdir", "--parents", "tmp_dir/etc"]),
-            Command(["truncate", "--size=0", "tmp_dir/etc/fstab"]),
-            Command(["chmod", "0644", "tmp_dir/etc/fstab"]),
-            Command(["chown", "root:root", "tmp_dir/etc/fstab"]),
-            Command(["truncate", "--size=0", "tmp_dir/etc/crypttab"]),
-            Command(["chmod", "0644", "tmp_dir/etc/crypttab"]),
-            Command(["chown", "root:root", "tmp_dir/etc/crypttab"]),
-        ]
-        self.assertListEqual(
-            expected,
-            list(self.specification.apply(self.context)),
-        )
+        self.assertIsNone(self.specification.apply)
 
     def test_post_apply_commands(self):
+        self.context.fstab.append("\\n# fstab")
+        self.context.crypttab.append("\\n# crypt\\nta\\tb")
+
         expected = [
             Command(["mkdir", "--parents", "media_dir/etc"]),
             Command(
                 [
-                    "cp",
-                    "tmp_dir/etc/fstab",
-                    "media_dir/etc/fstab",
-                    "--preserve=mode,ownership",
+                    "shell",
+                    "-c",
+                    "'"
+                    + " && ".join(
+                        [
+                            'printf "%b" "\\n# fstab\\n" > media_dir/etc/fstab.tmp',
+                            "chmod 0644 media_dir/etc/fstab.tmp",
+                            "chown root:root media_dir/etc/fstab.tmp",
+                            "mv media_dir/etc/fstab.tmp media_dir/etc/fstab",
+                        ]
+                    )
+                    + "'",
                 ]
             ),
             Command(
                 [
-                    "cp",
-                    "tmp_dir/etc/crypttab",
-                    "media_dir/etc/crypttab",
-                    "--preserve=mode,ownership",
+                    "shell",
+                    "-c",
+                    "'"
+                    + " && ".join(
+                        [
+                            'printf "%b" "\\n# crypt\\nta\\tb\\n" > media_dir/etc/crypttab.tmp',
+                            "chmod 0644 media_dir/etc/crypttab.tmp",
+                            "chown root:root media_dir/etc/crypttab.tmp",
+                            "mv media_dir/etc/crypttab.tmp media_dir/etc/crypttab",
+                        ]
+                    )
+                    + "'",
                 ]
             ),
         ]
@@ -62,18 +62,12 @@ class SwapVolumeTest(SpecificationTestBase, unittest.TestCase):
                 ]
             ),
             Command(["swapon", "device"]),
-            Command(
-                [
-                    "shell",
-                    "-c",
-                    "'echo -e \"{}\" >> tmp_dir/etc/fstab'".format(fstab_lines),
-                ]
-            ),
         ]
         self.assertListEqual(
             expected,
             list(self.specification.apply(self.context)),
         )
+        self.assertListEqual([fstab_lines], self.context.fstab)
 
     def test_post_apply_commands(self):
         self.assertIsNone(self.specification.post_apply)
@@ -7,20 +7,25 @@ from context import comedian  # pylint: disable=W0611
 from comedian.action import (
     ActionCommandGenerator,
     ApplyAction,
+    BatchingCommandHandler,
     DownAction,
+    StatusAction,
     UpAction,
     make_action,
 )
-from comedian.command import Command, CommandContext, CommandGenerator
+from comedian.command import Command, CommandContext, CommandGenerator, wait_job
 from comedian.configuration import Configuration
+from comedian.event import EventLog
 from comedian.graph import Graph
+from comedian.parse import parse
 from comedian.traits import DebugMixin, EqMixin
 
 
 class TestActionCommandGenerator(ActionCommandGenerator, DebugMixin, EqMixin):
-    def __init__(self, name: str, **kwargs: Any):
+    def __init__(self, name: str, dependencies: Iterable[str] = (), **kwargs: Any):
         super().__init__(**kwargs)
         self.name = name
+        self.dependencies = list(dependencies)
 
     def __fields__(self) -> Iterator[str]:
         yield "name"
@@ -34,6 +39,14 @@ class TestCommandGenerator(CommandGenerator):
         yield from self.commands
 
 
+class RecordingEventSink:
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(str(event))
+
+
 class ActionTest(unittest.TestCase):
     def setUp(self):
         configuration = Configuration(
@@ -44,7 +57,8 @@ class ActionTest(unittest.TestCase):
             tmp_dir="tmp_dir",
         )
         graph = Graph([])
-        self.context = CommandContext(configuration, graph)
+        self.sink = RecordingEventSink()
+        self.context = CommandContext(configuration, graph, EventLog([self.sink]))
 
         self.generators = [
             TestActionCommandGenerator(
@@ -171,6 +185,82 @@ class ActionTest(unittest.TestCase):
             ]
         )
         handler.on_end.assert_called_once_with(self.context)
+        self.assertListEqual(
+            [
+                "begin",
+                "generator apply gen_1 (TestActionCommandGenerator)",
+                "command apply gen_1 (TestActionCommandGenerator): apply_1",
+                "command apply gen_1 (TestActionCommandGenerator): apply_2",
+                "generator apply gen_2 (TestActionCommandGenerator)",
+                "command apply gen_2 (TestActionCommandGenerator): apply_3",
+                "command apply gen_2 (TestActionCommandGenerator): apply_4",
+                "generator post_apply gen_1 (TestActionCommandGenerator)",
+                "command post_apply gen_1 (TestActionCommandGenerator): post_apply_1",
+                "command post_apply gen_1 (TestActionCommandGenerator): post_apply_2",
+                "generator post_apply gen_2 (TestActionCommandGenerator)",
+                "command post_apply gen_2 (TestActionCommandGenerator): post_apply_3",
+                "command post_apply gen_2 (TestActionCommandGenerator): post_apply_4",
+                "end",
+            ],
+            self.sink.events,
+        )
+
+    def test_apply_wipe_stages(self):
+        def job(name: str, resource: str) -> Command:
+            return Command([name], job=name, resources=[resource])
+
+        generators = [
+            TestActionCommandGenerator(
+                "a",
+                wipe=TestCommandGenerator([job("wipe_a", "disk_1")]),
+                apply=TestCommandGenerator([Command(["apply_a"])]),
+            ),
+            TestActionCommandGenerator(
+                "b",
+                wipe=TestCommandGenerator([job("wipe_b", "disk_1")]),
+                apply=TestCommandGenerator([Command(["apply_b"])]),
+            ),
+            TestActionCommandGenerator(
+                "c",
+                wipe=TestCommandGenerator([job("wipe_c", "disk_2")]),
+                apply=TestCommandGenerator([Command(["apply_c"])]),
+            ),
+            TestActionCommandGenerator(
+                "d",
+                dependencies=["a"],
+                apply=TestCommandGenerator([Command(["apply_d"])]),
+            ),
+            TestActionCommandGenerator(
+                "e",
+                apply=TestCommandGenerator([Command(["apply_e"])]),
+            ),
+        ]
+        handler = MagicMock()
+
+        ApplyAction(self.context)(handler, generators)
+
+        self.assertListEqual(
+            [
+                # The wipe of "b" shares a disk with the wipe of "a", and "d"
+                # depends on "a", so both wait for the next stage.
+                job("wipe_a", "disk_1"),
+                job("wipe_c", "disk_2"),
+                Command(["apply_e"]),
+                wait_job("wipe_a"),
+                wait_job("wipe_c"),
+                Command(["apply_a"]),
+                job("wipe_b", "disk_1"),
+                Command(["apply_c"]),
+                Command(["apply_d"]),
+                wait_job("wipe_b"),
+                Command(["apply_b"]),
+            ],
+            [args[1] for args, _ in handler.on_command.call_args_list],
+        )
+        self.assertIn(
+            'command wait a (TestActionCommandGenerator): wait "$job_wipe_a"',
+            self.sink.events,
+        )
 
     def test_up_commands(self):
         handler = MagicMock()
@@ -194,6 +284,74 @@ class ActionTest(unittest.TestCase):
         )
         handler.on_end.assert_called_once_with(self.context)
 
+    def test_up_jobs(self):
+        generators = [
+            TestActionCommandGenerator(
+                "a", up=TestCommandGenerator([Command(["open_a"], job="open_a")])
+            ),
+            TestActionCommandGenerator(
+                "b", up=TestCommandGenerator([Command(["open_b"], job="open_b")])
+            ),
+            TestActionCommandGenerator(
+                "c",
+                dependencies=["a", "b"],
+                up=TestCommandGenerator([Command(["mount_c"])]),
+            ),
+        ]
+        handler = MagicMock()
+
+        UpAction(self.context)(handler, generators)
+
+        self.assertListEqual(
+            [
+                Command(["open_a"], job="open_a"),
+                Command(["open_b"], job="open_b"),
+                wait_job("open_a"),
+                wait_job("open_b"),
+                Command(["mount_c"]),
+            ],
+            [args[1] for args, _ in handler.on_command.call_args_list],
+        )
+
+    def test_up_order(self):
+        class OtherActionCommandGenerator(TestActionCommandGenerator):
+            pass
+
+        def generator(cls, name, dependencies=()):
+            return cls(
+                name,
+                dependencies=dependencies,
+                up=TestCommandGenerator([Command(["up", name])]),
+            )
+
+        generators = [
+            generator(TestActionCommandGenerator, "pv_a"),
+            generator(OtherActionCommandGenerator, "vg_a", ["pv_a"]),
+            generator(TestActionCommandGenerator, "lv_a", ["vg_a"]),
+            generator(TestActionCommandGenerator, "pv_b"),
+            generator(TestActionCommandGenerator, "fs_b", ["pv_b"]),
+            generator(OtherActionCommandGenerator, "vg_b", ["pv_b"]),
+            generator(TestActionCommandGenerator, "lv_b", ["vg_b"]),
+        ]
+        handler = MagicMock()
+
+        UpAction(self.context)(handler, generators)
+
+        # Independent generators of the same type are handled one after the
+        # other, with the dependencies of every generator handled before it.
+        self.assertListEqual(
+            [
+                Command(["up", "pv_a"]),
+                Command(["up", "pv_b"]),
+                Command(["up", "fs_b"]),
+                Command(["up", "vg_a"]),
+                Command(["up", "vg_b"]),
+                Command(["up", "lv_a"]),
+                Command(["up", "lv_b"]),
+            ],
+            [args[1] for args, _ in handler.on_command.call_args_list],
+        )
+
     def test_down_commands(self):
         handler = MagicMock()
 
@@ -220,6 +378,103 @@ class ActionTest(unittest.TestCase):
         )
         handler.on_end.assert_called_once_with(self.context)
 
+    def test_streaming_commands(self):
+        handled = []
+
+        class RecordingCommandGenerator(CommandGenerator):
+            def __call__(self, context: CommandContext) -> Iterator[Command]:
+                for index in range(3):
+                    # Every previous command must have been handled before the
+                    # next one is generated.
+                    self_test.assertEqual(index, len(handled))
+                    yield Command([str(index)])
+
+        self_test = self
+        handler = MagicMock()
+        handler.on_command.side_effect = lambda context, command: handled.append(
+            command
+        )
+        generators = [TestActionCommandGenerator("gen", up=RecordingCommandGenerator())]
+
+        UpAction(self.context)(handler, generators)
+
+        self.assertEqual(3, len(handled))
+
+    def test_batching_handler(self):
+        gen_1 = TestActionCommandGenerator("gen_1")
+        gen_2 = TestActionCommandGenerator("gen_2")
+        gen_3 = TestActionCommandGenerator("gen_3")
+        handler = MagicMock()
+        batching = BatchingCommandHandler(handler)
+
+        batching.on_begin(self.context)
+        batching.on_generator(self.context, gen_1)
+        batching.on_command(self.context, Command(["a", "1"], batch=1))
+        batching.on_generator(self.context, gen_2)
+        batching.on_command(self.context, Command(["a", "2"], batch=1))
+        batching.on_command(self.context, Command(["b", "3"], batch=1))
+        batching.on_generator(self.context, gen_3)
+        batching.on_command(self.context, Command(["c"]))
+        batching.on_command(self.context, Command(["a", "4"], batch=1))
+        batching.on_end(self.context)
+
+        handler.assert_has_calls(
+            [
+                call.on_begin(self.context),
+                call.on_generator(self.context, gen_1),
+                call.on_generator(self.context, gen_2),
+                call.on_command(self.context, Command(["a", "1", "2"], batch=1)),
+                call.on_generator(self.context, gen_3),
+                call.on_command(self.context, Command(["b", "3"], batch=1)),
+                call.on_command(self.context, Command(["c"])),
+                call.on_command(self.context, Command(["a", "4"], batch=1)),
+                call.on_end(self.context),
+            ]
+        )
+        self.assertEqual(9, len(handler.mock_calls))
+        self.assertListEqual(["batch: a 1 2: 2 commands"], self.sink.events)
+
+    def test_batching_lvm(self):
+        # Every logical volume is created by the same lvm shell, even though
+        # each one also has a filesystem.
+        graph = Graph(
+            parse(
+                {
+                    "physical_devices": [
+                        {"name": "sda", "lvm_physical_volume": {"name": "pv"}}
+                    ],
+                    "lvm_volume_groups": [
+                        {
+                            "name": "vg",
+                            "lvm_physical_volumes": ["pv"],
+                            "lvm_logical_volumes": [
+                                {
+                                    "name": f"lv{index}",
+                                    "size": "1G",
+                                    "filesystem": {
+                                        "name": f"fs{index}",
+                                        "type": "ext4",
+                                    },
+                                }
+                                for index in range(5)
+                            ],
+                        }
+                    ],
+                }
+            )
+        )
+        context = CommandContext(self.context.config, graph)
+        handler = MagicMock()
+
+        ApplyAction(context)(BatchingCommandHandler(handler), graph)
+
+        commands = [args[1].join() for args, _ in handler.on_command.call_args_list]
+        lvm = [command for command in commands if "lvcreate" in command]
+        self.assertEqual(1, len(lvm))
+        self.assertIn("| lvm", lvm[0])
+        self.assertEqual(5, lvm[0].count("lvcreate"))
+        self.assertEqual(5, len([c for c in commands if c.startswith("mkfs")]))
+
     def test_make_action(self):
         self.assertEqual(
             ApplyAction,
@@ -233,3 +488,7 @@ class ActionTest(unittest.TestCase):
             DownAction,
             make_action("down", self.context).__class__,
         )
+        self.assertEqual(
+            StatusAction,
+            make_action("status", self.context).__class__,
+        )
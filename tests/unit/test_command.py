@@ -2,7 +2,17 @@ import unittest
 
 from context import comedian  # pylint: disable=W0611
 
-from comedian.command import Command, CommandContext
+from comedian.command import (
+    Command,
+    CommandContext,
+    LvmCommand,
+    chmod,
+    crypttab_append,
+    fstab_append,
+    install_file,
+    mkdir,
+    truncate,
+)
 from comedian.configuration import Configuration
 from comedian.graph import Graph
 
@@ -11,6 +21,53 @@ class CommandTest(unittest.TestCase):
     def test_command(self):
         self.assertListEqual(["a"], Command(["a"]).cmd)
 
+    def test_command_native(self):
+        self.assertIsNone(Command(["a"]).native)
+        self.assertEqual(Command(["a"]), Command(["a"], native=lambda context: None))
+
+        self.assertIsNotNone(mkdir("path").native)
+        self.assertIsNotNone(chmod("0644", "path").native)
+        self.assertIsNotNone(truncate("1M", "path").native)
+        self.assertIsNone(mkdir("$path").native)
+        self.assertIsNone(chmod("u+x", "path").native)
+        self.assertIsNone(truncate("+1M", "path").native)
+
+    def test_command_merge(self):
+        self.assertEqual(
+            Command(["a", "-x", "b", "c", "d"], batch=2),
+            Command(["a", "-x", "b"], batch=2).merge(
+                Command(["a", "-x", "c", "d"], batch=2)
+            ),
+        )
+        self.assertIsNone(Command(["a", "b"]).merge(Command(["a", "c"])))
+        self.assertIsNone(
+            Command(["a", "b"], batch=1).merge(Command(["a", "-x", "c"], batch=2))
+        )
+        self.assertIsNone(
+            Command(["a", "-x", "b"], batch=2).merge(Command(["a", "-y", "c"], batch=2))
+        )
+
+    def test_lvm_command_merge(self):
+        vgcreate = LvmCommand(["vgcreate", "vg", "/dev/sda"], volume_groups=["vg"])
+        lvcreate_1 = LvmCommand(
+            ["lvcreate", "--name=a", "vg"], logical_volumes=["vg/a"]
+        )
+        lvcreate_2 = LvmCommand(
+            ["lvcreate", "--name=b", "vg"], logical_volumes=["vg/b"]
+        )
+
+        self.assertTrue(vgcreate.batchable())
+        merged = vgcreate.merge(lvcreate_1).merge(lvcreate_2)
+        self.assertEqual(
+            "printf '%s\\n' 'vgcreate vg /dev/sda' 'lvcreate --name=a vg' "
+            "'lvcreate --name=b vg' | lvm "
+            "&& vgs --noheadings --options=vg_name vg "
+            "&& lvs --noheadings --options=lv_name vg/a vg/b",
+            merged.join(),
+        )
+        self.assertIsNone(vgcreate.merge(Command(["lvconvert", "vg/a"])))
+        self.assertIsNone(Command(["pvcreate", "/dev/sda"], batch=1).merge(vgcreate))
+
     def test_command_context(self):
         configuration = Configuration(
             shell="shell",
@@ -24,3 +81,34 @@ class CommandTest(unittest.TestCase):
 
         self.assertEqual(configuration, context.config)
         self.assertEqual(graph, context.graph)
+        self.assertListEqual([], context.fstab)
+        self.assertListEqual([], context.crypttab)
+
+    def test_table_append(self):
+        context = CommandContext(
+            Configuration(
+                shell="shell",
+                dd_bs="dd_bs",
+                random_device="random_device",
+                media_dir="media_dir",
+                tmp_dir="tmp_dir",
+            ),
+            Graph([]),
+        )
+
+        fstab_append(context, "a")
+        fstab_append(context, "b")
+        crypttab_append(context, "c")
+
+        self.assertListEqual(["a", "b"], context.fstab)
+        self.assertListEqual(["c"], context.crypttab)
+        self.assertEqual(
+            Command(
+                [
+                    "shell",
+                    "-c",
+                    '\'printf "%b" "a\\nb\\n" > path.tmp && chmod 0600 path.tmp && mv path.tmp path\'',
+                ]
+            ),
+            install_file(context, "path", context.fstab, "0600", None, None),
+        )
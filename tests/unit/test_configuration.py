@@ -21,6 +21,8 @@ class ConfigurationTest(unittest.TestCase):
         self.assertEqual("random_device", self.configuration.random_device)
         self.assertEqual("media_dir", self.configuration.media_dir)
         self.assertEqual("tmp_dir", self.configuration.tmp_dir)
+        self.assertEqual("randomize", self.configuration.wipe_strategy)
+        self.assertEqual("/sys", self.configuration.sys_dir)
 
     def test_paths(self):
         self.assertEqual(
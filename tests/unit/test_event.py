@@ -0,0 +1,87 @@
+import io
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+from context import comedian  # pylint: disable=W0611
+
+from comedian.event import Event, EventLog, JsonEventSink, LoggingEventSink
+
+
+class RecordingEventSink:
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event: Event):
+        self.events.append(event)
+
+
+class EventTest(unittest.TestCase):
+    def test_fields(self):
+        event = Event("command", phase="apply", name="sda", argv=["a", "b"])
+
+        fields = event.fields()
+        self.assertIn("time", fields)
+        fields.pop("time")
+        self.assertDictEqual(
+            {"kind": "command", "phase": "apply", "name": "sda", "argv": ["a", "b"]},
+            fields,
+        )
+
+    def test_str(self):
+        self.assertEqual("begin", str(Event("begin")))
+        self.assertEqual(
+            "generator apply sda (PhysicalDevice)",
+            str(Event("generator", phase="apply", name="sda", type="PhysicalDevice")),
+        )
+        self.assertEqual(
+            "command up sda (PhysicalDevice): a b",
+            str(
+                Event(
+                    "command",
+                    phase="up",
+                    name="sda",
+                    type="PhysicalDevice",
+                    argv=["a", "b"],
+                )
+            ),
+        )
+
+
+class EventSinkTest(unittest.TestCase):
+    @patch("comedian.event.logging.log")
+    def test_logging_sink(self, logging_log):
+        event = Event("begin")
+
+        LoggingEventSink()(event)
+
+        logging_log.assert_called_once_with(logging.INFO, "%s", event)
+
+    def test_json_sink(self):
+        stream = io.StringIO()
+        sink = JsonEventSink(stream)
+
+        sink(Event("begin"))
+        sink(Event("command", phase="apply", name="sda", argv=["a"]))
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(2, len(lines))
+        self.assertEqual("begin", lines[0]["kind"])
+        self.assertEqual(["a"], lines[1]["argv"])
+        self.assertEqual("apply", lines[1]["phase"])
+
+    def test_event_log(self):
+        first = RecordingEventSink()
+        second = RecordingEventSink()
+        event = Event("begin")
+
+        EventLog([first, second]).emit(event)
+
+        self.assertListEqual([event], first.events)
+        self.assertListEqual([event], second.events)
+
+    def test_default_event_log(self):
+        sinks = EventLog().sinks
+        self.assertEqual(1, len(sinks))
+        self.assertIsInstance(sinks[0], LoggingEventSink)
@@ -277,6 +277,56 @@ class GraphWalkTest(unittest.TestCase):
         actual = list(graph.walk())
         self.assertListEqual(expected, actual)
 
+    def test_reverse_walk(self):
+        a = TestGraphNode("a", [])
+        b = TestGraphNode("b", ["a"])
+        c = TestGraphNode("c", ["b"])
+        d = TestGraphNode("d", ["a"])
+        e = TestGraphNode("e", ["d"])
+
+        nodes = [a, b, c, d, e]
+        graph = Graph(nodes)
+
+        expected = [e, c, d, b, a]
+        self.assertListEqual(expected, list(graph.reverse_walk()))
+        self.assertListEqual(expected, list(reversed(graph)))
+
+    def test_iter(self):
+        a = TestGraphNode("a", ["b"])
+        b = TestGraphNode("b", [])
+
+        nodes = [a, b]
+        graph = Graph(nodes)
+
+        self.assertListEqual([b, a], list(graph))
+        self.assertListEqual([b, a], list(graph))
+
+    def test_roots(self):
+        a = TestGraphNode("a", [])
+        b = TestGraphNode("b", [])
+        c = TestGraphNode("c", ["a"])
+        d = TestGraphNode("d", ["b", "c"])
+
+        nodes = [a, b, c, d]
+        graph = Graph(nodes)
+
+        self.assertSetEqual({"a"}, graph.roots("a"))
+        self.assertSetEqual({"a"}, graph.roots("c"))
+        self.assertSetEqual({"a", "b"}, graph.roots("d"))
+
+    def test_reverse_cycle(self):
+        a = TestGraphNode("a", ["b"])
+        b = TestGraphNode("b", ["a"])
+        c = TestGraphNode("c", [])
+
+        nodes = [a, b, c]
+        graph = Graph(nodes)
+
+        with self.assertRaises(GraphWalkError) as context:
+            list(graph.reverse_walk())
+
+        self.assertEqual({"a": {"b"}, "b": {"a"}}, context.exception.not_visited)
+
     def test_self_reference(self):
         a = TestGraphNode("a", ["a"])
 
@@ -1,11 +1,13 @@
+import subprocess
 import unittest
 from unittest.mock import patch
 
 from context import comedian  # pylint: disable=W0611
 
 from comedian.action import ActionCommandGenerator
-from comedian.command import Command, CommandContext
+from comedian.command import Command, CommandContext, wait_job
 from comedian.configuration import Configuration
+from comedian.event import EventLog
 from comedian.graph import Graph
 from comedian.mode import DryrunMode, ExecMode, ShellMode, make_mode
 
@@ -40,19 +42,16 @@ class ModeTest(unittest.TestCase):
         self.capture_command = Command(["command"], capture="capture")
         self.mock_print = MockPrint()
 
-        logging_info = patch("comedian.mode.logging.info")
         subprocess_check_call = patch("comedian.mode.subprocess.check_call")
         subprocess_check_output = patch("comedian.mode.subprocess.check_output")
         print = patch("comedian.mode.print")
 
-        self.logging_info = logging_info.start()
         self.subprocess_check_call = subprocess_check_call.start()
         self.subprocess_check_output = subprocess_check_output.start()
         self.print = print.start()
 
         self.print.side_effect = self.mock_print
 
-        self.addCleanup(logging_info.stop)
         self.addCleanup(subprocess_check_call.stop)
         self.addCleanup(subprocess_check_output.stop)
         self.addCleanup(print.stop)
@@ -68,7 +67,6 @@ class ExecModeTest(ModeTest):
 
         self.mode.on_begin(context)
 
-        self.logging_info.assert_not_called()
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -78,7 +76,6 @@ class ExecModeTest(ModeTest):
 
         self.mode.on_generator(context, self.generator)
 
-        self.logging_info.assert_called_once_with("%s", self.generator)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -89,13 +86,78 @@ class ExecModeTest(ModeTest):
         self.mode.on_command(context, self.command)
 
         self.assertDictEqual(context.env, {})
-        self.logging_info.assert_called_once_with("%s", self.command)
         self.subprocess_check_call.assert_called_once_with(
             "command", env={}, shell=True
         )
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
 
+    def test_on_native_command(self):
+        context = CommandContext(self.configuration, self.graph)
+        calls = []
+        command = Command(["command"], native=calls.append)
+
+        self.mode.on_command(context, command)
+
+        self.assertListEqual([context], calls)
+        self.subprocess_check_call.assert_not_called()
+        self.subprocess_check_output.assert_not_called()
+        self.print.assert_not_called()
+
+    def test_on_job_command(self):
+        events = []
+        context = CommandContext(
+            self.configuration, self.graph, EventLog([events.append])
+        )
+        command = Command(["printf", "'10%%\\r20%%\\n'", ">&2"], job="job")
+
+        self.mode.on_command(context, command)
+        self.mode.on_command(context, wait_job("job"))
+
+        self.assertDictEqual({}, context.jobs)
+        self.assertListEqual(
+            ["progress job: 10%", "progress job: 20%"],
+            [str(event) for event in events[:2]],
+        )
+        self.assertTrue(str(events[2]).startswith("job job: finished in "))
+        self.subprocess_check_call.assert_not_called()
+        self.subprocess_check_output.assert_not_called()
+        self.print.assert_not_called()
+
+    def test_on_native_job_command(self):
+        events = []
+        context = CommandContext(
+            self.configuration, self.graph, EventLog([events.append])
+        )
+        calls = []
+        command = Command(["command"], native=calls.append, job="job")
+
+        self.mode.on_command(context, command)
+        self.mode.on_command(context, wait_job("job"))
+
+        self.assertListEqual([context], calls)
+        self.assertTrue(str(events[0]).startswith("job job: finished in "))
+        self.subprocess_check_call.assert_not_called()
+
+    def test_on_failed_native_job_command(self):
+        context = CommandContext(self.configuration, self.graph, EventLog([]))
+
+        def fail(context):
+            raise OSError("failed")
+
+        self.mode.on_command(context, Command(["command"], native=fail, job="job"))
+
+        with self.assertRaises(OSError):
+            self.mode.on_command(context, wait_job("job"))
+
+    def test_on_failed_job_command(self):
+        context = CommandContext(self.configuration, self.graph, EventLog([]))
+
+        self.mode.on_command(context, Command(["exit", "3"], job="job"))
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.mode.on_command(context, wait_job("job"))
+
     def test_on_capture_command(self):
         context = CommandContext(self.configuration, self.graph)
         context.env["foo"] = "bar"
@@ -104,7 +166,6 @@ class ExecModeTest(ModeTest):
         self.mode.on_command(context, self.capture_command)
 
         self.assertDictEqual(context.env, {"foo": "bar", "capture": "result"})
-        self.logging_info.assert_called_once_with("%s", self.capture_command)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_called_once_with(
             "command", env={"foo": "bar"}, shell=True
@@ -116,7 +177,6 @@ class ExecModeTest(ModeTest):
 
         self.mode.on_end(context)
 
-        self.logging_info.assert_not_called()
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -132,7 +192,6 @@ class DryrunModeTest(ModeTest):
 
         self.mode.on_begin(context)
 
-        self.logging_info.assert_not_called()
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -142,7 +201,6 @@ class DryrunModeTest(ModeTest):
 
         self.mode.on_generator(context, self.generator)
 
-        self.logging_info.assert_called_once_with("%s", self.generator)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -153,7 +211,6 @@ class DryrunModeTest(ModeTest):
         self.mode.on_command(context, self.command)
 
         self.assertDictEqual(context.env, {})
-        self.logging_info.assert_called_once_with("%s", self.command)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -165,7 +222,6 @@ class DryrunModeTest(ModeTest):
         self.mode.on_command(context, self.capture_command)
 
         self.assertDictEqual(context.env, {"foo": "bar"})
-        self.logging_info.assert_called_once_with("%s", self.capture_command)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -175,7 +231,6 @@ class DryrunModeTest(ModeTest):
 
         self.mode.on_end(context)
 
-        self.logging_info.assert_not_called()
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
@@ -191,7 +246,6 @@ class ShellModeTest(ModeTest):
 
         self.mode.on_begin(context)
 
-        self.logging_info.assert_not_called()
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_called()
@@ -205,7 +259,6 @@ class ShellModeTest(ModeTest):
 
         self.mode.on_generator(context, self.generator)
 
-        self.logging_info.assert_called_once_with("%s", self.generator)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_called()
@@ -220,18 +273,38 @@ class ShellModeTest(ModeTest):
         self.mode.on_command(context, self.command)
 
         self.assertDictEqual(context.env, {})
-        self.logging_info.assert_called_once_with("%s", self.command)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_called_once_with(" ".join(self.command.cmd))
 
+    def test_on_native_command(self):
+        context = CommandContext(self.configuration, self.graph)
+        calls = []
+        command = Command(["command"], native=calls.append)
+
+        self.mode.on_command(context, command)
+
+        self.assertListEqual([], calls)
+        self.print.assert_called_once_with("command")
+
+    def test_on_job_command(self):
+        context = CommandContext(self.configuration, self.graph)
+
+        self.mode.on_command(context, Command(["command"], job="wipe:job"))
+        self.mode.on_command(context, wait_job("wipe:job"))
+
+        self.assertDictEqual({}, context.jobs)
+        self.assertEqual(
+            'command &\njob_wipe_job=$!\nwait "$job_wipe_job"\n',
+            self.print.side_effect.buffer,
+        )
+
     def test_on_capture_command(self):
         context = CommandContext(self.configuration, self.graph)
 
         self.mode.on_command(context, self.capture_command)
 
         self.assertDictEqual(context.env, {})
-        self.logging_info.assert_called_once_with("%s", self.capture_command)
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_called_once_with(
@@ -246,7 +319,6 @@ class ShellModeTest(ModeTest):
 
         self.mode.on_end(context)
 
-        self.logging_info.assert_not_called()
         self.subprocess_check_call.assert_not_called()
         self.subprocess_check_output.assert_not_called()
         self.print.assert_not_called()
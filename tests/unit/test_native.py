@@ -0,0 +1,97 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from context import comedian  # pylint: disable=W0611
+
+from comedian import native
+
+
+class ParseSizeTest(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(512, native.parse_size("512"))
+        self.assertEqual(2 * 1024, native.parse_size("2K"))
+        self.assertEqual(2 * 1024**2, native.parse_size("2MiB"))
+        self.assertEqual(2 * 1000**3, native.parse_size("2GB"))
+        self.assertEqual(1024**4, native.parse_size("1T"))
+        self.assertIsNone(native.parse_size("2.5G"))
+        self.assertIsNone(native.parse_size("+2G"))
+        self.assertIsNone(native.parse_size(""))
+
+
+class NativeTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(tmp_dir.cleanup)
+        self.root = tmp_dir.name
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def test_makedirs(self):
+        native.makedirs(self.path("a", "b"), self.path("c"))
+        native.makedirs(self.path("a", "b"))
+
+        self.assertTrue(os.path.isdir(self.path("a", "b")))
+        self.assertTrue(os.path.isdir(self.path("c")))
+
+    def test_chmod(self):
+        native.touch(self.path("f"))
+        native.chmod(0o640, self.path("f"))
+
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(self.path("f")).st_mode))
+
+    def test_chown(self):
+        native.touch(self.path("f"))
+        uid = os.getuid()
+        gid = os.getgid()
+        native.chown(str(uid), str(gid), self.path("f"))
+        native.chown(None, None, self.path("f"))
+
+        self.assertEqual(uid, os.stat(self.path("f")).st_uid)
+        self.assertEqual(gid, os.stat(self.path("f")).st_gid)
+
+    def test_copy(self):
+        with open(self.path("src"), "w", encoding="utf-8") as f:
+            f.write("content")
+        os.chmod(self.path("src"), 0o600)
+        native.makedirs(self.path("dir"))
+
+        native.copy(self.path("src"), self.path("dst"))
+        native.copy(self.path("src"), self.path("dir"))
+
+        for path in [self.path("dst"), self.path("dir", "src")]:
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertEqual("content", f.read())
+            self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_link(self):
+        native.touch(self.path("src"))
+        native.touch(self.path("dst"))
+
+        native.link("src", self.path("dst"), True)
+        native.link(self.path("src"), self.path("hard"), False)
+
+        self.assertEqual("src", os.readlink(self.path("dst")))
+        self.assertTrue(os.path.samefile(self.path("src"), self.path("hard")))
+
+    def test_truncate(self):
+        with open(self.path("f"), "w", encoding="utf-8") as f:
+            f.write("content")
+
+        native.truncate(0, self.path("f"))
+        native.truncate(4096, self.path("g"))
+
+        self.assertEqual(0, os.stat(self.path("f")).st_size)
+        self.assertEqual(4096, os.stat(self.path("g")).st_size)
+
+    def test_touch(self):
+        native.touch(self.path("f"))
+
+        self.assertTrue(os.path.isfile(self.path("f")))
+
+    def test_fallocate(self):
+        native.fallocate(8192, self.path("f"))
+
+        self.assertEqual(8192, os.stat(self.path("f")).st_size)
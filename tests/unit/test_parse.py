@@ -1,3 +1,4 @@
+# pylint: disable=C0302
 import copy
 import unittest
 
@@ -10,6 +11,7 @@ from comedian.specifications import (
     Filesystem,
     Link,
     LoopDevice,
+    LvmCache,
     LvmLogicalVolume,
     LvmPhysicalVolume,
     LvmVolumeGroup,
@@ -101,6 +103,8 @@ SPEC = {
     "physical_devices": [
         {
             "name": "sda",
+            "dd_bs": "4M",
+            "direct_io": True,
             "partition_table": {
                 "type": "gpt",
                 "glue": "p",
@@ -121,6 +125,7 @@ SPEC = {
                             "keyfile": "fsroot:mount:keyfile",
                             "keysize": "2048",
                             "password": "hunter2",
+                            "wipe_strategy": "discard",
                             "filesystem": _FSROOT_SPEC,
                         },
                     },
@@ -203,10 +208,7 @@ class ParseRootTest(ParseTestBase):
         self.assertSetEqual(context.exception.keys, {"physical_devices"})
 
     def test_complete(self):
-        expected = [
-            Root(),
-            PhysicalDevice("sda"),
-            PartitionTable(name="sda:pt", device="sda", type="gpt", glue="p"),
+        partitions = [
             Partition(
                 name="sda:pt:1",
                 partition_table="sda:pt",
@@ -231,6 +233,18 @@ class ParseRootTest(ParseTestBase):
                 unit=None,
                 flags=[],
             ),
+        ]
+        expected = [
+            Root(),
+            PhysicalDevice("sda", dd_bs="4M", direct_io=True),
+            PartitionTable(
+                name="sda:pt",
+                device="sda",
+                type="gpt",
+                glue="p",
+                partitions=partitions,
+            ),
+            *partitions,
             CryptVolume(
                 name="cryptroot",
                 device="sda:pt:2",
@@ -240,6 +254,7 @@ class ParseRootTest(ParseTestBase):
                 keysize="2048",
                 password="hunter2",
                 options=[],
+                wipe_strategy="discard",
             ),
             Filesystem(
                 name="fsroot",
@@ -493,6 +508,20 @@ class ParseCryptVolumeTest(ParseTestBase):
             {"keyfile", "keysize"},
         )
 
+    def test_exclusive_keys_3(self):
+        spec = self.spec["physical_devices"][0]["partition_table"]
+        spec = spec["partitions"][1]["crypt_volume"]
+        spec["cipher"] = "auto"
+        spec["cipher_keysize"] = 512
+
+        with self.assertRaises(FoundIncompatibleKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "CryptVolume")
+        self.assertSetEqual(
+            context.exception.keys,
+            {"cipher", "cipher_keysize"},
+        )
+
 
 class ParseFilesystemTest(ParseTestBase):
     def test_illegal_key_1(self):
@@ -619,6 +648,42 @@ class ParseFileTest(ParseTestBase):
             {"loop_device", "crypt_volume", "swap_volume"},
         )
 
+    def test_allocation(self):
+        spec = self.spec["physical_devices"][0]["partition_table"]
+        spec = spec["partitions"][1]["crypt_volume"]["filesystem"]
+        spec = spec["mount"]["files"][1]
+        spec["allocation"] = "zero"
+
+        file = next(
+            specification
+            for specification in parse(self.spec)
+            if isinstance(specification, File)
+            and specification.relative_path == "loopfile"
+        )
+        self.assertEqual("zero", file.allocation)
+
+    def test_allocation_default(self):
+        spec = self.spec["physical_devices"][0]["partition_table"]
+        spec = spec["partitions"][1]["crypt_volume"]["filesystem"]
+        spec = spec["mount"]["files"][2]
+        spec["size"] = "10"
+
+        # The default is left to the File, whether or not it backs a device.
+        for file in parse(self.spec):
+            if isinstance(file, File):
+                self.assertIsNone(file.allocation)
+
+    def test_allocation_missing_size(self):
+        spec = self.spec["physical_devices"][0]["partition_table"]
+        spec = spec["partitions"][1]["crypt_volume"]["filesystem"]
+        spec = spec["mount"]["files"][2]
+        spec["allocation"] = "sparse"
+
+        with self.assertRaises(MissingRequiredKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "File")
+        self.assertSetEqual(context.exception.keys, {"size"})
+
 
 class ParseLinkTest(ParseTestBase):
     def test_illegal_key_1(self):
@@ -694,6 +759,21 @@ class ParseLoopDeviceTest(ParseTestBase):
         self.assertEqual(context.exception.name, "LoopDevice")
         self.assertSetEqual(context.exception.keys, {"name"})
 
+    def test_direct_io(self):
+        spec = self.spec["physical_devices"][0]["partition_table"]
+        spec = spec["partitions"][1]["crypt_volume"]["filesystem"]
+        spec = spec["mount"]["files"][1]["loop_device"]
+        spec["direct_io"] = True
+        spec["sector_size"] = 4096
+
+        loop_device = next(
+            specification
+            for specification in parse(self.spec)
+            if isinstance(specification, LoopDevice)
+        )
+        self.assertTrue(loop_device.direct_io)
+        self.assertEqual(4096, loop_device.sector_size)
+
 
 class ParseLvmPhysicalVolumeTest(ParseTestBase):
     def test_illegal_key_1(self):
@@ -813,6 +893,99 @@ class ParseLvmVolumeGroupTest(ParseTestBase):
         )
 
 
+class ParseLvmCacheTest(ParseTestBase):
+    def _lvm_cache_spec(self):
+        return {
+            "name": "lvmcache",
+            "lvm_logical_volume": "lvmlv",
+            "lvm_physical_volume": "lvmpv",
+            "size": "10G",
+            "cachemode": "writeback",
+            "policy": "smq",
+            "chunk_size": "256K",
+            "filesystem": {
+                "name": "fscache",
+                "type": "xfs",
+            },
+        }
+
+    def test_complete(self):
+        spec = self.spec["lvm_volume_groups"][0]
+        spec["lvm_caches"] = [self._lvm_cache_spec()]
+
+        specifications = list(parse(self.spec))
+        self.assertIn(
+            LvmCache(
+                name="lvmcache",
+                type=None,
+                size="10G",
+                extents=None,
+                cachemode="writeback",
+                policy="smq",
+                chunk_size="256K",
+                lvm_volume_group="lvmvg",
+                lvm_logical_volume="lvmlv",
+                lvm_physical_volume="lvmpv",
+            ),
+            specifications,
+        )
+        self.assertIn(
+            Filesystem(
+                name="fscache",
+                type="xfs",
+                device="lvmcache",
+                options=[],
+            ),
+            specifications,
+        )
+
+    def test_illegal_key_1(self):
+        # These keys are restricted before parsing the rest of the lvm_cache
+        # spec.
+        spec = self._lvm_cache_spec()
+        spec["lvm_volume_group"] = "lvm_volume_group"
+        self.spec["lvm_volume_groups"][0]["lvm_caches"] = [spec]
+
+        with self.assertRaises(FoundIllegalKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "LvmCache")
+        self.assertSetEqual(context.exception.keys, {"lvm_volume_group"})
+
+    def test_illegal_key_2(self):
+        spec = self._lvm_cache_spec()
+        spec["foo"] = "bar"
+        self.spec["lvm_volume_groups"][0]["lvm_caches"] = [spec]
+
+        with self.assertRaises(FoundIllegalKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "LvmCache")
+        self.assertSetEqual(context.exception.keys, {"foo"})
+
+    def test_missing_key(self):
+        spec = self._lvm_cache_spec()
+        del spec["lvm_logical_volume"]
+        del spec["lvm_physical_volume"]
+        self.spec["lvm_volume_groups"][0]["lvm_caches"] = [spec]
+
+        with self.assertRaises(MissingRequiredKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "LvmCache")
+        self.assertSetEqual(
+            context.exception.keys,
+            {"lvm_logical_volume", "lvm_physical_volume"},
+        )
+
+    def test_exclusive_keys(self):
+        spec = self._lvm_cache_spec()
+        spec["extents"] = "100%PVS"
+        self.spec["lvm_volume_groups"][0]["lvm_caches"] = [spec]
+
+        with self.assertRaises(FoundIncompatibleKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "LvmCache")
+        self.assertSetEqual(context.exception.keys, {"size", "extents"})
+
+
 class ParsePartitionTest(ParseTestBase):
     def test_illegal_key_1(self):
         # These keys are restricted before parsing the rest of the
@@ -936,6 +1109,52 @@ class ParseRaidVolumeTest(ParseTestBase):
             context.exception.keys, {"name", "devices", "level", "metadata"}
         )
 
+    def test_resync(self):
+        spec = self.spec["raid_volumes"][0]
+        spec["assume_clean"] = True
+        spec["bitmap"] = "internal"
+        spec["bitmap_chunk"] = "64M"
+        spec["sync_speed_min"] = 1000
+        spec["sync_speed_max"] = 50000
+
+        raid_volume = next(
+            specification
+            for specification in parse(self.spec)
+            if isinstance(specification, RaidVolume)
+        )
+        self.assertTrue(raid_volume.assume_clean)
+        self.assertEqual("internal", raid_volume.bitmap)
+        self.assertEqual("64M", raid_volume.bitmap_chunk)
+        self.assertEqual(1000, raid_volume.sync_speed_min)
+        self.assertEqual(50000, raid_volume.sync_speed_max)
+
+    def test_geometry(self):
+        spec = self.spec["raid_volumes"][0]
+        spec["chunk"] = "64K"
+        spec["layout"] = "n2"
+        spec["consistency_policy"] = "journal"
+        spec["write_journal"] = "sdd"
+
+        raid_volume = next(
+            specification
+            for specification in parse(self.spec)
+            if isinstance(specification, RaidVolume)
+        )
+        self.assertEqual("64K", raid_volume.chunk)
+        self.assertEqual("n2", raid_volume.layout)
+        self.assertEqual("journal", raid_volume.consistency_policy)
+        self.assertEqual("sdd", raid_volume.write_journal)
+        self.assertListEqual(["sdc", "sdd"], raid_volume.dependencies)
+
+    def test_incompatible_key(self):
+        spec = self.spec["raid_volumes"][0]
+        spec["bitmap_chunk"] = "64M"
+
+        with self.assertRaises(FoundIncompatibleKeysError) as context:
+            list(parse(self.spec))
+        self.assertEqual(context.exception.name, "RaidVolume")
+        self.assertSetEqual(context.exception.keys, {"bitmap", "bitmap_chunk"})
+
 
 class ParseSwapVolumeTest(ParseTestBase):
     def test_illegal_key_1(self):
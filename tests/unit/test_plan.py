@@ -0,0 +1,92 @@
+import unittest
+from typing import Iterator, List
+
+from context import comedian  # pylint: disable=W0611
+
+from comedian.command import Command, CommandContext, CommandGenerator
+from comedian.configuration import Configuration
+from comedian.graph import Graph
+from comedian.plan import Plan, render_dot, render_text
+from comedian.specification import Specification
+
+
+class TestCommandGenerator(CommandGenerator):
+    def __init__(self, count: int):
+        self.count = count
+
+    def __call__(self, context: CommandContext) -> Iterator[Command]:
+        for index in range(self.count):
+            yield Command([str(index)])
+
+
+class TestSpecification(Specification):
+    def __init__(self, name: str, dependencies: List[str], commands: int):
+        super().__init__(
+            name,
+            dependencies,
+            apply=TestCommandGenerator(commands),
+            post_apply=TestCommandGenerator(1),
+        )
+
+
+class PlanTest(unittest.TestCase):
+    def setUp(self):
+        configuration = Configuration(
+            shell="shell",
+            dd_bs="dd_bs",
+            random_device="random_device",
+            media_dir="media_dir",
+            tmp_dir="tmp_dir",
+        )
+        graph = Graph(
+            [
+                TestSpecification("a", [], 0),
+                TestSpecification("b", [], 0),
+                TestSpecification("vg", ["a", "b"], 1),
+                TestSpecification("lv1", ["vg"], 1),
+                TestSpecification("lv2", ["vg"], 3),
+                TestSpecification("fs", ["lv2"], 1),
+                TestSpecification("c", ["a"], 4),
+            ]
+        )
+        self.plan = Plan(CommandContext(configuration, graph))
+
+    def test_nodes(self):
+        self.assertListEqual(
+            ["a", "b", "c", "vg", "lv1", "lv2", "fs"],
+            list(self.plan.nodes.keys()),
+        )
+        self.assertEqual(0, self.plan.nodes["a"].depth)
+        self.assertEqual(1, self.plan.nodes["a"].commands)
+        self.assertEqual(1, self.plan.nodes["vg"].depth)
+        self.assertEqual(2, self.plan.nodes["vg"].commands)
+        self.assertEqual(3, self.plan.nodes["fs"].depth)
+        self.assertEqual(4, self.plan.nodes["lv2"].commands)
+
+    def test_levels(self):
+        self.assertListEqual(
+            [["a", "b"], ["c", "vg"], ["lv1", "lv2"], ["fs"]],
+            [[node.name for node in level] for level in self.plan.levels()],
+        )
+
+    def test_critical_path(self):
+        self.assertListEqual(
+            ["a", "vg", "lv2", "fs"],
+            [node.name for node in self.plan.critical_path()],
+        )
+
+    def test_render_text(self):
+        text = render_text(self.plan)
+        self.assertIn("depth 1: parallelism 2, 7 commands", text)
+        self.assertIn("critical path: 4 nodes, 9 commands", text)
+
+    def test_render_dot(self):
+        dot = render_dot(self.plan)
+        self.assertTrue(dot.startswith("digraph plan {"))
+        self.assertIn('"vg" -> "lv2" [color="red", penwidth=2];', dot)
+        self.assertIn('"vg" -> "lv1";', dot)
+        self.assertIn('"b" -> "vg";', dot)
+        self.assertIn(
+            '"lv2" [label="lv2\\nTestSpecification\\n4 commands", color="red", penwidth=2];',
+            dot,
+        )
@@ -1,10 +1,11 @@
 import unittest
 from unittest.mock import MagicMock, patch
-from typing import Any, Iterable, Iterator, List
+from typing import Any, List
 
 from context import comedian  # pylint: disable=W0611
 
 from comedian import run
+from comedian.action import BatchingCommandHandler
 from comedian.command import Command
 from comedian.configuration import Configuration
 from comedian.graph import Graph
@@ -16,20 +17,6 @@ class AnyType:
         return True
 
 
-class AnyIter:
-    def __init__(self, iterable: Iterable[Any]):
-        self.iterator = iter(iterable)
-
-    def __iter__(self) -> Iterator[Any]:
-        return self
-
-    def __next__(self) -> Any:
-        return next(self.iterator)
-
-    def __eq__(self, other: Any) -> bool:
-        return list(self) == list(other)
-
-
 class TestSpecification(Specification):
     def __init__(self, name: str, commands: List[Command]):
         super().__init__(name, [])
@@ -61,7 +48,33 @@ class RunTest(unittest.TestCase):
 
         run(config, graph, "action", "mode")
 
-        action.assert_called_once_with(mode, AnyIter([spec1, spec2]))
+        action.assert_called_once_with(AnyType(), graph)
+        handler = action.call_args[0][0]
+        self.assertIsInstance(handler, BatchingCommandHandler)
+        self.assertIs(mode, handler.handler)
+        self.assertListEqual([spec1, spec2], list(action.call_args[0][1]))
 
         make_action.assert_called_once_with("action", AnyType())
         make_mode.assert_called_once_with("mode")
+
+    @patch("comedian.probe_state")
+    @patch("comedian.make_action")
+    @patch("comedian.make_mode")
+    def test_run_converge(self, make_mode, make_action, probe_state):
+        config = Configuration(
+            shell="",
+            dd_bs="",
+            random_device="",
+            media_dir="",
+            tmp_dir="",
+        )
+        graph = Graph([])
+
+        run(config, graph, "up", "mode", converge=True)
+        self.assertIsNone(make_action.call_args[0][1].state)
+        probe_state.assert_not_called()
+
+        run(config, graph, "apply", "mode", converge=True)
+        self.assertIs(probe_state.return_value, make_action.call_args[0][1].state)
+        probe_state.assert_called_once_with()
+        make_mode.assert_called_with("mode")
@@ -0,0 +1,510 @@
+import copy
+import os
+import tempfile
+import unittest
+from typing import Any, Dict
+from unittest.mock import MagicMock
+
+from context import comedian  # pylint: disable=W0611
+
+from comedian.action import ApplyAction, DriftError, StatusAction
+from comedian.command import CommandContext
+from comedian.configuration import Configuration
+from comedian.event import EventLog
+from comedian.graph import Graph
+from comedian.parse import parse
+from comedian.state import STATE_COMMANDS, parse_state, read_state
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "state")
+
+# A fake root directory holding /proc, /sys and /dev of the same machine.
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "root")
+
+# The fixtures were recorded on a machine with two disks, each holding a swap
+# partition and a member of a mirrored array. The array holds an open LUKS
+# volume, which holds a volume group with two active logical volumes. Only the
+# "root" logical volume has a filesystem, which is mounted at /mnt. Only the
+# swap partition on the first disk has been formatted and is in use.
+SPECIFICATION: Dict[str, Any] = {
+    "physical_devices": [
+        {
+            "name": disk,
+            "partition_table": {
+                "type": "gpt",
+                "partitions": [
+                    {
+                        "type": "primary",
+                        "start": "1MB",
+                        "end": "1024MB",
+                        "label": f"swap_{suffix}",
+                        "swap_volume": {"name": f"swap_{suffix}"},
+                    },
+                    {
+                        "type": "primary",
+                        "start": "1024MB",
+                        "end": "-1",
+                        "label": f"root_{suffix}",
+                    },
+                ],
+            },
+        }
+        for disk, suffix in [("sda", "a"), ("sdb", "b")]
+    ],
+    "raid_volumes": [
+        {
+            "name": "raidroot",
+            "devices": ["sda:pt:2", "sdb:pt:2"],
+            "level": "1",
+            "metadata": "1.2",
+            "crypt_volume": {
+                "name": "cryptroot",
+                "type": "luks2",
+                "keyfile": "fsroot:mount:root.keyfile",
+                "keysize": "2048",
+                "lvm_physical_volume": {"name": "pv"},
+            },
+        }
+    ],
+    "lvm_volume_groups": [
+        {
+            "name": "vg0",
+            "lvm_physical_volumes": ["pv"],
+            "lvm_logical_volumes": [
+                {
+                    "name": "root",
+                    "size": "50%",
+                    "filesystem": {
+                        "name": "fsroot",
+                        "type": "ext4",
+                        "mount": {
+                            "mountpoint": "//",
+                            "directories": [{"relative_path": "home"}],
+                            "files": [{"relative_path": "root.keyfile"}],
+                        },
+                    },
+                },
+                {
+                    "name": "home",
+                    "size": "50%",
+                    "filesystem": {
+                        "name": "fshome",
+                        "type": "ext4",
+                        "mount": {"mountpoint": "fsroot:mount:home"},
+                    },
+                },
+            ],
+        }
+    ],
+}
+
+
+def load_state():
+    outputs = {}
+    for name in list(STATE_COMMANDS) + ["mdstat"]:
+        for extension in ["json", "txt"]:
+            path = os.path.join(FIXTURES_DIR, f"{name}.{extension}")
+            if os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    outputs[name] = f.read()
+    return parse_state(outputs)
+
+
+# A filesystem on a loop device, backed by a file on the root filesystem.
+LOOP_SPECIFICATION = copy.deepcopy(SPECIFICATION)
+LOOP_MOUNT = LOOP_SPECIFICATION["lvm_volume_groups"][0]["lvm_logical_volumes"][0][
+    "filesystem"
+]["mount"]
+LOOP_MOUNT["directories"].append({"relative_path": "loop"})
+LOOP_MOUNT["files"].append(
+    {
+        "relative_path": "disk.img",
+        "size": "1G",
+        "loop_device": {
+            "name": "loop",
+            "filesystem": {
+                "name": "fsloop",
+                "type": "ext4",
+                "mount": {"mountpoint": "fsroot:mount:loop"},
+            },
+        },
+    }
+)
+
+
+def make_context(state, specification=None):
+    configuration = Configuration(
+        shell="shell",
+        dd_bs="dd_bs",
+        random_device="random_device",
+        media_dir="/mnt",
+        tmp_dir="/tmp",
+    )
+    sink = RecordingEventSink()
+    context = CommandContext(
+        configuration,
+        Graph(parse(specification or SPECIFICATION)),
+        EventLog([sink]),
+        state=state,
+    )
+    return context, sink
+
+
+class RecordingEventSink:
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(str(event))
+
+
+class StateTest(unittest.TestCase):
+    def setUp(self):
+        self.state = load_state()
+
+    def test_block_device(self):
+        self.assertEqual("sda2", self.state.block_device("/dev/sda2")["kname"])
+        self.assertEqual("dm-1", self.state.block_device("/dev/dm-1")["kname"])
+        self.assertEqual("dm-2", self.state.block_device("/dev/vg0/home")["kname"])
+        self.assertEqual("md127", self.state.block_device("/dev/md/raidroot")["kname"])
+        self.assertIsNone(self.state.block_device("/dev/sdc"))
+
+    def test_identify(self):
+        self.assertDictEqual(
+            {
+                "type": "ext4",
+                "uuid": "1b2c3d4e-5f6a-7b8c-9d0e-1f2a3b4c5d6e",
+                "block_size": "4096",
+            },
+            self.state.identify("/dev/vg0/root"),
+        )
+        self.assertEqual("gpt", self.state.identify("/dev/sda")["pttype"])
+        self.assertEqual("crypto_LUKS", self.state.identify("/dev/md/raidroot")["type"])
+        self.assertDictEqual({}, self.state.identify("/dev/vg0/home"))
+
+    def test_mount(self):
+        self.assertEqual("/dev/mapper/vg0-root", self.state.mount("/mnt/")["source"])
+        self.assertEqual("proc", self.state.mount("/proc")["fstype"])
+        self.assertIsNone(self.state.mount("/mnt/home"))
+
+    def test_md_array(self):
+        self.assertDictEqual(
+            {"state": "active", "devices": ["sdb2", "sda2"]},
+            self.state.md_array(["/dev/sda2", "/dev/sdb2"]),
+        )
+        self.assertIsNone(self.state.md_array(["/dev/sda2"]))
+        self.assertIsNone(self.state.md_array(["/dev/sda2", "/dev/sdc2"]))
+
+    def test_device_mapper(self):
+        self.assertSetEqual(
+            {"cryptroot", "vg0-home", "vg0-root"}, self.state.dm_devices
+        )
+
+    def test_lvm(self):
+        self.assertEqual(
+            "vg0", self.state.physical_volume("/dev/mapper/cryptroot")["vg_name"]
+        )
+        self.assertEqual("vg0", self.state.physical_volume("/dev/dm-0")["vg_name"])
+        self.assertIsNone(self.state.physical_volume("/dev/sda2"))
+        self.assertSetEqual({"vg0"}, set(self.state.volume_groups))
+        self.assertEqual(
+            "-wi-a-----", self.state.logical_volume("vg0", "home")["lv_attr"]
+        )
+        self.assertIsNone(self.state.logical_volume("vg0", "swap"))
+
+    def test_loop_devices(self):
+        # Files deleted since they were attached are left out.
+        self.assertDictEqual({"/mnt/disk.img": "/dev/loop0"}, self.state.loop_devices)
+
+    def test_empty(self):
+        state = parse_state({})
+
+        self.assertIsNone(state.block_device("/dev/sda"))
+        self.assertDictEqual({}, state.identify("/dev/sda"))
+        self.assertIsNone(state.mount("/"))
+        self.assertIsNone(state.md_array(["/dev/sda"]))
+        self.assertSetEqual(set(), state.dm_devices)
+        self.assertIsNone(state.physical_volume("/dev/sda"))
+        self.assertDictEqual({}, state.loop_devices)
+
+
+class ReadStateTest(unittest.TestCase):
+    def setUp(self):
+        self.state = read_state(ROOT_DIR)
+
+    def test_block_device(self):
+        self.assertEqual("sda2", self.state.block_device("/dev/sda2")["kname"])
+        self.assertEqual("dm-1", self.state.block_device("/dev/vg0/root")["kname"])
+        self.assertEqual(
+            "dm-0", self.state.block_device("/dev/mapper/cryptroot")["kname"]
+        )
+        self.assertIsNone(self.state.block_device("/dev/sdc"))
+
+    def test_mount(self):
+        self.assertEqual("/dev/mapper/vg0-root", self.state.mount("/mnt")["source"])
+        self.assertEqual("tmpfs", self.state.mount("/mnt/media files")["fstype"])
+        self.assertTrue(self.state.mounted("/dev/vg0/root"))
+        self.assertFalse(self.state.mounted("/dev/vg0/home"))
+
+    def test_md_array(self):
+        self.assertEqual(
+            "active", self.state.md_array(["/dev/sda2", "/dev/sdb2"])["state"]
+        )
+
+    def test_device_mapper(self):
+        self.assertSetEqual(
+            {"cryptroot", "vg0-home", "vg0-root"}, self.state.dm_devices
+        )
+        self.assertSetEqual({"vg0"}, set(self.state.volume_groups))
+        self.assertEqual(
+            "active", self.state.logical_volume("vg0", "home")["lv_active"]
+        )
+        self.assertIsNone(self.state.logical_volume("cryptroot", ""))
+
+    def test_swaps(self):
+        self.assertTrue(self.state.swapping("/dev/sda1"))
+        self.assertFalse(self.state.swapping("/dev/sdb1"))
+
+    def test_loop_devices(self):
+        self.assertDictEqual({"/mnt/disk.img": "/dev/loop0"}, self.state.loop_devices)
+
+    def test_empty(self):
+        state = read_state(os.path.join(ROOT_DIR, "nonexistent"))
+
+        self.assertIsNone(state.block_device("/dev/sda"))
+        self.assertIsNone(state.mount("/"))
+        self.assertSetEqual(set(), state.dm_devices)
+        self.assertSetEqual(set(), state.swaps)
+
+
+class StatusTest(unittest.TestCase):
+    def test_status(self):
+        context, sink = make_context(None)
+        handler = MagicMock()
+
+        with self.assertRaises(DriftError) as raised:
+            StatusAction(context, root=ROOT_DIR)(handler, context.graph)
+
+        self.assertListEqual(["swap_b", "fshome:mount"], raised.exception.names)
+        self.assertListEqual(
+            [
+                "status // (Root): unknown",
+                "status sda (PhysicalDevice): present",
+                "status sdb (PhysicalDevice): present",
+                "status sda:pt (PartitionTable): present",
+                "status sdb:pt (PartitionTable): present",
+                "status sda:pt:1 (Partition): present",
+                "status sda:pt:2 (Partition): present",
+                "status sdb:pt:1 (Partition): present",
+                "status sdb:pt:2 (Partition): present",
+                "status swap_a (SwapVolume): active",
+                "status swap_b (SwapVolume): missing",
+                "status raidroot (RaidVolume): active",
+                "status cryptroot (CryptVolume): active",
+                "status pv (LvmPhysicalVolume): unknown",
+                "status vg0 (LvmVolumeGroup): active",
+                "status root (LvmLogicalVolume): active",
+                "status home (LvmLogicalVolume): active",
+                "status fsroot (Filesystem): mounted",
+                "status fshome (Filesystem): present",
+                "status fsroot:mount (Mount): mounted",
+                "status fsroot:mount:home (Directory): unknown",
+                "status fsroot:mount:root.keyfile (File): unknown",
+                "status fshome:mount (Mount): missing",
+            ],
+            sink.events,
+        )
+        # No commands are generated.
+        self.assertEqual(0, len(handler.mock_calls))
+
+    def test_no_drift(self):
+        context, sink = make_context(None)
+        context.graph = Graph(
+            node
+            for node in context.graph
+            if node.name not in ["swap_b", "fshome:mount"]
+        )
+
+        StatusAction(context, root=ROOT_DIR)(MagicMock(), context.graph)
+
+        self.assertNotIn("missing", " ".join(sink.events))
+
+
+class ConvergeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(self.root.cleanup)
+        self.context, self.sink = None, None
+
+    def apply(self, state, specification=None):
+        if state is not None:
+            # Files are looked up beneath the root, which holds none of them.
+            state.root = self.root.name
+        self.context, self.sink = make_context(state, specification)
+        handler = MagicMock()
+
+        ApplyAction(self.context)(handler, self.context.graph)
+
+        return [" ".join(args[1].cmd) for args, _ in handler.on_command.call_args_list]
+
+    def test_converge(self):
+        commands = self.apply(load_state())
+
+        self.assertListEqual(
+            [
+                "converged sda:pt (PartitionTable)",
+                "converged sdb:pt (PartitionTable)",
+                "converged swap_a (SwapVolume)",
+                "converged raidroot (RaidVolume)",
+                "converged cryptroot (CryptVolume)",
+                "converged pv (LvmPhysicalVolume)",
+                "converged vg0 (LvmVolumeGroup)",
+                "converged root (LvmLogicalVolume)",
+                "converged home (LvmLogicalVolume)",
+                "converged fsroot (Filesystem)",
+                "converged fsroot:mount (Mount)",
+            ],
+            [event for event in self.sink.events if event.startswith("converged")],
+        )
+        # Only the swap space on the second disk and the filesystem on the
+        # "home" logical volume are missing.
+        self.assertListEqual(
+            ["mkswap /dev/sdb1", "swapon /dev/sdb1", "mkfs --type ext4 /dev/vg0/home"],
+            [
+                command
+                for command in commands
+                if command.startswith(("mkswap", "swapon", "mkfs"))
+            ],
+        )
+        self.assertTrue(any(command.startswith("mount") for command in commands))
+        for command in commands:
+            self.assertFalse(
+                command.startswith(
+                    (
+                        "parted",
+                        "mdadm",
+                        "cryptsetup",
+                        "pvcreate",
+                        "vgcreate",
+                        "lvcreate",
+                        "cp",
+                    )
+                ),
+                command,
+            )
+        # Entries of every node are still written to fstab and crypttab.
+        self.assertEqual(4, len(self.context.fstab))
+        self.assertEqual(1, len(self.context.crypttab))
+
+    def test_converge_dependencies(self):
+        state = load_state()
+        # Once the superblocks of its members are overwritten, nothing built
+        # upon the array exists either.
+        for path in ["/dev/sda2", "/dev/sdb2"]:
+            state.identifiers[path] = {"type": "xfs"}
+
+        commands = self.apply(state)
+
+        self.assertListEqual(
+            [
+                "converged sda:pt (PartitionTable)",
+                "converged sdb:pt (PartitionTable)",
+                "converged swap_a (SwapVolume)",
+            ],
+            [event for event in self.sink.events if event.startswith("converged")],
+        )
+        self.assertTrue(any(command.startswith("mdadm") for command in commands))
+        self.assertTrue(any(command.startswith("lvcreate") for command in commands))
+
+    def test_converge_inactive(self):
+        state = load_state()
+        # After a reboot the array is stopped, so nothing built upon it can be
+        # observed, but it is all still there to be brought up.
+        state.md_arrays.clear()
+
+        commands = self.apply(state)
+
+        self.assertIn(
+            "converged raidroot (RaidVolume): inactive",
+            self.sink.events,
+        )
+        self.assertIn("converged fshome (Filesystem)", self.sink.events)
+        self.assertIn("converged fshome:mount (Mount): inactive", self.sink.events)
+        self.assertListEqual(
+            [
+                "mdadm --assemble /dev/md/raidroot /dev/sda2 /dev/sdb2",
+                "cryptsetup --batch-mode --key-file=/tmp/root.keyfile open "
+                "/dev/md/raidroot cryptroot",
+                "vgchange --activate y vg0",
+                "mount --types ext4 /dev/vg0/root /mnt/",
+                "mount --types ext4 /dev/vg0/home /mnt/home",
+            ],
+            [
+                command
+                for command in commands
+                if command.startswith(("mdadm", "cryptsetup", "vgchange", "mount"))
+            ],
+        )
+        for command in commands:
+            self.assertFalse(
+                command.startswith(("parted", "pvcreate", "lvcreate", "mkfs")),
+                command,
+            )
+
+    def apply_loop(self, state):
+        # The backing file is in place on the root filesystem.
+        os.makedirs(os.path.join(self.root.name, "mnt", "loop"))
+        with open(os.path.join(self.root.name, "mnt", "disk.img"), "wb"):
+            pass
+        commands = self.apply(state, LOOP_SPECIFICATION)
+        for command in commands:
+            self.assertFalse(command.startswith("fallocate"), command)
+            self.assertFalse(command.startswith("mkfs --type ext4 $loop"), command)
+        return [
+            command
+            for command in commands
+            if command.startswith(
+                ("losetup", "shell -c 'losetup", 'mount --types ext4 "$loop')
+            )
+        ]
+
+    def test_converge_loop(self):
+        state = load_state()
+        state.identifiers["/dev/loop0"] = {"type": "ext4"}
+        state.mounts["/mnt/loop"] = {"target": "/mnt/loop", "fstype": "ext4"}
+
+        commands = self.apply_loop(state)
+
+        self.assertIn("converged loop (LoopDevice)", self.sink.events)
+        self.assertIn("converged fsloop (Filesystem)", self.sink.events)
+        self.assertIn("converged fsloop:mount (Mount)", self.sink.events)
+        # The attached loop device is found again rather than attached twice.
+        self.assertListEqual(
+            ["shell -c 'losetup --associated /mnt/disk.img | sed \"s#:.*##\"'"],
+            commands,
+        )
+
+    def test_converge_loop_detached(self):
+        state = load_state()
+        # After a reboot the backing file is no longer attached.
+        state.loop_devices.clear()
+
+        commands = self.apply_loop(state)
+
+        self.assertIn("converged loop (LoopDevice): inactive", self.sink.events)
+        self.assertIn("converged fsloop (Filesystem)", self.sink.events)
+        self.assertIn("converged fsloop:mount (Mount): inactive", self.sink.events)
+        self.assertListEqual(
+            [
+                "losetup --find --show /mnt/disk.img",
+                'mount --types ext4 "$loop_device_loop" /mnt/loop',
+            ],
+            commands,
+        )
+
+    def test_no_state(self):
+        commands = self.apply(None)
+
+        self.assertListEqual(
+            [], [event for event in self.sink.events if event.startswith("converged")]
+        )
+        self.assertTrue(any(command.startswith("parted") for command in commands))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from context import comedian  # pylint: disable=W0611
+
+from comedian import sysfs
+
+
+class SysfsTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(tmp_dir.cleanup)
+        self.sys_dir = tmp_dir.name
+
+        # Lay out a disk with a partition, linked from class/block as the
+        # kernel does.
+        self.write("devices/sda/queue/discard_max_bytes", "2147450880")
+        self.write("devices/sda/queue/max_secure_erase_sectors", "0")
+        self.write("devices/sda/queue/rotational", "0")
+        self.write("devices/sda/alignment_offset", "0")
+        self.write("devices/sda/sda1/alignment_offset", "3584")
+        self.write("devices/sdb/queue/discard_max_bytes", "0")
+        os.makedirs(self.path("class/block"))
+        for name, target in [("sda", "sda"), ("sda1", "sda/sda1"), ("sdb", "sdb")]:
+            os.symlink(self.path("devices", target), self.path("class/block", name))
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.sys_dir, *parts)
+
+    def write(self, path: str, content: str):
+        os.makedirs(os.path.dirname(self.path(path)), exist_ok=True)
+        with open(self.path(path), "w", encoding="utf-8") as f:
+            f.write(f"{content}\n")
+
+    def test_block_directory(self):
+        self.assertEqual(
+            os.path.realpath(self.path("devices/sda/sda1")),
+            sysfs.block_directory(self.sys_dir, "/dev/sda1"),
+        )
+        self.assertIsNone(sysfs.block_directory(self.sys_dir, "/dev/sdc"))
+
+    def test_device_attribute(self):
+        self.assertEqual(
+            "0", sysfs.device_attribute(self.sys_dir, "/dev/sda", "alignment_offset")
+        )
+        self.assertEqual(
+            "3584",
+            sysfs.device_attribute(self.sys_dir, "/dev/sda1", "alignment_offset"),
+        )
+        self.assertIsNone(
+            sysfs.device_attribute(self.sys_dir, "/dev/sdb", "alignment_offset")
+        )
+        self.assertIsNone(
+            sysfs.device_attribute(self.sys_dir, "/dev/sdc", "alignment_offset")
+        )
+
+    def test_queue_attribute(self):
+        self.assertEqual(
+            "0", sysfs.queue_attribute(self.sys_dir, "/dev/sda", "rotational")
+        )
+        self.assertEqual(
+            "0", sysfs.queue_attribute(self.sys_dir, "/dev/sda1", "rotational")
+        )
+        self.assertIsNone(sysfs.queue_attribute(self.sys_dir, "/dev/sdb", "rotational"))
+        self.assertIsNone(sysfs.queue_attribute(self.sys_dir, "/dev/sdc", "rotational"))
+
+    def test_write_attribute(self):
+        sysfs.write_attribute(self.sys_dir, "/dev/sda1", "alignment_offset", "0")
+
+        with open(
+            self.path("devices/sda/sda1/alignment_offset"), "r", encoding="utf-8"
+        ) as f:
+            self.assertEqual("0\n", f.read())
+        with self.assertRaises(FileNotFoundError):
+            sysfs.write_attribute(self.sys_dir, "/dev/sdc", "alignment_offset", "0")
+
+    def test_discard_supported(self):
+        self.assertTrue(sysfs.discard_supported(self.sys_dir, "/dev/sda"))
+        self.assertTrue(sysfs.discard_supported(self.sys_dir, "/dev/sda1"))
+        self.assertFalse(sysfs.discard_supported(self.sys_dir, "/dev/sdb"))
+        self.assertFalse(sysfs.discard_supported(self.sys_dir, "/dev/sdc"))
+
+    def test_secure_erase_supported(self):
+        self.assertFalse(sysfs.secure_erase_supported(self.sys_dir, "/dev/sda1"))
+        self.write("devices/sda/queue/max_secure_erase_sectors", "65535")
+        self.assertTrue(sysfs.secure_erase_supported(self.sys_dir, "/dev/sda"))
+        self.assertTrue(sysfs.secure_erase_supported(self.sys_dir, "/dev/sda1"))
+        self.assertFalse(sysfs.secure_erase_supported(self.sys_dir, "/dev/sdb"))
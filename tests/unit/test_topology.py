@@ -0,0 +1,93 @@
+import unittest
+
+from context import comedian, sysfs_context  # pylint: disable=W0611
+
+from comedian.specifications import PhysicalDevice, RaidVolume
+from comedian.topology import Topology, node_topology, read_topology
+
+
+class TopologyTest(unittest.TestCase):
+    def test_granularity(self):
+        self.assertEqual(512, Topology().granularity)
+        self.assertEqual(4096, Topology(0, 4096, 0).granularity)
+        self.assertEqual(196608, Topology(0, 65536, 196608).granularity)
+
+    def test_align(self):
+        topology = Topology(0, 65536, 196608)
+        self.assertEqual(0, topology.align(0))
+        self.assertEqual(196608, topology.align(1))
+        self.assertEqual(1179648, topology.align(2**20))
+
+        # The first aligned sector of a drive that is offset by 7 sectors.
+        topology = Topology(3584, 4096, 0)
+        self.assertEqual(3584, topology.align(0))
+        self.assertEqual(32256, topology.align(32256))
+
+    def test_combine(self):
+        self.assertEqual(
+            Topology(0, 4096, 196608),
+            Topology(0, 4096, 0).combine(Topology(0, 512, 196608)),
+        )
+        self.assertEqual(
+            Topology(3584, 4096, 0),
+            Topology(3584, 4096, 0).combine(Topology(3584, 4096, 0)),
+        )
+        self.assertEqual(
+            Topology(0, 4096, 0),
+            Topology(3584, 4096, 0).combine(Topology(0, 512, 0)),
+        )
+
+
+class ReadTopologyTest(unittest.TestCase):
+    def setUp(self):
+        # An SSD, and a RAID controller with a 3x64K stripe.
+        self.context = sysfs_context(
+            self,
+            [
+                PhysicalDevice("sda"),
+                PhysicalDevice("sdb"),
+                PhysicalDevice("sdc"),
+                PhysicalDevice("sdd"),
+                RaidVolume("md0", ["sda", "sdb"], "raid1", "1.2"),
+                RaidVolume("md1", ["sda", "sdc"], "raid1", "1.2"),
+            ],
+            {
+                "sda": {"alignment_offset": 0, "minimum_io_size": 4096},
+                "sdb": {"minimum_io_size": 65536, "optimal_io_size": 196608},
+            },
+        )
+        self.sys_dir = self.context.config.sys_dir
+
+    def test_read_topology(self):
+        self.assertEqual(Topology(0, 4096, 0), read_topology(self.sys_dir, "/dev/sda"))
+        self.assertEqual(
+            Topology(0, 65536, 196608), read_topology(self.sys_dir, "/dev/sdb")
+        )
+        self.assertIsNone(read_topology(self.sys_dir, "/dev/sdc"))
+
+    def test_node_topology(self):
+        self.assertEqual(Topology(0, 4096, 0), node_topology(self.context, "sda"))
+        self.assertEqual(Topology(0, 65536, 196608), node_topology(self.context, "md0"))
+        self.assertEqual(Topology(0, 4096, 0), node_topology(self.context, "md1"))
+        self.assertIsNone(node_topology(self.context, "sdc"))
+
+    def test_raid_topology(self):
+        def topology(level, devices, **kwargs):
+            raid_volume = RaidVolume("md", devices, level, "1.2", **kwargs)
+            return raid_volume.topology(self.context)
+
+        self.assertEqual(
+            Topology(0, 65536, 131072), topology("0", ["sda", "sdc"], chunk="64")
+        )
+        self.assertEqual(
+            Topology(0, 2**20, 2 * 2**20),
+            topology("raid5", ["sda", "sdb", "sdc"], chunk="1M"),
+        )
+        # The chunk is aligned to the stripe of sdb.
+        self.assertEqual(
+            Topology(0, 1572864, 3145728),
+            topology("raid10", ["sda", "sdb", "sdc", "sdd"]),
+        )
+        self.assertIsNone(topology("raid10", ["sda", "sdb", "sdc"], layout="f2"))
+        self.assertIsNone(topology("raid6", ["sda"]))
+        self.assertIsNone(topology("raid1", ["sda", "sdb"]))
@@ -0,0 +1,173 @@
+import json
+import mmap
+import os
+import tempfile
+import unittest
+
+from context import comedian  # pylint: disable=W0611
+
+from comedian.wipe import WipeProgress, wipe
+
+
+class WipeProgressTest(unittest.TestCase):
+    def test_progress(self):
+        progress = WipeProgress(2 * 2**20, 8 * 2**20, 2.0)
+
+        self.assertEqual(2**20, progress.rate)
+        self.assertEqual(6.0, progress.eta)
+        self.assertEqual(
+            "2097152/8388608 bytes (25.0%), 1.0 MiB/s, ETA 6s", str(progress)
+        )
+
+    def test_unknown_eta(self):
+        progress = WipeProgress(0, 8, 0.0)
+
+        self.assertIsNone(progress.eta)
+        self.assertEqual("0/8 bytes (0.0%), 0.0 MiB/s, ETA unknown", str(progress))
+
+
+class WipeTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(tmp_dir.cleanup)
+        self.root = tmp_dir.name
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def read(self, name: str) -> bytes:
+        with open(self.path(name), "rb") as f:
+            return f.read()
+
+    def test_wipe_file(self):
+        # Several blocks per thread, with an unaligned tail.
+        size = 10 * mmap.PAGESIZE + 123
+        with open(self.path("target"), "wb") as f:
+            f.write(b"\xff" * size)
+        reports = []
+
+        wipe(
+            self.path("target"),
+            block_size=2 * mmap.PAGESIZE,
+            threads=3,
+            report=reports.append,
+        )
+
+        self.assertEqual(b"\0" * size, self.read("target"))
+        self.assertEqual(size, reports[-1].written)
+        self.assertEqual(size, reports[-1].size)
+
+    def test_wipe_from_source(self):
+        content = bytes(range(256)) * 64
+        with open(self.path("source"), "wb") as f:
+            f.write(content)
+
+        wipe(
+            self.path("target"),
+            size=len(content),
+            source=self.path("source"),
+            block_size=len(content),
+            threads=1,
+            direct=False,
+        )
+
+        self.assertEqual(content, self.read("target"))
+
+    def test_wipe_truncates_file(self):
+        with open(self.path("target"), "wb") as f:
+            f.write(b"\xff" * 2 * mmap.PAGESIZE)
+
+        wipe(self.path("target"), size=mmap.PAGESIZE)
+
+        self.assertEqual(b"\0" * mmap.PAGESIZE, self.read("target"))
+
+    def test_wipe_short_source(self):
+        with open(self.path("source"), "wb") as f:
+            f.write(b"short")
+
+        with self.assertRaises(EOFError):
+            wipe(self.path("target"), size=4096, source=self.path("source"))
+
+    def test_wipe_empty(self):
+        with open(self.path("target"), "wb"):
+            pass
+
+        wipe(self.path("target"))
+
+        self.assertEqual(b"", self.read("target"))
+
+
+class WipeCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(tmp_dir.cleanup)
+        self.target = os.path.join(tmp_dir.name, "target")
+        self.checkpoint = os.path.join(tmp_dir.name, "state", "target.json")
+
+        self.size = 8 * mmap.PAGESIZE
+        with open(self.target, "wb") as f:
+            f.write(b"\xff" * self.size)
+
+    def write_checkpoint(self, key: str, positions):
+        os.makedirs(os.path.dirname(self.checkpoint))
+        with open(self.checkpoint, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "key": key,
+                    "size": self.size,
+                    "block_size": mmap.PAGESIZE,
+                    "positions": positions,
+                },
+                f,
+            )
+
+    def wipe(self, **kwargs):
+        wipe(
+            self.target,
+            block_size=mmap.PAGESIZE,
+            threads=2,
+            checkpoint=self.checkpoint,
+            checkpoint_key="key",
+            **kwargs,
+        )
+
+    def read(self) -> bytes:
+        with open(self.target, "rb") as f:
+            return f.read()
+
+    def test_resume(self):
+        # The first range was interrupted halfway, and the second completed.
+        self.write_checkpoint("key", [2 * mmap.PAGESIZE, 8 * mmap.PAGESIZE])
+        reports = []
+
+        self.wipe(report=reports.append)
+
+        page = mmap.PAGESIZE
+        self.assertEqual(
+            b"\xff" * 2 * page + b"\0" * 2 * page + b"\xff" * 4 * page, self.read()
+        )
+        self.assertEqual(6 * page, reports[-1].resumed)
+        self.assertEqual(self.size, reports[-1].written)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_mismatched_checkpoint(self):
+        self.write_checkpoint("other", [2 * mmap.PAGESIZE, 8 * mmap.PAGESIZE])
+
+        self.wipe()
+
+        self.assertEqual(b"\0" * self.size, self.read())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_failure_saves_checkpoint(self):
+        source = os.path.join(os.path.dirname(self.target), "source")
+        with open(source, "wb") as f:
+            f.write(b"\1" * mmap.PAGESIZE)
+
+        with self.assertRaises(EOFError):
+            self.wipe(source=source)
+
+        with open(self.checkpoint, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        self.assertEqual("key", checkpoint["key"])
+        self.assertEqual(self.size, checkpoint["size"])
+        self.assertEqual(2, len(checkpoint["positions"]))